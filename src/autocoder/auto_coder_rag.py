@@ -310,6 +310,52 @@ def main(input_args: Optional[List[str]] = None):
         default=1000000,
         help="The maximum number of tokens in the output. This is only used when enable_hybrid_index is true.",
     )
+    serve_parser.add_argument(
+        "--rag_cache_scan_interval",
+        type=float,
+        default=0,
+        help="Minimum interval in seconds between two scans of the doc directory for changes. 0 means scan on every request",
+    )
+    serve_parser.add_argument(
+        "--rag_lexical_top_n",
+        type=int,
+        default=0,
+        help="Only send the top N files ranked by a local BM25 index to the recall model. 0 means disabled",
+    )
+    serve_parser.add_argument(
+        "--disable_rag_relevance_cache",
+        action="store_true",
+        help="Disable the on-disk cache of document relevance and chunk range results",
+    )
+    serve_parser.add_argument(
+        "--rag_relevance_cache_ttl",
+        type=int,
+        default=604800,
+        help="Time to live in seconds of the relevance cache entries",
+    )
+    serve_parser.add_argument(
+        "--rag_relevance_cache_max_entries",
+        type=int,
+        default=100000,
+        help="Maximum number of entries kept in the relevance cache",
+    )
+    serve_parser.add_argument(
+        "--rag_filter_early_stop",
+        action="store_true",
+        help="Stop document filtering once the relevant docs fill the full text and segment token limits, so answering can start earlier",
+    )
+    serve_parser.add_argument(
+        "--rag_filter_top_k",
+        type=int,
+        default=0,
+        help="Stop document filtering once this many relevant docs are found. 0 means no limit",
+    )
+    serve_parser.add_argument(
+        "--rag_filter_deadline",
+        type=float,
+        default=0,
+        help="Maximum seconds spent on document filtering before answering starts. Answering waits for filtering to finish, so this is the bound on that wait; docs not classified in time are dropped. 0 means no limit",
+    )
 
     serve_parser.add_argument(
         "--without_contexts",
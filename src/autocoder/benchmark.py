@@ -136,3 +136,123 @@ def benchmark_byzerllm(model: str, parallel: int, rounds: int = 1, query: str =
     table.add_row("Requests/Second", f"{parallel/total_time:.2f}")
 
     console.print(table)
+
+
+def benchmark_segment_reorder(
+    sizes=(1000, 5000, 20000), chunks_per_doc: int = 20, rounds: int = 5
+):
+    """在合成的分块文档集合上测量 TokenLimiter 的 segment 重排耗时"""
+    import random
+    from autocoder.common import SourceCode
+    from autocoder.rag.token_limiter import reorder_segments
+
+    console = Console()
+    table = Table(title="Segment Reorder Benchmark Results")
+    table.add_column("Docs", style="cyan")
+    table.add_column("Average (ms)", style="magenta")
+    table.add_column("Min (ms)", style="magenta")
+
+    rng = random.Random(42)
+    for size in sizes:
+        docs = []
+        for i in range(size):
+            if i % 5 == 0:
+                docs.append(SourceCode(module_name=f"doc_{i}", source_code=""))
+            else:
+                original_doc = f"file_{rng.randrange(max(1, size // chunks_per_doc))}"
+                docs.append(
+                    SourceCode(
+                        module_name=f"{original_doc}#chunk{i}",
+                        source_code="",
+                        metadata={"original_doc": original_doc, "chunk_index": i},
+                    )
+                )
+        rng.shuffle(docs)
+
+        results = []
+        for _ in range(rounds):
+            t1 = time.perf_counter()
+            reorder_segments(docs)
+            results.append((time.perf_counter() - t1) * 1000)
+
+        table.add_row(str(size), f"{np.mean(results):.2f}", f"{min(results):.2f}")
+
+    console.print(table)
+
+
+def benchmark_build_index_and_filter_files(
+    sizes=(1000, 10000, 50000), candidates: int = 50
+):
+    """
+    用桩 LLM 在合成项目上测量 build_index_and_filter_files 本身（不含模型调用）的耗时。
+    候选文件取自项目末尾，这是按路径线性查找时最慢的情况。
+    """
+    import tempfile
+    from unittest.mock import patch
+    from autocoder.common import AutoCoderArgs, SourceCode
+    from autocoder.index.index import (
+        IndexManager,
+        FileList,
+        TargetFile,
+        VerifyFileRelevance,
+        build_index_and_filter_files,
+    )
+
+    class _StubLLM:
+        def get_sub_client(self, name):
+            return None
+
+    class _StubPrompt:
+        def with_llm(self, llm):
+            return self
+
+        def with_return_type(self, return_type):
+            return self
+
+        def run(self, *args, **kwargs):
+            return VerifyFileRelevance(relevant_score=10, reason="stub")
+
+    console = Console()
+    table = Table(title="build_index_and_filter_files Benchmark Results")
+    table.add_column("Files", style="cyan")
+    table.add_column("Total (s)", style="magenta")
+
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as source_dir:
+            sources = [
+                SourceCode(
+                    module_name=f"{source_dir}/pkg{i % 100}/module_{i}.py",
+                    source_code=f"def func_{i}():\n    return {i}\n",
+                )
+                for i in range(size)
+            ]
+            target_files = FileList(
+                file_list=[
+                    TargetFile(file_path=s.module_name, reason="stub")
+                    for s in sources[-candidates:]
+                ]
+            )
+            args = AutoCoderArgs(
+                source_dir=source_dir,
+                query="benchmark",
+                skip_confirm=True,
+                skip_build_index=False,
+                skip_filter_index=False,
+                index_filter_level=1,
+                index_filter_workers=4,
+                anti_quota_limit=0,
+            )
+            with patch.object(
+                IndexManager, "build_index", lambda self: {}
+            ), patch.object(
+                IndexManager, "get_target_files_by_query", lambda self, query: target_files
+            ), patch.object(
+                IndexManager, "verify_file_relevance", _StubPrompt()
+            ):
+                t1 = time.perf_counter()
+                build_index_and_filter_files(llm=_StubLLM(), args=args, sources=sources)
+                total_time = time.perf_counter() - t1
+
+        table.add_row(str(size), f"{total_time:.3f}")
+
+    console.print(table)
@@ -26,6 +26,8 @@ from autocoder.version import __version__
 from autocoder.auto_coder import main as auto_coder_main
 from autocoder.common.command_completer import CommandTextParser
 from autocoder.utils import get_last_yaml_file
+from autocoder.index.index_store import IndexStore
+from autocoder.common.project_scanner import ProjectScanner
 from autocoder.index.symbols_utils import (
     extract_symbols,
     SymbolType,
@@ -370,45 +372,34 @@ def convert_yaml_config_to_str(yaml_config):
     return yaml_content
 
 
+def get_project_scanner() -> ProjectScanner:
+    final_exclude_dirs = defaut_exclude_dirs + memory.get("exclude_dirs", [])
+    return ProjectScanner(project_root, final_exclude_dirs)
+
+
 def get_all_file_names_in_project() -> List[str]:
 
     file_names = []
-    final_exclude_dirs = defaut_exclude_dirs + memory.get("exclude_dirs", [])
-    for root, dirs, files in os.walk(project_root, followlinks=True):
-        dirs[:] = [d for d in dirs if d not in final_exclude_dirs]
+    for _, _, files in get_project_scanner().walk():
         file_names.extend(files)
     return file_names
 
 
 def get_all_file_in_project() -> List[str]:
-
-    file_names = []
-    final_exclude_dirs = defaut_exclude_dirs + memory.get("exclude_dirs", [])
-    for root, dirs, files in os.walk(project_root, followlinks=True):
-        dirs[:] = [d for d in dirs if d not in final_exclude_dirs]
-        for file in files:
-            file_names.append(os.path.join(root, file))
-    return file_names
+    return get_project_scanner().list_files()
 
 
 def get_all_file_in_project_with_dot() -> List[str]:
-    file_names = []
-    final_exclude_dirs = defaut_exclude_dirs + memory.get("exclude_dirs", [])
-    for root, dirs, files in os.walk(project_root, followlinks=True):
-        dirs[:] = [d for d in dirs if d not in final_exclude_dirs]
-        for file in files:
-            file_names.append(os.path.join(
-                root, file).replace(project_root, "."))
-    return file_names
+    return [
+        file_path.replace(project_root, ".")
+        for file_path in get_project_scanner().iter_files()
+    ]
 
 
 def get_all_dir_names_in_project() -> List[str]:
     dir_names = []
-    final_exclude_dirs = defaut_exclude_dirs + memory.get("exclude_dirs", [])
-    for root, dirs, files in os.walk(project_root, followlinks=True):
-        dirs[:] = [d for d in dirs if d not in final_exclude_dirs]
-        for dir in dirs:
-            dir_names.append(dir)
+    for root, dirs, files in get_project_scanner().walk():
+        dir_names.extend(dirs)
     return dir_names
 
 
@@ -429,8 +420,7 @@ def find_files_in_project(patterns: List[str]) -> List[str]:
         else:
             is_added = False
             # add files belongs to project
-            for root, dirs, files in os.walk(project_root, followlinks=True):
-                dirs[:] = [d for d in dirs if d not in final_exclude_dirs]
+            for root, _, files in get_project_scanner().walk():
                 if pattern in files:
                     matched_files.append(os.path.join(root, pattern))
                     is_added = True
@@ -566,13 +556,9 @@ def show_help():
 
 def get_symbol_list() -> List[SymbolItem]:
     list_of_symbols = []
-    index_file = os.path.join(".auto-coder", "index.json")
-
-    if os.path.exists(index_file):
-        with open(index_file, "r") as file:
-            index_data = json.load(file)
-    else:
-        index_data = {}
+    if not os.path.exists(".auto-coder"):
+        return list_of_symbols
+    index_data = IndexStore(".auto-coder").read_all()
 
     for item in index_data.values():
         symbols_str = item["symbols"]
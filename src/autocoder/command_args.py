@@ -19,6 +19,8 @@ def parse_args(input_args: Optional[List[str]] = None) -> AutoCoderArgs:
     parser.add_argument("--git_url", help=desc["git_url"])
     parser.add_argument("--target_file", required=False,
                         help=desc["target_file"])
+    parser.add_argument("--source_output_mode", default="lazy",
+                        choices=["lazy", "file"], help=desc["source_output_mode"])
     parser.add_argument("--query", help=desc["query"])
     parser.add_argument("--template", default="common", help=desc["template"])
     parser.add_argument("--project_type", default="py",
@@ -92,6 +94,21 @@ def parse_args(input_args: Optional[List[str]] = None) -> AutoCoderArgs:
     parser.add_argument(
         "--anti_quota_limit", type=int, default=1, help=desc["anti_quota_limit"]
     )
+    parser.add_argument(
+        "--llm_rpm_limit", type=int, default=0, help=desc["llm_rpm_limit"]
+    )
+    parser.add_argument(
+        "--llm_tpm_limit", type=int, default=0, help=desc["llm_tpm_limit"]
+    )
+    parser.add_argument(
+        "--llm_max_concurrency", type=int, default=0, help=desc["llm_max_concurrency"]
+    )
+    parser.add_argument(
+        "--llm_rate_limit_max_retries",
+        type=int,
+        default=5,
+        help=desc["llm_rate_limit_max_retries"],
+    )
     parser.add_argument(
         "--skip_build_index", action="store_false", help=desc["skip_build_index"]
     )
@@ -267,12 +267,26 @@ class AutoCoderArgs(pydantic.BaseModel):
     index_filter_workers: Optional[int] = 1
     index_filter_file_num: Optional[int] = -1
     index_build_workers: Optional[int] = 1
+    disable_local_symbols_extraction: bool = False
+    index_symbols_usage_from_llm: bool = True
+    index_symbols_usage_code_length: Optional[int] = 3000
+    index_filter_llm_on_references: bool = True
+    disable_import_graph: bool = False
+    index_related_files_depth: Optional[int] = 1
+    index_related_files_max_fanout: Optional[int] = 20
+    index_related_files_max_files: Optional[int] = 50
+    index_embedding_top_k: Optional[int] = 0
+    index_embedding_with_llm_filter: bool = False
     
     planner_model: Optional[str] = ""
     designer_model: Optional[str] = ""
     file: Optional[str] = ""
     ray_address: Optional[str] = ""
     anti_quota_limit: Optional[int] = 1    
+    llm_rpm_limit: Optional[int] = 0
+    llm_tpm_limit: Optional[int] = 0
+    llm_max_concurrency: Optional[int] = 0
+    llm_rate_limit_max_retries: Optional[int] = 5
     print_request: Optional[bool] = False
     py_packages: Optional[str] = ""
     
@@ -287,6 +301,8 @@ class AutoCoderArgs(pydantic.BaseModel):
     rag_doc_filter_relevance: Optional[int] = 5
     rag_context_window_limit: Optional[int] = 120000    
     verify_file_relevance_score: int = 6
+    disable_verify_relevance_cache: bool = False
+    verify_relevance_cache_max_entries: Optional[int] = 10000
     enable_rag_search: Optional[Union[bool, str]] = False
     enable_rag_context: Optional[Union[bool, str]] = False
     collection: Optional[str] = None
@@ -307,17 +323,30 @@ class AutoCoderArgs(pydantic.BaseModel):
     doc_command: Optional[str] = None
     required_exts: Optional[str] = None
     hybrid_index_max_output_tokens: Optional[int] = 1000000
+    rag_cache_scan_interval: Optional[float] = 0
+    rag_lexical_top_n: Optional[int] = 0
+    disable_rag_relevance_cache: bool = False
+    rag_relevance_cache_ttl: Optional[int] = 604800
+    rag_relevance_cache_max_entries: Optional[int] = 100000
+    rag_filter_early_stop: bool = False
+    rag_filter_top_k: Optional[int] = 0
+    rag_filter_deadline: Optional[float] = 0
 
     monitor_mode: bool = False
     enable_hybrid_index: bool = False
     disable_auto_window: bool = False
     filter_batch_size: Optional[int] = 5
+    filter_batch_token_ratio: Optional[float] = 0.6
     disable_segment_reorder: bool = False
     rag_doc_filter_relevance: int = 5
     tokenizer_path: Optional[str] = None
     skip_confirm: Optional[bool] = False
     silence: Optional[bool] = False
     exclude_files: Optional[Union[str, List[str]]] = ""
+    source_loader_workers: Optional[int] = 8
+    source_max_file_size: Optional[int] = 10 * 1024 * 1024
+    disable_source_snapshot: Optional[bool] = False
+    source_output_mode: Optional[str] = "lazy"
     output: Optional[str] = ""
     single_file: Optional[bool] = False
     query_prefix: Optional[str] = None
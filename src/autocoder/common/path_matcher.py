@@ -0,0 +1,175 @@
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Pattern, Sequence, Union
+
+import pathspec
+from loguru import logger
+
+DEFAULT_MEMO_SIZE = 200000
+
+# 没有被反斜杠转义的命名分组
+_NAMED_GROUP = re.compile(r"(?<!\\)((?:\\\\)*)\(\?P<[^>]+>")
+
+
+def load_ignore_patterns(root: str) -> List[str]:
+    """读取 root 下的忽略规则：优先使用 .serveignore，没有时使用 .gitignore"""
+    for name in (".serveignore", ".gitignore"):
+        ignore_path = os.path.join(root, name)
+        if os.path.exists(ignore_path):
+            with open(ignore_path, "r") as ignore_file:
+                return ignore_file.read().splitlines()
+    return []
+
+
+def _compile_ignore_rules(patterns: Union[Sequence[str], pathspec.PathSpec]):
+    """
+    把 gitignore 风格的规则编译成一个正则：规则按倒序组成多选分支，
+    第一个匹配的分支就是最后一条匹配的规则（gitignore 中后面的规则优先），
+    再根据该规则是否以 ! 开头决定是否忽略。返回 (正则, 每个分支是否表示忽略)。
+    """
+    if isinstance(patterns, pathspec.PathSpec):
+        spec = patterns
+    else:
+        spec = pathspec.PathSpec.from_lines("gitwildmatch", patterns)
+    rules = [p for p in spec.patterns if p.include is not None and p.regex is not None]
+    if not rules:
+        return None, [], spec
+    branches = []
+    polarity = []
+    for rule in reversed(rules):
+        # 每个分支只保留最外层一个捕获组，lastindex 即为分支序号
+        body = _NAMED_GROUP.sub(r"\1(?:", rule.regex.pattern)
+        try:
+            if re.compile(body, rule.regex.flags).groups:
+                return None, [], spec
+        except re.error:
+            return None, [], spec
+        branches.append(f"({body})")
+        polarity.append(bool(rule.include))
+    try:
+        return re.compile("|".join(branches)), polarity, spec
+    except re.error as e:
+        logger.warning(f"Failed to combine ignore patterns, falling back to pathspec: {e}")
+        return None, [], spec
+
+
+def _compile_exclude_regexes(patterns: Sequence[Union[str, Pattern]]) -> List[Pattern]:
+    """把 exclude_files 中的正则合并成一个，标志不一致或者无法合并时保持原样"""
+    compiled = [re.compile(p) if isinstance(p, str) else p for p in patterns]
+    if len(compiled) <= 1 or len({p.flags for p in compiled}) != 1:
+        return compiled
+    try:
+        return [
+            re.compile("|".join(f"(?:{p.pattern})" for p in compiled), compiled[0].flags)
+        ]
+    except re.error:
+        return compiled
+
+
+class PathMatcher:
+    """
+    预编译的路径过滤器，RAG 文档缓存和各种项目类型共用。
+
+    - ignore_patterns：gitignore 风格的规则（.gitignore/.serveignore 的行，或者已有的 PathSpec），匹配相对路径，
+      所有规则合并成一个正则一次匹配；目录被忽略时整个目录直接剪枝，不再进入；
+    - exclude_patterns：exclude_files 中的正则，对传入的完整路径做 search，同样合并成一个；
+    - required_exts：要求的文件后缀，为空表示不限制；
+    - exclude_dirs：按目录名排除；skip_hidden_dirs 为 True 时排除以 . 开头的目录。
+
+    ignore 规则和目录的判断结果会被缓存，周期性重复扫描同一棵目录树时不会重复匹配。
+    """
+
+    def __init__(
+        self,
+        ignore_patterns: Optional[Union[Iterable[str], pathspec.PathSpec]] = None,
+        exclude_patterns: Optional[Iterable[Union[str, Pattern]]] = None,
+        required_exts: Optional[Iterable[str]] = None,
+        exclude_dirs: Optional[Iterable[str]] = None,
+        skip_hidden_dirs: bool = False,
+        memo_size: int = DEFAULT_MEMO_SIZE,
+    ):
+        if not isinstance(ignore_patterns, pathspec.PathSpec):
+            ignore_patterns = [p for p in (ignore_patterns or []) if p and p.strip()]
+        self.ignore_regex, self.ignore_polarity, self.ignore_spec = (
+            _compile_ignore_rules(ignore_patterns) if ignore_patterns else (None, [], None)
+        )
+        self.has_ignore_rules = bool(self.ignore_spec and self.ignore_spec.patterns)
+        self.exclude_regexes = _compile_exclude_regexes(list(exclude_patterns or []))
+        self.required_exts = tuple(ext for ext in (required_exts or []) if ext)
+        self.exclude_dirs = frozenset(exclude_dirs or ())
+        self.skip_hidden_dirs = skip_hidden_dirs
+        self.memo_size = memo_size
+        self._memo: Dict[str, bool] = {}
+
+    @classmethod
+    def for_rag_cache(
+        cls,
+        ignore_spec: Optional[pathspec.PathSpec],
+        required_exts: Optional[Iterable[str]],
+        exclude_dirs: Optional[Iterable[str]] = None,
+    ) -> "PathMatcher":
+        """
+        RAG 文档缓存扫描文档目录时使用的匹配器：
+        .serveignore/.gitignore 规则和后缀要求预编译好，隐藏目录和 exclude_dirs 整个剪枝。
+        """
+        return cls(
+            ignore_patterns=ignore_spec,
+            required_exts=required_exts,
+            exclude_dirs=exclude_dirs,
+            skip_hidden_dirs=True,
+        )
+
+    @classmethod
+    def from_ignore_file(cls, root: str, **kwargs) -> "PathMatcher":
+        """使用 root 下的 .serveignore（或 .gitignore）中的规则"""
+        return cls(ignore_patterns=load_ignore_patterns(root), **kwargs)
+
+    def _match_ignore(self, rel_path: str) -> bool:
+        if self.ignore_regex is not None:
+            m = self.ignore_regex.match(rel_path)
+            return m is not None and self.ignore_polarity[m.lastindex - 1]
+        return self.ignore_spec.match_file(rel_path)
+
+    def is_ignored(self, rel_path: str, is_dir: bool = False) -> bool:
+        """按 ignore 规则判断相对路径是否被忽略，目录的路径以 / 结尾参与匹配"""
+        if not self.has_ignore_rules:
+            return False
+        key = rel_path.replace(os.sep, "/")
+        if is_dir:
+            key += "/"
+        result = self._memo.get(key)
+        if result is None:
+            result = self._match_ignore(key)
+            if len(self._memo) >= self.memo_size:
+                self._memo.clear()
+            self._memo[key] = result
+        return result
+
+    def is_excluded(self, path: str) -> bool:
+        """按 exclude_files 的正则判断路径是否被排除"""
+        for pattern in self.exclude_regexes:
+            if pattern.search(path):
+                return True
+        return False
+
+    def has_required_ext(self, path: str) -> bool:
+        return not self.required_exts or path.endswith(self.required_exts)
+
+    def is_dir_pruned(self, name: str, rel_dir: str) -> bool:
+        """目录是否需要整个跳过，rel_dir 为目录相对于扫描根目录的路径"""
+        if name in self.exclude_dirs:
+            return True
+        if self.skip_hidden_dirs and name.startswith("."):
+            return True
+        return self.is_ignored(rel_dir, is_dir=True)
+
+    def is_file_included(self, rel_path: str, path: Optional[str] = None) -> bool:
+        """
+        文件是否需要保留：满足后缀要求，并且没有被 ignore 规则和 exclude_files 排除。
+        path 为 exclude_files 匹配使用的完整路径，默认与 rel_path 相同。
+        """
+        if not self.has_required_ext(rel_path):
+            return False
+        if self.is_ignored(rel_path):
+            return False
+        return not self.is_excluded(path if path is not None else rel_path)
@@ -0,0 +1,231 @@
+import os
+import json
+import time
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from loguru import logger
+from autocoder.common.path_matcher import PathMatcher
+from autocoder.common.source_snapshot import RACY_WINDOW_NS
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_FILE_NAME = "scan_snapshot.json"
+
+# 目录相对路径 -> (mtime_ns, 文件名列表, 子目录名列表)
+DirEntry = Tuple[int, List[str], List[str]]
+
+
+class DirSnapshot:
+    """
+    项目目录列表的快照，按目录的 mtime 判断是否需要重新列目录。
+
+    目录中新增、删除或者重命名条目都会改变该目录的 mtime，
+    所以 mtime 没变时可以直接复用上次的列表，只需要 stat 一次目录。
+    mtime 离列目录的时间太近的目录不写入快照：同一个时间戳精度内目录可能还会再变化而 mtime 不变。
+    快照与排除规则无关，不同的扫描方式可以共享同一份快照。
+    如果项目下存在 .auto-coder 目录，快照会持久化到其中，供下一次运行复用。
+    """
+
+    def __init__(self, root: str, snapshot_file: Optional[str] = None):
+        self.root = root
+        self.snapshot_file = snapshot_file
+        self.lock = threading.Lock()
+        self.entries: Dict[str, DirEntry] = {}
+        self.dirty = False
+        self._load()
+
+    def _load(self):
+        if not self.snapshot_file or not os.path.exists(self.snapshot_file):
+            return
+        try:
+            with open(self.snapshot_file, "r") as f:
+                data = json.load(f)
+            if data.get("version") == SNAPSHOT_VERSION:
+                self.entries = {k: tuple(v) for k, v in data["entries"].items()}
+        except Exception as e:
+            logger.warning(f"Failed to load scan snapshot {self.snapshot_file}: {e}")
+
+    def get(self, rel_dir: str, mtime_ns: int) -> Optional[DirEntry]:
+        with self.lock:
+            entry = self.entries.get(rel_dir)
+        if entry is not None and entry[0] == mtime_ns:
+            return entry
+        return None
+
+    def put(self, rel_dir: str, entry: DirEntry):
+        with self.lock:
+            self._prune_removed_subdirs(rel_dir, entry[2])
+            self.entries[rel_dir] = entry
+            self.dirty = True
+
+    def discard(self, rel_dir: str, dirs: List[str]):
+        """
+        目录刚刚变化过、本次列表不能缓存时使用：只记下子目录名（用于之后清理被删除的子目录），
+        mtime 记为 -1，不会被 get 命中。
+        """
+        with self.lock:
+            self._prune_removed_subdirs(rel_dir, dirs)
+            self.entries[rel_dir] = (-1, [], list(dirs))
+            self.dirty = True
+
+    def _prune_removed_subdirs(self, rel_dir: str, dirs: List[str]):
+        """
+        重新列出目录时，上次列表中有而这次没有的子目录已经被删除（或者变成了文件），
+        删除它们以及其下所有目录的快照。删除子目录一定会改变父目录的 mtime，
+        所以只在父目录被重新列出时检查即可，不需要在保存时 stat 每个目录。
+        """
+        old = self.entries.get(rel_dir)
+        if old is None:
+            return
+        removed = set(old[2]) - set(dirs)
+        if not removed:
+            return
+        prefix = f"{rel_dir}/" if rel_dir else ""
+        removed_dirs = {prefix + d for d in removed}
+        for key in list(self.entries):
+            if key in removed_dirs or any(key.startswith(d + "/") for d in removed_dirs):
+                del self.entries[key]
+        self.dirty = True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty or not self.snapshot_file:
+                return
+            if not os.path.isdir(os.path.dirname(self.snapshot_file)):
+                return
+            data = {"version": SNAPSHOT_VERSION, "entries": self.entries}
+            tmp_file = self.snapshot_file + ".tmp"
+            try:
+                with open(tmp_file, "w") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_file, self.snapshot_file)
+                self.dirty = False
+            except Exception as e:
+                logger.warning(f"Failed to save scan snapshot {self.snapshot_file}: {e}")
+
+
+# 进程内共享：项目根目录的绝对路径 -> 快照
+_snapshots: Dict[str, DirSnapshot] = {}
+_snapshots_lock = threading.Lock()
+
+
+def get_dir_snapshot(root: str) -> DirSnapshot:
+    abs_root = os.path.abspath(root)
+    with _snapshots_lock:
+        snapshot = _snapshots.get(abs_root)
+        if snapshot is None:
+            snapshot = DirSnapshot(
+                abs_root, os.path.join(abs_root, ".auto-coder", SNAPSHOT_FILE_NAME)
+            )
+            _snapshots[abs_root] = snapshot
+        return snapshot
+
+
+class ProjectScanner:
+    """
+    项目文件扫描器，各种项目类型以及 chat_auto_coder 的文件列表都通过它遍历目录。
+
+    使用 os.scandir 列目录，按目录名排除（集合查找），遍历顺序与 os.walk 自顶向下一致，
+    返回的路径以传入的 root 为前缀（与 os.walk 的 os.path.join(root, file) 相同）。
+    传入 matcher 时，被它排除的目录整个跳过，文件也只返回 matcher 保留的部分。
+    """
+
+    def __init__(
+        self,
+        root: str,
+        exclude_dirs: Optional[Iterable[str]] = None,
+        follow_links: bool = True,
+        snapshot: Optional[DirSnapshot] = None,
+        matcher: Optional[PathMatcher] = None,
+    ):
+        self.root = root
+        self.exclude_dirs = frozenset(exclude_dirs or ())
+        self.follow_links = follow_links
+        self.matcher = matcher
+        self.snapshot = snapshot if snapshot is not None else get_dir_snapshot(root)
+
+    def _list_dir(self, path: str, rel_dir: str, mtime_ns: int) -> Optional[DirEntry]:
+        entry = self.snapshot.get(rel_dir, mtime_ns)
+        if entry is not None:
+            return entry
+
+        listed_ns = time.time_ns()
+        files, dirs = [], []
+        try:
+            with os.scandir(path) as it:
+                for e in it:
+                    try:
+                        is_dir = e.is_dir(follow_symlinks=self.follow_links)
+                    except OSError:
+                        is_dir = False
+                    (dirs if is_dir else files).append(e.name)
+        except OSError:
+            return None
+        entry = (mtime_ns, files, dirs)
+        if listed_ns - mtime_ns >= RACY_WINDOW_NS:
+            self.snapshot.put(rel_dir, entry)
+        else:
+            self.snapshot.discard(rel_dir, dirs)
+        return entry
+
+    def walk(self) -> Iterator[Tuple[str, List[str], List[str]]]:
+        """与 os.walk 相同的 (目录, 子目录名, 文件名)，子目录已经按 exclude_dirs 过滤"""
+        visited = set()
+        stack = [(self.root, "")]
+        try:
+            while stack:
+                path, rel_dir = stack.pop()
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if self.follow_links:
+                    # 跟随软链接时避免目录环
+                    key = (st.st_dev, st.st_ino)
+                    if key in visited:
+                        continue
+                    visited.add(key)
+
+                entry = self._list_dir(path, rel_dir, st.st_mtime_ns)
+                if entry is None:
+                    continue
+                _, files, dirs = entry
+                dirs = [d for d in dirs if d not in self.exclude_dirs]
+                matcher = self.matcher
+                if matcher is not None:
+                    prefix = f"{rel_dir}/" if rel_dir else ""
+                    dirs = [d for d in dirs if not matcher.is_dir_pruned(d, prefix + d)]
+                    files = [
+                        f
+                        for f in files
+                        if matcher.is_file_included(prefix + f, os.path.join(path, f))
+                    ]
+                yield path, dirs, files
+                for d in reversed(dirs):
+                    stack.append(
+                        (os.path.join(path, d), f"{rel_dir}/{d}" if rel_dir else d)
+                    )
+        finally:
+            self.snapshot.save()
+
+    def iter_files(self) -> Iterator[str]:
+        for root, _, files in self.walk():
+            for file in files:
+                yield os.path.join(root, file)
+
+    def list_files(self) -> List[str]:
+        return list(self.iter_files())
+
+    def list_dirs(self) -> List[str]:
+        return [os.path.join(root, d) for root, dirs, _ in self.walk() for d in dirs]
+
+
+def scan_project_files(
+    root: str,
+    exclude_dirs: Optional[Iterable[str]] = None,
+    follow_links: bool = True,
+    matcher: Optional[PathMatcher] = None,
+) -> Iterator[str]:
+    return ProjectScanner(
+        root, exclude_dirs, follow_links=follow_links, matcher=matcher
+    ).iter_files()
@@ -0,0 +1,151 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional
+
+from loguru import logger
+from autocoder.common import SourceCode, AutoCoderArgs
+from autocoder.common.source_snapshot import SourceSnapshotStore, get_source_snapshot
+
+BINARY_SNIFF_SIZE = 8192
+
+
+def is_binary_file(file_path: str, sniff_size: int = BINARY_SNIFF_SIZE) -> bool:
+    """读取文件开头的一段字节判断是否是二进制文件：包含 NUL 或者不是合法的 UTF-8"""
+    with open(file_path, "rb") as f:
+        chunk = f.read(sniff_size)
+    if b"\0" in chunk:
+        return True
+    try:
+        chunk.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # 截断的位置可能正好落在一个多字节字符中间
+        return not (len(chunk) == sniff_size and e.start >= len(chunk) - 3)
+    return False
+
+
+def _load_one(
+    file_path: str,
+    convert: Callable[[str, Optional[str]], Optional[SourceCode]],
+    max_file_size: int,
+    snapshot: Optional[SourceSnapshotStore] = None,
+) -> Optional[SourceCode]:
+    try:
+        st = os.stat(file_path)
+        if max_file_size > 0 and st.st_size > max_file_size:
+            logger.warning(
+                f"Skipping {file_path}: file size exceeds source_max_file_size ({max_file_size} bytes)"
+            )
+            return None
+        text, md5 = None, None
+        if snapshot is not None:
+            hit = snapshot.lookup(file_path, st)
+            if hit is not None:
+                text, md5 = hit
+        if text is None:
+            if is_binary_file(file_path):
+                logger.debug(f"Skipping binary file: {file_path}")
+                return None
+            with open(file_path, "r") as f:
+                text = f.read()
+        # 快照中保存的是文件原文，各项目类型自己的转换（过滤、加行号等）每次都会执行
+        source = convert(file_path, text)
+        if source is None or snapshot is None or source.module_name != file_path:
+            return source
+        if md5 is None:
+            md5 = snapshot.record(file_path, st, text)
+        if source.source_code == text:
+            # 内容哈希只在转换没有改变原文时才和 source_code 对应
+            source.metadata = dict(source.metadata, md5=md5)
+        return source
+    except Exception as e:
+        logger.warning(f"Failed to read file: {file_path}. Error: {str(e)}")
+        return None
+
+
+def load_source_codes(
+    file_paths: Iterable[str],
+    convert: Callable[[str, Optional[str]], Optional[SourceCode]],
+    max_workers: int = 8,
+    max_file_size: int = 0,
+    snapshot: Optional[SourceSnapshotStore] = None,
+) -> Iterator[SourceCode]:
+    """
+    用有上限的线程池并发读取文件，按 file_paths 的顺序以流的方式产出 SourceCode。
+
+    同时在读取中的文件最多 max_workers * 4 个，调用方可以一边消费一边继续加载；
+    超过 max_file_size（字节，0 表示不限制）的文件和二进制文件会被跳过。
+    convert(file_path, text) 把文件原文转换成 SourceCode，返回 None 或者抛出异常的文件同样会被跳过。
+
+    传入 snapshot 时，大小和 mtime 都没有变化的文件直接使用上次运行保存的原文，不再读文件；
+    convert 没有改变原文时，产出的 SourceCode 的 metadata["md5"] 为内容哈希。
+    全部加载完成后把新内容写回快照。
+    """
+    max_workers = max(1, max_workers)
+    window_size = max_workers * 4
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    window = deque()
+    completed = False
+    if snapshot is not None:
+        snapshot.begin()
+    try:
+        for file_path in file_paths:
+            window.append(
+                executor.submit(_load_one, file_path, convert, max_file_size, snapshot)
+            )
+            if len(window) >= window_size:
+                source = window.popleft().result()
+                if source is not None:
+                    yield source
+        while window:
+            source = window.popleft().result()
+            if source is not None:
+                yield source
+        completed = True
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        if snapshot is not None:
+            # 只有完整遍历过项目时才能判断哪些文件已经被删除
+            snapshot.flush(prune=completed)
+            logger.info(f"Source snapshot: {snapshot.stats()}")
+
+
+def load_project_source_codes(
+    file_paths: Iterable[str],
+    convert: Callable[[str, Optional[str]], Optional[SourceCode]],
+    args: AutoCoderArgs,
+) -> Iterator[SourceCode]:
+    snapshot = None
+    if not args.disable_source_snapshot and args.source_dir:
+        snapshot = get_source_snapshot(args.source_dir)
+    return load_source_codes(
+        file_paths,
+        convert,
+        max_workers=args.source_loader_workers,
+        max_file_size=args.source_max_file_size,
+        snapshot=snapshot,
+    )
+
+
+def format_source_dump(sources: Iterable[SourceCode]) -> str:
+    """把源码拼接成 target_file 中使用的 ##File: 格式"""
+    return "".join(
+        f"##File: {source.module_name}\n{source.source_code}\n\n" for source in sources
+    )
+
+
+def iter_with_source_dump(
+    sources: Iterable[SourceCode], target_file: Optional[str], args: AutoCoderArgs
+) -> Iterator[SourceCode]:
+    """
+    source_output_mode 为 file 时，边产出边把全部源码写入 target_file（旧的行为）；
+    默认的 lazy 模式不写文件，需要完整拼接内容时再通过 format_source_dump 生成。
+    """
+    if args.source_output_mode != "file" or not target_file:
+        yield from sources
+        return
+    with open(target_file, "w") as file:
+        for source in sources:
+            file.write(f"##File: {source.module_name}\n")
+            file.write(f"{source.source_code}\n\n")
+            yield source
@@ -0,0 +1,206 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from loguru import logger
+
+SOURCE_SNAPSHOT_DB_NAME = "source_snapshot.db"
+
+# 快照格式版本（PRAGMA user_version）。版本 1 起 blob 保存文件原文，旧版本保存的是转换后的内容，需要丢弃
+SNAPSHOT_SCHEMA_VERSION = 1
+
+# 修改时间离当前太近的文件不写入清单：同一个时间戳精度内可能还会再被修改（与 git 的 racy clean 相同）
+RACY_WINDOW_NS = 2 * 1000 * 1000 * 1000
+
+# 文件路径 -> (文件大小, mtime_ns, 内容哈希)
+ManifestEntry = Tuple[int, int, str]
+
+
+def content_hash(text: str) -> str:
+    """与代码索引一致，使用 md5 作为内容哈希"""
+    return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+
+class SourceSnapshotStore:
+    """
+    .auto-coder 下按内容寻址的源码快照（SQLite），在多次运行之间复用未变化的文件内容和哈希。
+
+    - blobs 表：内容哈希 -> 文件原文，相同内容只保存一份；
+    - manifest 表：文件路径 -> (大小, mtime_ns, 内容哈希)。
+
+    文件的大小和 mtime 都与清单一致时直接返回上次的原文和哈希，不再读文件和计算哈希。
+    保存的是原文而不是转换后的内容，不同项目类型、不同 auto_merge 模式共用同一份快照时，
+    各自的转换都在原文上重新执行。
+    本次运行中内容哈希与上次不同（或者新出现）的文件记录在 changed_paths 中，用于统计。
+    """
+
+    def __init__(self, snapshot_dir: str):
+        self.db_path = os.path.join(snapshot_dir, SOURCE_SNAPSHOT_DB_NAME)
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.changed_paths: Set[str] = set()
+        self._pending_blobs: Dict[str, str] = {}
+        self._pending_entries: Dict[str, ManifestEntry] = {}
+        self._hit_count = 0
+        self._miss_count = 0
+        if not os.path.exists(snapshot_dir):
+            os.makedirs(snapshot_dir)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs (hash TEXT PRIMARY KEY, text TEXT NOT NULL)"
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS manifest (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    hash TEXT NOT NULL
+                )
+                """
+            )
+            if conn.execute("PRAGMA user_version").fetchone()[0] < SNAPSHOT_SCHEMA_VERSION:
+                conn.execute("DELETE FROM manifest")
+                conn.execute("DELETE FROM blobs")
+                conn.execute(f"PRAGMA user_version = {SNAPSHOT_SCHEMA_VERSION}")
+            rows = conn.execute("SELECT path, size, mtime_ns, hash FROM manifest").fetchall()
+        self.manifest: Dict[str, ManifestEntry] = {
+            path: (size, mtime_ns, h) for path, size, mtime_ns, h in rows
+        }
+        # 每个文件最近一次读到的内容哈希，修改时间太近没有写入清单的文件也会记录在这里
+        self.last_hashes: Dict[str, str] = {path: e[2] for path, e in self.manifest.items()}
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _reader(self) -> sqlite3.Connection:
+        # 加载源码时各个线程都要读 blob，每个线程复用一个只读连接
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self.local.conn = conn
+        return conn
+
+    def begin(self):
+        """开始新一轮加载，清空上一轮的变化记录"""
+        with self.lock:
+            self.changed_paths = set()
+
+    def lookup(self, file_path: str, st: os.stat_result) -> Optional[Tuple[str, str]]:
+        """文件没有变化时返回 (上次的原文, 内容哈希)，否则返回 None"""
+        entry = self.manifest.get(file_path)
+        if entry is None or entry[0] != st.st_size or entry[1] != st.st_mtime_ns:
+            with self.lock:
+                self._miss_count += 1
+            return None
+        try:
+            row = self._reader().execute(
+                "SELECT text FROM blobs WHERE hash = ?", (entry[2],)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to read source snapshot {self.db_path}: {e}")
+            row = None
+        with self.lock:
+            if row is None:
+                self._miss_count += 1
+                return None
+            self._hit_count += 1
+        return row[0], entry[2]
+
+    def record(self, file_path: str, st: os.stat_result, text: str) -> str:
+        """记录本次读取到的文件原文，返回内容哈希"""
+        h = content_hash(text)
+        with self.lock:
+            if self.last_hashes.get(file_path) != h:
+                self.changed_paths.add(file_path)
+                self.last_hashes[file_path] = h
+            self._pending_blobs[h] = text
+            if time.time_ns() - st.st_mtime_ns >= RACY_WINDOW_NS:
+                self._pending_entries[file_path] = (st.st_size, st.st_mtime_ns, h)
+        return h
+
+    def flush(self, prune: bool = False):
+        """
+        把本次记录的内容写入数据库。
+        prune 为 True 时同时删除已经不存在的文件的清单，以及不再被引用的 blob。
+        """
+        with self.lock:
+            blobs = self._pending_blobs
+            entries = self._pending_entries
+            self._pending_blobs = {}
+            self._pending_entries = {}
+            self.manifest.update(entries)
+            removed: List[str] = []
+            if prune:
+                removed = [p for p in self.manifest if not os.path.exists(p)]
+                for p in removed:
+                    del self.manifest[p]
+                    self.last_hashes.pop(p, None)
+
+        if not blobs and not entries and not removed:
+            return
+        try:
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO blobs (hash, text) VALUES (?, ?)",
+                    list(blobs.items()),
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO manifest (path, size, mtime_ns, hash) VALUES (?, ?, ?, ?)",
+                    [(p, size, mtime_ns, h) for p, (size, mtime_ns, h) in entries.items()],
+                )
+                conn.executemany(
+                    "DELETE FROM manifest WHERE path = ?", [(p,) for p in removed]
+                )
+                if prune:
+                    conn.execute(
+                        "DELETE FROM blobs WHERE hash NOT IN (SELECT hash FROM manifest)"
+                    )
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to save source snapshot {self.db_path}: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                "files": len(self.manifest),
+                "hits": self._hit_count,
+                "misses": self._miss_count,
+                "changed": len(self.changed_paths),
+            }
+
+
+# 进程内共享：项目根目录的绝对路径 -> 快照
+_stores: Dict[str, SourceSnapshotStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_source_snapshot(root: str, create: bool = True) -> Optional[SourceSnapshotStore]:
+    """
+    获取项目的源码快照。只有项目已经初始化（存在 .auto-coder 目录）时才启用，
+    不会在任意目录下创建 .auto-coder。create 为 False 时只返回本进程中已经打开的快照。
+    """
+    abs_root = os.path.abspath(root)
+    snapshot_dir = os.path.join(abs_root, ".auto-coder")
+    with _stores_lock:
+        store = _stores.get(abs_root)
+        if store is None:
+            if not create or not os.path.isdir(snapshot_dir):
+                return None
+            try:
+                store = SourceSnapshotStore(snapshot_dir)
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to open source snapshot in {snapshot_dir}: {e}")
+                return None
+            _stores[abs_root] = store
+        return store
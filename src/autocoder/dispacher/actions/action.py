@@ -50,13 +50,14 @@ class ActionTSProject(BaseAction):
             return False
         pp = TSProject(args=args, llm=self.llm)
         self.pp = pp
-        pp.run()
-
-        source_code = pp.output()
         if self.llm:
+            # 直接消费项目产出的源码流，一边加载一边构建索引，不再先写出完整的 target_file
             source_code = build_index_and_filter_files(
-                llm=self.llm, args=args, sources=pp.sources
+                llm=self.llm, args=args, sources=pp.iter_sources()
             )
+        else:
+            pp.run()
+            source_code = pp.output()
 
         if args.image_file:
             if args.image_mode == "iterative":
@@ -255,12 +256,14 @@ class ActionPyProject(BaseAction):
             return False
         pp = PyProject(args=self.args, llm=self.llm)
         self.pp = pp
-        pp.run(packages=args.py_packages.split(",") if args.py_packages else [])            
-        source_code = pp.output()
+        packages = args.py_packages.split(",") if args.py_packages else []
         if self.llm:
             source_code = build_index_and_filter_files(
-                llm=self.llm, args=args, sources=pp.sources
+                llm=self.llm, args=args, sources=pp.iter_sources(packages=packages)
             )
+        else:
+            pp.run(packages=packages)
+            source_code = pp.output()
 
         self.process_content(source_code)
         return True
@@ -352,12 +355,13 @@ class ActionSuffixProject(BaseAction):
         args = self.args
         pp = SuffixProject(args=args, llm=self.llm)
         self.pp = pp
-        pp.run()
-        source_code = pp.output()
         if self.llm:
             source_code = build_index_and_filter_files(
-                llm=self.llm, args=args, sources=pp.sources
+                llm=self.llm, args=args, sources=pp.iter_sources()
             )
+        else:
+            pp.run()
+            source_code = pp.output()
         self.process_content(source_code)
 
     def process_content(self, content: str):
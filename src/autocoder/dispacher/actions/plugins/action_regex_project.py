@@ -33,12 +33,13 @@ class ActionRegexProject:
         args = self.args
         pp = RegexProject(args=args, llm=self.llm)
         self.pp = pp
-        pp.run()
-        source_code = pp.output()
         if self.llm:
             source_code = build_index_and_filter_files(
-                llm=self.llm, args=args, sources=pp.sources
+                llm=self.llm, args=args, sources=pp.iter_sources()
             )
+        else:
+            pp.run()
+            source_code = pp.output()
         self.process_content(source_code)
 
     def process_content(self, content: str):
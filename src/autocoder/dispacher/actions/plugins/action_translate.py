@@ -5,10 +5,10 @@ from autocoder.common import (
     split_code_into_segments,
 )
 from autocoder.suffixproject import SuffixProject
+from autocoder.utils.rate_limiter import estimate_tokens, get_rate_limiter_for_llm
 from typing import Optional
 import byzerllm
 import os
-import time
 from loguru import logger
 from prompt_toolkit import prompt
 from prompt_toolkit.shortcuts import confirm, radiolist_dialog
@@ -173,11 +173,14 @@ class ActionTranslate:
                     lang=translate_args.target_lang,
                     instruction=args.query,
                 )
-                t = self.llm.chat_oai(
-                    conversations=[{"role": "user", "content": content}]
+                limiter = get_rate_limiter_for_llm(self.llm, args)
+                t = limiter.call(
+                    lambda: self.llm.chat_oai(
+                        conversations=[{"role": "user", "content": content}]
+                    ),
+                    tokens=estimate_tokens(content) if limiter.tpm else 0,
                 )
                 temp_result.append(get_translate_part(t[0].output))
-                time.sleep(args.anti_quota_limit)
                 segment_count += 1
                 print(
                     f"Translated {segment_count}({len(content)}) of {len(segments)} segments from {source.module_name}",
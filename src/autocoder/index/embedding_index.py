@@ -0,0 +1,214 @@
+import os
+import re
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from autocoder.utils.rate_limiter import (
+    estimate_tokens,
+    get_rate_limiter,
+    get_rate_limiter_for_llm,
+    is_rate_limit_error,
+)
+
+EMBEDDING_DB_NAME = "embedding_index.db"
+
+# 输入一批文本，返回同样数量的向量
+EmbedFunction = Callable[[List[str]], List[List[float]]]
+
+WORD_PATTERN = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z0-9]+|[一-鿿]")
+
+
+def byzerllm_embed_function(llm, args=None) -> EmbedFunction:
+    """
+    使用 byzerllm 的 emb 模型计算向量。
+    一批文本优先在一次请求中计算，客户端不支持批量时退回逐条请求；
+    所有请求都经过该模型共享的限流器，遇到限流错误时退避重试。
+    """
+    if args is not None:
+        limiter = get_rate_limiter_for_llm(llm, args)
+    else:
+        limiter = get_rate_limiter(getattr(llm, "default_model_name", None) or "default")
+    state = {"batch": True}
+
+    def run(func, texts: List[str]):
+        tokens = estimate_tokens(*texts) if limiter.tpm else 0
+        return limiter.call(func, tokens=tokens)
+
+    def embed(texts: List[str]) -> List[List[float]]:
+        if state["batch"] and len(texts) > 1:
+            try:
+                responses = run(lambda: llm.emb_query(texts), texts)
+                if len(responses) == len(texts):
+                    return [r.output for r in responses]
+                logger.warning(
+                    f"Batch embedding returned {len(responses)} vectors for {len(texts)} texts, "
+                    "falling back to one request per text"
+                )
+            except Exception as e:
+                if is_rate_limit_error(e):
+                    raise
+                logger.warning(
+                    f"Batch embedding is not supported, falling back to one request per text: {e}"
+                )
+            state["batch"] = False
+        return [
+            run(lambda text=text: llm.emb_query(text)[0].output, [text])
+            for text in texts
+        ]
+
+    return embed
+
+
+def hashing_embed_function(dim: int = 512) -> EmbedFunction:
+    """
+    不依赖模型的本地实现：把标识符按驼峰/下划线拆成词后做特征哈希。
+    用于测试以及没有配置 emb_model 的场景，效果接近按词的相似度检索。
+    """
+
+    def embed(texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for text in texts:
+            vector = [0.0] * dim
+            for word in WORD_PATTERN.findall(text):
+                h = int(hashlib.md5(word.lower().encode("utf-8")).hexdigest(), 16)
+                vector[h % dim] += 1.0
+            vectors.append(vector)
+        return vectors
+
+    return embed
+
+
+def item_to_text(module_name: str, item: Dict[str, Any]) -> str:
+    return f"{module_name}\n{item.get('symbols') or ''}"
+
+
+class EmbeddingIndex:
+    """
+    .auto-coder 下基于文件路径和符号信息的向量索引（SQLite）。
+
+    每个文件一行，记录 md5 和计算向量所用的模型，只有内容或模型变化的文件才重新计算。
+    查询时在内存中用归一化后的矩阵做一次乘法得到余弦相似度，不需要调用大模型。
+    """
+
+    def __init__(
+        self,
+        index_dir: str,
+        embed_function: EmbedFunction,
+        model_name: str,
+        batch_size: int = 32,
+    ):
+        self.db_path = os.path.join(index_dir, EMBEDDING_DB_NAME)
+        self.embed_function = embed_function
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self._matrix: Optional[Tuple[List[str], np.ndarray]] = None
+        if not os.path.exists(index_dir):
+            os.makedirs(index_dir)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    module_name TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    md5 TEXT NOT NULL,
+                    vector BLOB NOT NULL
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.asarray(self.embed_function(texts), dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(texts):
+            raise ValueError(
+                f"Embedding function returned shape {vectors.shape} for {len(texts)} texts"
+            )
+        return vectors
+
+    def update(self, index_data: Dict[str, Dict[str, Any]]) -> int:
+        """与代码索引同步：补齐新增/变化的文件，删除已经不存在的文件。返回重新计算的文件数"""
+        with self.lock:
+            with self._connect() as conn:
+                rows = conn.execute("SELECT module_name, model, md5 FROM embeddings").fetchall()
+            existing = {module_name: (model, md5) for module_name, model, md5 in rows}
+
+            stale = [m for m in existing if m not in index_data]
+            missing = [
+                module_name
+                for module_name, item in index_data.items()
+                if existing.get(module_name) != (self.model_name, item.get("md5"))
+            ]
+
+            for i in range(0, len(missing), self.batch_size):
+                batch = missing[i : i + self.batch_size]
+                vectors = self._embed(
+                    [item_to_text(m, index_data[m]) for m in batch]
+                )
+                with self._connect() as conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO embeddings (module_name, model, md5, vector) VALUES (?, ?, ?, ?)",
+                        [
+                            (m, self.model_name, index_data[m].get("md5"), v.tobytes())
+                            for m, v in zip(batch, vectors)
+                        ],
+                    )
+            if stale:
+                with self._connect() as conn:
+                    conn.executemany(
+                        "DELETE FROM embeddings WHERE module_name = ?",
+                        [(m,) for m in stale],
+                    )
+            if missing or stale:
+                self._matrix = None
+            if missing:
+                logger.info(f"Computed embeddings for {len(missing)} files")
+            return len(missing)
+
+    def _load_matrix(self) -> Tuple[List[str], np.ndarray]:
+        with self.lock:
+            if self._matrix is None:
+                with self._connect() as conn:
+                    rows = conn.execute(
+                        "SELECT module_name, vector FROM embeddings WHERE model = ? ORDER BY module_name",
+                        (self.model_name,),
+                    ).fetchall()
+                module_names = [r[0] for r in rows]
+                if rows:
+                    matrix = np.stack([np.frombuffer(r[1], dtype=np.float32) for r in rows])
+                    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                    matrix = matrix / np.where(norms == 0, 1, norms)
+                else:
+                    matrix = np.zeros((0, 0), dtype=np.float32)
+                self._matrix = (module_names, matrix)
+            return self._matrix
+
+    def search(self, query: str, top_k: int = 20) -> List[Tuple[str, float]]:
+        """返回与 query 最相似的 top_k 个文件 [(文件, 相似度)]，相似度从高到低"""
+        module_names, matrix = self._load_matrix()
+        if not module_names or top_k <= 0:
+            return []
+        query_vector = self._embed([query])[0]
+        norm = np.linalg.norm(query_vector)
+        if norm == 0:
+            return []
+        scores = matrix @ (query_vector / norm)
+        k = min(top_k, len(module_names))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(module_names[i], float(scores[i])) for i in top]
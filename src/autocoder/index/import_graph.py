@@ -0,0 +1,239 @@
+import os
+import re
+import json
+import hashlib
+import sys
+import posixpath
+from collections import deque
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from loguru import logger
+from autocoder.index.symbols_utils import extract_symbols
+
+GRAPH_VERSION = 1
+
+PY_EXTS = (".py", ".pyi")
+JS_TS_EXTS = (".ts", ".tsx", ".js", ".jsx", ".mjs", ".cjs")
+
+PY_FROM_IMPORT_PATTERN = re.compile(r"^\s*from\s+(\.*)([\w.]*)\s+import\s+(.+)$")
+PY_IMPORT_PATTERN = re.compile(r"^\s*import\s+(.+)$")
+STDLIB_MODULES = set(getattr(sys, "stdlib_module_names", ()))
+JS_MODULE_PATTERN = re.compile(r"""(?:from\s*|require\(\s*|^\s*import\s+)['"]([^'"]+)['"]""")
+
+
+def _normalize(path: str) -> str:
+    return path.replace("\\", "/")
+
+
+class ImportGraph:
+    """
+    基于索引中的导入语句构建的文件依赖图。
+
+    只把能对应到项目内文件的导入当作边。第三方库的导入会被忽略；
+    看起来属于项目内部（顶层包名出现在项目中或者是相对导入）却找不到对应文件的导入，
+    会被记录为 unresolved，交给调用方决定是否用大模型兜底。
+    """
+
+    def __init__(self, index_data: Dict[str, Dict[str, Any]]):
+        self.signature = self.compute_signature(index_data)
+        self.edges: Dict[str, List[str]] = {}
+        self.unresolved: Dict[str, List[str]] = {}
+
+        self.files = {_normalize(m): m for m in index_data.keys()}
+        self.py_modules: Dict[str, List[str]] = {}
+        self.py_top_level: Set[str] = set()
+        for module_name in index_data.keys():
+            if module_name.endswith(PY_EXTS):
+                self._register_py_module(module_name)
+
+        for module_name, item in index_data.items():
+            statements = extract_symbols(item.get("symbols") or "").import_statements
+            edges, unresolved = self._resolve_imports(module_name, statements)
+            if edges:
+                self.edges[module_name] = edges
+            if unresolved:
+                self.unresolved[module_name] = unresolved
+
+    @staticmethod
+    def compute_signature(index_data: Dict[str, Dict[str, Any]]) -> str:
+        h = hashlib.md5()
+        for module_name in sorted(index_data.keys()):
+            h.update(f"{module_name}\0{index_data[module_name].get('md5', '')}\n".encode("utf-8"))
+        return h.hexdigest()
+
+    def _register_py_module(self, module_name: str):
+        parts = _normalize(os.path.splitext(module_name)[0]).strip("/").split("/")
+        if parts[-1] == "__init__":
+            parts = parts[:-1]
+        # 不知道源码根目录在哪一层，所以登记所有后缀：a.b.c、b.c、c
+        for i in range(len(parts)):
+            dotted = ".".join(parts[i:])
+            if dotted:
+                self.py_modules.setdefault(dotted, []).append(module_name)
+        if len(parts) > 1:
+            self.py_top_level.update(parts[:-1])
+
+    def _lookup_py(self, dotted: str) -> List[str]:
+        top_level = dotted.split(".")[0]
+        # 标准库的导入不要误匹配到项目里同名的文件，例如 types.py、json.py
+        if top_level in STDLIB_MODULES and top_level not in self.py_top_level:
+            return []
+        return self.py_modules.get(dotted, [])
+
+    def _resolve_python(self, module_name: str, statement: str) -> Tuple[List[str], bool]:
+        """返回 (对应的文件, 是否是项目内部但没解析出来的导入)"""
+        statement = statement.split("#")[0].strip()
+        m = PY_FROM_IMPORT_PATTERN.match(statement)
+        if m:
+            dots, base, names = m.group(1), m.group(2), m.group(3)
+            names = [
+                n.strip().split(" as ")[0].strip()
+                for n in names.strip("() ").split(",")
+                if n.strip()
+            ]
+            if dots:
+                package = posixpath.dirname(_normalize(module_name))
+                for _ in range(len(dots) - 1):
+                    package = posixpath.dirname(package)
+                base_path = posixpath.join(package, *base.split(".")) if base else package
+                targets = []
+                for name in names:
+                    for candidate in (posixpath.join(base_path, name), base_path):
+                        found = self._lookup_path(candidate, PY_EXTS, "__init__")
+                        if found:
+                            targets.append(found)
+                            break
+                return targets, not targets
+
+            targets = []
+            for name in names:
+                found = self._lookup_py(f"{base}.{name}") or self._lookup_py(base)
+                targets.extend(found)
+            internal = base.split(".")[0] in self.py_top_level
+            return targets, internal and not targets
+
+        m = PY_IMPORT_PATTERN.match(statement)
+        if m:
+            targets = []
+            internal = False
+            for name in m.group(1).split(","):
+                dotted = name.strip().split(" as ")[0].strip()
+                if not dotted:
+                    continue
+                found = self._lookup_py(dotted)
+                targets.extend(found)
+                internal = internal or (
+                    not found and dotted.split(".")[0] in self.py_top_level
+                )
+            return targets, internal
+        return [], False
+
+    def _lookup_path(self, path: str, exts: Tuple[str, ...], index_name: str) -> Optional[str]:
+        path = posixpath.normpath(path)
+        candidates = [path] + [path + ext for ext in exts]
+        candidates += [posixpath.join(path, index_name + ext) for ext in exts]
+        for candidate in candidates:
+            if candidate in self.files:
+                return self.files[candidate]
+        return None
+
+    def _resolve_js(self, module_name: str, statement: str) -> Tuple[List[str], bool]:
+        m = JS_MODULE_PATTERN.search(statement)
+        if not m:
+            return [], False
+        spec = m.group(1)
+        if not spec.startswith("."):
+            # 第三方包或别名路径
+            return [], False
+        base = posixpath.join(posixpath.dirname(_normalize(module_name)), spec)
+        found = self._lookup_path(base, JS_TS_EXTS, "index")
+        return ([found] if found else []), not found
+
+    def _resolve_imports(
+        self, module_name: str, statements: List[str]
+    ) -> Tuple[List[str], List[str]]:
+        edges: List[str] = []
+        unresolved: List[str] = []
+        is_python = module_name.endswith(PY_EXTS)
+        for statement in statements:
+            if not statement:
+                continue
+            if is_python:
+                targets, missing = self._resolve_python(module_name, statement)
+            else:
+                targets, missing = self._resolve_js(module_name, statement)
+            edges.extend(t for t in targets if t != module_name)
+            if missing:
+                unresolved.append(statement)
+        return list(dict.fromkeys(edges)), unresolved
+
+    def related_files(
+        self,
+        file_paths: List[str],
+        depth: int = 1,
+        max_fanout: int = 20,
+        max_files: int = 50,
+    ) -> List[Tuple[str, str]]:
+        """
+        从 file_paths 出发沿导入关系做广度优先遍历，返回 [(文件, 原因)]，不包含起点本身。
+        max_fanout 限制每个文件最多展开多少个依赖，max_files 限制返回总数。
+        """
+        start = list(file_paths)
+        visited = set(start)
+        result: List[Tuple[str, str]] = []
+        queue = deque((f, 0) for f in start)
+        while queue and len(result) < max_files:
+            current, level = queue.popleft()
+            if level >= depth:
+                continue
+            for target in self.edges.get(current, [])[:max_fanout]:
+                if target in visited:
+                    continue
+                visited.add(target)
+                result.append((target, f"imported by {current}"))
+                if len(result) >= max_files:
+                    break
+                queue.append((target, level + 1))
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": GRAPH_VERSION,
+            "signature": self.signature,
+            "edges": self.edges,
+            "unresolved": self.unresolved,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ImportGraph":
+        graph = cls.__new__(cls)
+        graph.signature = data["signature"]
+        graph.edges = data["edges"]
+        graph.unresolved = data["unresolved"]
+        return graph
+
+    @classmethod
+    def load_or_build(
+        cls, index_data: Dict[str, Dict[str, Any]], graph_file: str
+    ) -> "ImportGraph":
+        """索引内容（文件列表和 md5）没有变化时直接读取持久化的图，否则重新构建并保存"""
+        signature = cls.compute_signature(index_data)
+        if os.path.exists(graph_file):
+            try:
+                with open(graph_file, "r") as f:
+                    data = json.load(f)
+                if data.get("version") == GRAPH_VERSION and data.get("signature") == signature:
+                    return cls.from_dict(data)
+            except Exception as e:
+                logger.warning(f"Failed to load import graph {graph_file}: {e}")
+
+        graph = cls(index_data)
+        tmp_file = graph_file + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(graph.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_file, graph_file)
+        logger.info(
+            f"Built import graph: {len(graph.edges)} files with internal imports, "
+            f"{len(graph.unresolved)} files with unresolved imports"
+        )
+        return graph
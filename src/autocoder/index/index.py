@@ -1,7 +1,7 @@
 import os
 import json
 import time
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Optional
 from datetime import datetime
 from autocoder.common import SourceCode, AutoCoderArgs
 from autocoder.index.symbols_utils import (
@@ -9,8 +9,23 @@ from autocoder.index.symbols_utils import (
     SymbolsInfo,
     SymbolType,
     symbols_info_to_str,
+    symbols_info_to_text,
+    merge_symbols_texts,
 )
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from autocoder.index.local_symbols import extract_symbols_locally
+from autocoder.index.index_store import IndexStore
+from autocoder.index.symbol_index import SymbolIndex
+from autocoder.index.import_graph import ImportGraph
+from autocoder.index.embedding_index import (
+    EmbedFunction,
+    EmbeddingIndex,
+    byzerllm_embed_function,
+    hashing_embed_function,
+)
+from autocoder.rag.relevance_cache import RelevanceCache
+from autocoder.utils.rate_limiter import estimate_tokens, get_rate_limiter_for_llm
+from autocoder.common.buildin_tokenizer import BuildinTokenizer
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 import threading
 
 import pydantic
@@ -38,6 +53,14 @@ class IndexItem(pydantic.BaseModel):
     md5: str  # 新增文件内容的MD5哈希值字段
 
 
+class IndexChunkPlan(pydantic.BaseModel):
+    """超长文件需要分块交给大模型抽取符号时的待办信息"""
+    module_name: str
+    md5: str
+    chunks: List[str]
+    start_time: float
+
+
 class TargetFile(pydantic.BaseModel):
     file_path: str
     reason: str = pydantic.Field(
@@ -56,15 +79,12 @@ class FileList(pydantic.BaseModel):
 
 class IndexManager:
     def __init__(
-        self, llm: byzerllm.ByzerLLM, sources: List[SourceCode], args: AutoCoderArgs
+        self, llm: byzerllm.ByzerLLM, sources: Iterable[SourceCode], args: AutoCoderArgs
     ):
+        # sources 也可以是边加载边产出的迭代器，build_index 会在消费完之后把它替换成列表
         self.sources = sources
         self.source_dir = args.source_dir
-        self.anti_quota_limit = (
-            args.index_model_anti_quota_limit or args.anti_quota_limit
-        )
         self.index_dir = os.path.join(self.source_dir, ".auto-coder")
-        self.index_file = os.path.join(self.index_dir, "index.json")
         if llm and (s := llm.get_sub_client("index_model")):
             self.index_llm = s
         else:
@@ -80,6 +100,19 @@ class IndexManager:
         if not os.path.exists(self.index_dir):
             os.makedirs(self.index_dir)
 
+        # 索引存储在 SQLite 中，旧的 index.json 会被自动迁移
+        self.index_store = IndexStore(self.index_dir)
+        self._index_items_cache = None
+        self._symbol_index_cache = None
+        self._import_graph_cache = None
+        self._verify_relevance_cache = None
+        self._embedding_index = None
+        # 向量索引最近一次同步时代码索引的版本号
+        self._embedding_index_version = None
+        # 可以替换成自定义的向量函数，此时需要同时设置 embed_model_name
+        self.embed_function: Optional[EmbedFunction] = None
+        self.embed_model_name: Optional[str] = None
+
     @byzerllm.prompt()
     def verify_file_relevance(self, file_content: str, query: str) -> str:
         """
@@ -102,6 +135,66 @@ class IndexManager:
         ```
         """
 
+    def _run_llm(self, llm, func, *texts):
+        """在该模型共享的限流器下调用大模型，texts 用于估算请求的 token 数"""
+        limiter = get_rate_limiter_for_llm(
+            llm, self.args, anti_quota_option="index_model_anti_quota_limit"
+        )
+        tokens = estimate_tokens(*texts) if limiter.tpm else 0
+        return limiter.call(func, tokens=tokens)
+
+    def get_verify_relevance_cache(self) -> Optional[RelevanceCache]:
+        if self.args.disable_verify_relevance_cache:
+            return None
+        if self._verify_relevance_cache is None:
+            # key 中已经包含文件内容的 md5，内容变化后自然不会命中，所以不设置过期时间，
+            # 只按最近访问时间淘汰，限制磁盘占用
+            self._verify_relevance_cache = RelevanceCache(
+                os.path.join(self.index_dir, "verify_relevance_cache.db"),
+                ttl=0,
+                max_entries=self.args.verify_relevance_cache_max_entries,
+            )
+        return self._verify_relevance_cache
+
+    def verify_file_relevance_with_cache(
+        self, llm, file_content: str, query: str
+    ) -> VerifyFileRelevance:
+        """
+        带缓存的 verify_file_relevance，缓存 key 为 (归一化后的 query, 文件内容 md5, 模型名)。
+        同一个问题重复执行（例如合并失败后重试）时不会再次调用大模型。
+        """
+        cache = self.get_verify_relevance_cache()
+        model_name = getattr(llm, "default_model_name", None) or ""
+        conversations = [{"role": "user", "content": query}]
+        file_md5 = hashlib.md5(file_content.encode("utf-8")).hexdigest()
+
+        if cache is not None:
+            v = cache.get("verify_file_relevance", conversations, file_md5, model_name)
+            if v is not None:
+                try:
+                    return VerifyFileRelevance(**v)
+                except pydantic.ValidationError:
+                    pass
+
+        result = self._run_llm(
+            llm,
+            lambda: self.verify_file_relevance.with_llm(llm)
+            .with_return_type(VerifyFileRelevance)
+            .run(file_content=file_content, query=query),
+            file_content,
+            query,
+        )
+
+        if cache is not None:
+            cache.put(
+                "verify_file_relevance",
+                conversations,
+                file_md5,
+                model_name,
+                result.model_dump(),
+            )
+        return result
+
     @byzerllm.prompt()
     def _get_related_files(self, indices: str, file_paths: str) -> str:
         """
@@ -195,6 +288,46 @@ class IndexManager:
         ## 输出
         """
 
+    @byzerllm.prompt()
+    def get_file_usage(self, path: str, symbols: str, code: str) -> str:
+        """
+        下面是文件 {{ path }} 的符号信息以及开头部分的源码：
+
+        {{ symbols }}
+
+        {{ code }}
+
+        请用一句话描述这个文件的用途，不超过100字符。直接输出这句话，不要输出其他内容。
+        """
+
+    def build_local_symbols(self, source: SourceCode) -> Optional[str]:
+        """
+        用本地解析器抽取符号，只在没有文档字符串可用时才让大模型补充“用途”。
+        不支持的语言或者解析失败时返回 None。
+        """
+        if self.args.disable_local_symbols_extraction:
+            return None
+        info = extract_symbols_locally(source.module_name, source.source_code)
+        if info is None:
+            return None
+
+        if not info.usage and self.args.index_symbols_usage_from_llm:
+            try:
+                code = source.source_code[: self.args.index_symbols_usage_code_length]
+                usage = self._run_llm(
+                    self.index_llm,
+                    lambda: self.get_file_usage.with_llm(self.index_llm).run(
+                        source.module_name, symbols_info_to_text(info), code
+                    ),
+                    code,
+                )
+                usage = " ".join(usage.strip().splitlines()[:1])
+                info.usage = usage.replace("用途：", "", 1).strip()[:100]
+            except Exception as e:
+                logger.warning(f"Failed to get usage of {source.module_name}: {e}")
+
+        return symbols_info_to_text(info)
+
     def split_text_into_chunks(self, text, max_chunk_size=4096):
         lines = text.split("\n")
         chunks = []
@@ -212,7 +345,32 @@ class IndexManager:
             chunks.append("\n".join(current_chunk))
         return chunks
 
-    def build_index_for_single_source(self, source: SourceCode):
+    def get_chunk_symbols(self, module_name: str, chunk: str) -> str:
+        return self._run_llm(
+            self.index_llm,
+            lambda: self.get_all_file_symbols.with_llm(
+                self.index_llm).run(module_name, chunk),
+            chunk,
+        )
+
+    def _make_index_item(self, module_name: str, md5: str, symbols: str, start_time: float):
+        logger.info(
+            f"Parse and update index for {module_name} md5: {md5} took {time.monotonic() - start_time:.2f}s"
+        )
+        return {
+            "module_name": module_name,
+            "symbols": symbols,
+            "last_modified": os.path.getmtime(module_name),
+            "md5": md5,
+        }
+
+    def build_index_for_single_source(self, source: SourceCode, defer_chunks: bool = False):
+        """
+        构建单个文件的索引条目。
+
+        defer_chunks 为 True 时，超长文件不在这里逐块调用大模型，而是返回 IndexChunkPlan，
+        由 build_index 把各个分块提交到同一个线程池并发抽取，再用 merge_symbols_texts 合并。
+        """
         file_path = source.module_name
         if not os.path.exists(file_path):
             return None
@@ -229,46 +387,38 @@ class IndexManager:
         try:
             start_time = time.monotonic()
             source_code = source.source_code
-            if len(source.source_code) > self.max_input_length:
+            # 优先使用本地解析，不支持的语言才交给大模型抽取全部符号
+            symbols = self.build_local_symbols(source)
+            if symbols is not None:
+                logger.info(f"Extracted symbols of {file_path} locally")
+            elif len(source.source_code) > self.max_input_length:
                 logger.warning(
                     f"Warning[Build Index]: The length of source code({source.module_name}) is too long ({len(source.source_code)}) > model_max_input_length({self.max_input_length}), splitting into chunks..."
                 )
                 chunks = self.split_text_into_chunks(
                     source_code, self.max_input_length - 1000
                 )
-                symbols = []
-                for chunk in chunks:
-                    chunk_symbols = self.get_all_file_symbols.with_llm(
-                        self.index_llm).run(source.module_name, chunk)
-                    time.sleep(self.anti_quota_limit)
-                    symbols.append(chunk_symbols)
-                symbols = "\n".join(symbols)
+                if defer_chunks:
+                    return IndexChunkPlan(
+                        module_name=file_path,
+                        md5=md5,
+                        chunks=chunks,
+                        start_time=start_time,
+                    )
+                symbols = merge_symbols_texts(
+                    [self.get_chunk_symbols(file_path, chunk) for chunk in chunks]
+                )
             else:
-                symbols = self.get_all_file_symbols.with_llm(
-                    self.index_llm).run(source.module_name, source_code)
-                time.sleep(self.anti_quota_limit)
+                symbols = self.get_chunk_symbols(file_path, source_code)
 
-            logger.info(
-                f"Parse and update index for {file_path} md5: {md5} took {time.monotonic() - start_time:.2f}s"
-            )
+            return self._make_index_item(file_path, md5, symbols, start_time)
 
         except Exception as e:
             logger.warning(f"Error: {e}")
             return None
 
-        return {
-            "module_name": source.module_name,
-            "symbols": symbols,
-            "last_modified": os.path.getmtime(file_path),
-            "md5": md5,
-        }
-
     def build_index(self):
-        if os.path.exists(self.index_file):
-            with open(self.index_file, "r") as file:
-                index_data = json.load(file)
-        else:
-            index_data = {}
+        index_data = dict(self.index_store.read_all())
 
         @byzerllm.prompt()
         def error_message(source_dir: str, file_path: str):
@@ -285,11 +435,17 @@ class IndexManager:
                 break
 
         updated_sources = []
+        # 每完成一批文件就写入一次，中途退出也不会丢失已经构建好的索引
+        pending_items = []
 
         with ThreadPoolExecutor(max_workers=self.args.index_build_workers) as executor:
 
-            wait_to_build_files = []
+            # future -> (IndexChunkPlan, 分块序号)；普通文件的 future 对应 None
+            pending = {}
+            # 源码可能还在加载中，每拿到一个文件就计算 md5 并立即提交，不等全部加载完成
+            loaded_sources = []
             for source in self.sources:
+                loaded_sources.append(source)
                 source_code = source.source_code
                 if self.args.auto_merge == "strict_diff":
                     v = source.source_code.splitlines()
@@ -297,52 +453,105 @@ class IndexManager:
                     for line in v:
                         new_v.append(line[line.find(":"):])
                     source_code = "\n".join(new_v)
-
-                md5 = hashlib.md5(source_code.encode("utf-8")).hexdigest()
+                    md5 = hashlib.md5(source_code.encode("utf-8")).hexdigest()
+                else:
+                    # 源码快照中没有变化的文件直接复用上次的内容哈希
+                    md5 = source.metadata.get("md5") or hashlib.md5(
+                        source_code.encode("utf-8")
+                    ).hexdigest()
                 if (
                     source.module_name not in index_data
                     or index_data[source.module_name]["md5"] != md5
                 ):
-                    wait_to_build_files.append(source)
+                    future = executor.submit(self.build_index_for_single_source, source, True)
+                    pending[future] = None
+            self.sources = loaded_sources
 
             counter = 0
-            num_files = len(wait_to_build_files)
+            num_files = len(pending)
             total_files = len(self.sources)
             logger.info(
                 f"Total Files: {total_files}, Need to Build Index: {num_files}")
 
-            futures = [
-                executor.submit(self.build_index_for_single_source, source)
-                for source in wait_to_build_files
-            ]
-            for future in as_completed(futures):
-                result = future.result()
+            # module_name -> 各分块的符号信息，还没有完成的分块为 None
+            chunk_results: Dict[str, List[Optional[str]]] = {}
+
+            def collect_results():
+                while pending:
+                    done, _ = wait(pending.keys(), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        chunk_info = pending.pop(future)
+                        if chunk_info is None:
+                            result = future.result()
+                            if isinstance(result, IndexChunkPlan):
+                                # 超长文件的各个分块和其他文件一起在同一个线程池中并发处理
+                                chunk_results[result.module_name] = [None] * len(result.chunks)
+                                for i, chunk in enumerate(result.chunks):
+                                    f = executor.submit(
+                                        self.get_chunk_symbols, result.module_name, chunk
+                                    )
+                                    pending[f] = (result, i)
+                                continue
+                            yield result
+                            continue
+
+                        plan, i = chunk_info
+                        results = chunk_results.get(plan.module_name)
+                        if results is None:
+                            # 同一个文件的其他分块已经失败
+                            continue
+                        try:
+                            results[i] = future.result() or ""
+                        except Exception as e:
+                            logger.warning(f"Error: {e}")
+                            chunk_results.pop(plan.module_name)
+                            yield None
+                            continue
+                        if all(r is not None for r in results):
+                            chunk_results.pop(plan.module_name)
+                            try:
+                                yield self._make_index_item(
+                                    plan.module_name,
+                                    plan.md5,
+                                    merge_symbols_texts(results),
+                                    plan.start_time,
+                                )
+                            except Exception as e:
+                                logger.warning(f"Error: {e}")
+                                yield None
+
+            for result in collect_results():
                 if result is not None:
                     counter += 1
                     logger.info(f"Building Index:{counter}/{num_files}...")
                     module_name = result["module_name"]
                     index_data[module_name] = result
                     updated_sources.append(module_name)
+                    pending_items.append(result)
+                    if len(pending_items) >= 50:
+                        self.index_store.upsert(pending_items)
+                        pending_items = []
 
-        if updated_sources:
-            with open(self.index_file, "w") as file:
-                json.dump(index_data, file, ensure_ascii=False, indent=2)
+        if pending_items:
+            self.index_store.upsert(pending_items)
+
+        if self.args.index_embedding_top_k > 0:
+            # 构建索引时顺便补齐向量，查询时不再需要计算
+            try:
+                self.get_embedding_index()
+            except Exception as e:
+                logger.warning(f"Failed to update embedding index: {e}")
 
         return index_data
 
     def read_index_as_str(self):
-        if not os.path.exists(self.index_file):
-            return []
-
-        with open(self.index_file, "r") as file:
-            return file.read()
+        return self.index_store.to_json()
 
     def read_index(self) -> List[IndexItem]:
-        if not os.path.exists(self.index_file):
-            return []
-
-        with open(self.index_file, "r") as file:
-            index_data = json.load(file)
+        # read_all 在索引没有变化时返回同一个缓存对象，可以直接复用上次构造的 IndexItem
+        index_data = self.index_store.read_all()
+        if self._index_items_cache is not None and self._index_items_cache[0] is index_data:
+            return self._index_items_cache[1]
 
         index_items = []
         for module_name, data in index_data.items():
@@ -354,8 +563,44 @@ class IndexManager:
             )
             index_items.append(index_item)
 
+        self._index_items_cache = (index_data, index_items)
         return index_items
 
+    def count_tokens_batch(self, texts: List[str]) -> List[int]:
+        try:
+            tokenizer = BuildinTokenizer().tokenizer
+            encoded = tokenizer.encode_batch(
+                ['{"role":"user","content":"' + text + '"}' for text in texts]
+            )
+            return [len(e.ids) for e in encoded]
+        except Exception as e:
+            logger.warning(f"Failed to use tokenizer to count tokens, fallback to len(): {e}")
+            return [len(text) for text in texts]
+
+    def _get_item_tokens(
+        self, index_items: List[IndexItem], item_strs: List[str], variant: str
+    ) -> List[int]:
+        """索引条目的 token 数按 (文件, 渲染方式) 缓存在索引库中，只有 md5 变化的条目才重新计算"""
+        cached = self.index_store.get_item_tokens(variant)
+        tokens = [0] * len(index_items)
+        missing = []
+        for i, item in enumerate(index_items):
+            hit = cached.get(item.module_name)
+            if hit is not None and hit[0] == item.md5:
+                tokens[i] = hit[1]
+            else:
+                missing.append(i)
+
+        if missing:
+            counts = self.count_tokens_batch([item_strs[i] for i in missing])
+            for i, count in zip(missing, counts):
+                tokens[i] = count
+            self.index_store.put_item_tokens(
+                variant,
+                [(index_items[i].module_name, index_items[i].md5, tokens[i]) for i in missing],
+            )
+        return tokens
+
     def _get_meta_str(
         self,
         max_chunk_size=4096,
@@ -366,18 +611,39 @@ class IndexManager:
         current_chunk = []
         current_size = 0
 
-        if max_chunk_size == -1:
-            for item in index_items:
-                symbols_str = item.symbols
-                if includes:
-                    symbol_info = extract_symbols(symbols_str)
-                    symbols_str = symbols_info_to_str(symbol_info, includes)
-
-                item_str = f"##{item.module_name}\n{symbols_str}\n\n"
-
-                if skip_symbols:
-                    item_str = f"{item.module_name}\n"
+        item_strs = []
+        for item in index_items:
+            if skip_symbols:
+                item_strs.append(f"{item.module_name}\n")
+                continue
+            symbols_str = item.symbols
+            if includes:
+                symbol_info = extract_symbols(symbols_str)
+                symbols_str = symbols_info_to_str(symbol_info, includes)
+            item_strs.append(f"##{item.module_name}\n{symbols_str}\n\n")
+
+        if max_chunk_size == -1 and self.args.filter_batch_token_ratio > 0:
+            ## 按 token 打包：每批尽量填满索引模型上下文的 filter_batch_token_ratio
+            token_budget = int(self.max_input_length * self.args.filter_batch_token_ratio)
+            if skip_symbols:
+                variant = "skip_symbols"
+            elif includes:
+                variant = ",".join(t.value for t in includes)
+            else:
+                variant = "all"
+            item_tokens = self._get_item_tokens(index_items, item_strs, variant)
+            for item_str, tokens in zip(item_strs, item_tokens):
+                if current_chunk and current_size + tokens > token_budget:
+                    yield "".join(current_chunk)
+                    current_chunk = []
+                    current_size = 0
+                current_chunk.append(item_str)
+                current_size += tokens
 
+            if current_chunk:
+                yield "".join(current_chunk)
+        elif max_chunk_size == -1:
+            for item_str in item_strs:
                 if len(current_chunk) > self.args.filter_batch_size:
                     yield "".join(current_chunk)
                     current_chunk = [item_str]
@@ -387,16 +653,7 @@ class IndexManager:
             if current_chunk:
                 yield "".join(current_chunk)
         else:
-            for item in index_items:
-                symbols_str = item.symbols
-                if includes:
-                    symbol_info = extract_symbols(symbols_str)
-                    symbols_str = symbols_info_to_str(symbol_info, includes)
-
-                item_str = f"##{item.module_name}\n{symbols_str}\n\n"
-
-                if skip_symbols:
-                    item_str = f"{item.module_name}\n"
+            for item_str in item_strs:
                 item_size = len(item_str)
 
                 if current_size + item_size > max_chunk_size:
@@ -410,13 +667,55 @@ class IndexManager:
             if current_chunk:
                 yield "".join(current_chunk)
 
+    def get_import_graph(self) -> ImportGraph:
+        index_data = self.index_store.read_all()
+        if self._import_graph_cache is None or self._import_graph_cache[0] is not index_data:
+            graph = ImportGraph.load_or_build(
+                index_data, os.path.join(self.index_dir, "import_graph.json")
+            )
+            self._import_graph_cache = (index_data, graph)
+        return self._import_graph_cache[1]
+
     def get_related_files(self, file_paths: List[str]):
+        if self.args.disable_import_graph:
+            return self.get_related_files_by_llm(file_paths)
+
+        graph = self.get_import_graph()
+        related = graph.related_files(
+            file_paths,
+            depth=self.args.index_related_files_depth,
+            max_fanout=self.args.index_related_files_max_fanout,
+            max_files=self.args.index_related_files_max_files,
+        )
+        all_results = [
+            TargetFile(file_path=file_path, reason=reason)
+            for file_path, reason in related
+        ]
+
+        # 只有存在无法在本地解析的项目内导入时才用大模型兜底
+        unresolved_files = [f for f in file_paths if graph.unresolved.get(f)]
+        logger.info(
+            f"Import graph found {len(all_results)} related files, "
+            f"{len(unresolved_files)} files have unresolved imports"
+        )
+        if unresolved_files:
+            all_results.extend(self.get_related_files_by_llm(unresolved_files).file_list)
+
+        all_results = list(
+            {file.file_path: file for file in all_results}.values())
+        return FileList(file_list=all_results)
+
+    def get_related_files_by_llm(self, file_paths: List[str]):
         all_results = []
         lock = threading.Lock()
 
         def process_chunk(chunk, chunk_count):
-            result = self._get_related_files.with_llm(self.llm).with_return_type(
-                FileList).run(chunk, "\n".join(file_paths))
+            result = self._run_llm(
+                self.llm,
+                lambda: self._get_related_files.with_llm(self.llm).with_return_type(
+                    FileList).run(chunk, "\n".join(file_paths)),
+                chunk,
+            )
             if result is not None:
                 with lock:
                     all_results.extend(result.file_list)
@@ -424,7 +723,6 @@ class IndexManager:
                 logger.warning(
                     f"Fail to find related files for chunk {chunk_count}. This may be caused by the model limit or the query not being suitable for the files."
                 )
-            time.sleep(self.args.anti_quota_limit)
 
         with ThreadPoolExecutor(max_workers=self.args.index_filter_workers) as executor:
             futures = []
@@ -451,8 +749,13 @@ class IndexManager:
 
         def process_chunk(chunk):
             nonlocal completed_threads
-            result = self._get_target_files_by_query.with_llm(
-                self.llm).with_return_type(FileList).run(chunk, query)
+            result = self._run_llm(
+                self.llm,
+                lambda: self._get_target_files_by_query.with_llm(
+                    self.llm).with_return_type(FileList).run(chunk, query),
+                chunk,
+                query,
+            )
             if result is not None:
                 with lock:
                     all_results.extend(result.file_list)
@@ -461,7 +764,6 @@ class IndexManager:
                 logger.warning(
                     f"Fail to find target files for chunk. This is caused by the model response not being in JSON format or the JSON being empty."
                 )
-            time.sleep(self.args.anti_quota_limit)
 
         with ThreadPoolExecutor(max_workers=self.args.index_filter_workers) as executor:
             futures = []
@@ -476,9 +778,95 @@ class IndexManager:
         logger.info(f"Completed {completed_threads}/{total_threads} threads")
         return all_results, total_threads, completed_threads
 
+    def get_symbol_index(self) -> SymbolIndex:
+        index_data = self.index_store.read_all()
+        if self._symbol_index_cache is None or self._symbol_index_cache[0] is not index_data:
+            self._symbol_index_cache = (index_data, SymbolIndex(index_data))
+        return self._symbol_index_cache[1]
+
+    def resolve_query_references(self, query: str):
+        """
+        在本地倒排索引中解析 query 中的 @path/@@symbol 标记。
+
+        返回 (命中的文件, 仍需要交给大模型处理的 query)。
+        所有标记都解析成功且 query 中只有标记时，不再调用大模型；
+        还有自由文本时默认交给大模型继续筛选，index_filter_llm_on_references 为 False 时直接丢弃。
+        """
+        refs, resolved, unresolved = self.get_symbol_index().resolve_query(query)
+        if not refs.file_refs and not refs.symbol_refs:
+            return [], query
+
+        target_files = [
+            TargetFile(file_path=file_path, reason=reason)
+            for file_path, reason in resolved
+        ]
+        logger.info(
+            f"Resolved {len(refs.file_refs) + len(refs.symbol_refs) - len(unresolved)} references locally "
+            f"to {len(target_files)} files, unresolved: {unresolved}"
+        )
+        if unresolved:
+            return target_files, " ".join(unresolved + [refs.text]).strip()
+        if self.args.index_filter_llm_on_references and refs.text:
+            return target_files, refs.text
+        return target_files, None
+
+    def get_embedding_index(self) -> EmbeddingIndex:
+        if self._embedding_index is None:
+            embed_function = self.embed_function
+            model_name = self.embed_model_name or "custom"
+            if embed_function is None:
+                emb_llm = self.llm.get_sub_client("emb_model") if self.llm else None
+                if emb_llm:
+                    embed_function = byzerllm_embed_function(emb_llm, self.args)
+                    model_name = self.args.emb_model
+                else:
+                    logger.warning(
+                        "emb_model is not configured, using local hashing embeddings for file retrieval"
+                    )
+                    embed_function = hashing_embed_function()
+                    model_name = "local-hashing"
+            self._embedding_index = EmbeddingIndex(
+                self.index_dir, embed_function, model_name
+            )
+        # 代码索引没有变化时不需要同步；同步时只会为新增或者内容变化的文件计算向量
+        version = self.index_store.version()
+        if version != self._embedding_index_version:
+            self._embedding_index.update(self.index_store.read_all())
+            self._embedding_index_version = version
+        return self._embedding_index
+
+    def get_target_files_by_embedding(self, query: str) -> List[TargetFile]:
+        """用向量相似度召回 top-K 个候选文件，不调用大模型，结果交给后面的相关性验证阶段"""
+        start_time = time.monotonic()
+        matches = self.get_embedding_index().search(
+            query, top_k=self.args.index_embedding_top_k
+        )
+        logger.info(
+            f"Embedding retrieval found {len(matches)} files in {time.monotonic() - start_time:.2f}s"
+        )
+        return [
+            TargetFile(file_path=module_name, reason=f"Embedding similarity: {score:.3f}")
+            for module_name, score in matches
+        ]
+
     def get_target_files_by_query(self, query: str) -> FileList:
         all_results: List[TargetFile] = []
 
+        resolved_files, query = self.resolve_query_references(query)
+        all_results.extend(resolved_files)
+
+        if query is not None and self.args.index_embedding_top_k > 0:
+            all_results.extend(self.get_target_files_by_embedding(query))
+            if not self.args.index_embedding_with_llm_filter:
+                query = None
+
+        if query is None:
+            all_results = list(
+                {file.file_path: file for file in all_results}.values())
+            if self.args.index_filter_file_num > 0:
+                all_results = all_results[: self.args.index_filter_file_num]
+            return FileList(file_list=all_results)
+
         def w():
             return self._get_meta_str(
                 skip_symbols=False,
@@ -569,12 +957,18 @@ class IndexManager:
 
 
 def build_index_and_filter_files(
-    llm, args: AutoCoderArgs, sources: List[SourceCode]
+    llm, args: AutoCoderArgs, sources: Iterable[SourceCode]
 ) -> str:
+    # sources 可以是边加载边产出的迭代器：需要构建索引时由 build_index 一边读取一边提交索引任务，
+    # 读取完成后再处理 REST/RAG/Search 等来源；否则直接读取成列表
+    streaming = not isinstance(sources, list) and not args.skip_build_index and llm
+    if not streaming:
+        sources = list(sources)
+
     # Initialize timing and statistics
     total_start_time = time.monotonic()
     stats = {
-        "total_files": len(sources),
+        "total_files": 0 if streaming else len(sources),
         "indexed_files": 0,
         "level1_filtered": 0,
         "level2_filtered": 0,
@@ -599,25 +993,38 @@ def build_index_and_filter_files(
 
     final_files: Dict[str, TargetFile] = {}
 
-    # Phase 1: Process REST/RAG/Search sources
-    logger.info("Phase 1: Processing REST/RAG/Search sources...")
-    phase_start = time.monotonic()
-    for source in sources:
-        if source.tag in ["REST", "RAG", "SEARCH"]:
-            final_files[get_file_path(source.module_name)] = TargetFile(
-                file_path=source.module_name, reason="Rest/Rag/Search"
-            )
-    phase_end = time.monotonic()
-    stats["timings"]["process_tagged_sources"] = phase_end - phase_start
+    # 路径 -> SourceCode，同名文件以第一次出现的为准，避免在各阶段里反复遍历 sources
+    sources_by_path: Dict[str, SourceCode] = {}
+
+    def process_tagged_sources():
+        for source in sources:
+            sources_by_path.setdefault(source.module_name, source)
+
+        # Phase 1: Process REST/RAG/Search sources
+        logger.info("Phase 1: Processing REST/RAG/Search sources...")
+        phase_start = time.monotonic()
+        for source in sources:
+            if source.tag in ["REST", "RAG", "SEARCH"]:
+                final_files[get_file_path(source.module_name)] = TargetFile(
+                    file_path=source.module_name, reason="Rest/Rag/Search"
+                )
+        phase_end = time.monotonic()
+        stats["timings"]["process_tagged_sources"] = phase_end - phase_start
+
+    if not streaming:
+        process_tagged_sources()
 
     if not args.skip_build_index and llm:
         # Phase 2: Build index
         if args.request_id and not args.skip_events:
+            # 边加载边构建时文件总数要等加载完成才知道，开始事件里不带，由结束事件给出
             queue_communicate.send_event(
                 request_id=args.request_id,
                 event=CommunicateEvent(
                     event_type=CommunicateEventType.CODE_INDEX_BUILD_START.value,
-                    data=json.dumps({"total_files": len(sources)})
+                    data=json.dumps(
+                        {} if streaming else {"total_files": stats["total_files"]}
+                    )
                 )
             )
 
@@ -629,12 +1036,18 @@ def build_index_and_filter_files(
         phase_end = time.monotonic()
         stats["timings"]["build_index"] = phase_end - phase_start
 
+        if streaming:
+            sources = index_manager.sources
+            stats["total_files"] = len(sources)
+            process_tagged_sources()
+
         if args.request_id and not args.skip_events:
             queue_communicate.send_event(
                 request_id=args.request_id,
                 event=CommunicateEvent(
                     event_type=CommunicateEventType.CODE_INDEX_BUILD_END.value,
                     data=json.dumps({
+                        "total_files": stats["total_files"],
                         "indexed_files": stats["indexed_files"],
                         "build_index_time": stats["timings"]["build_index"],
                     })
@@ -726,30 +1139,29 @@ def build_index_and_filter_files(
                 console.print(table)
 
             def verify_single_file(file: TargetFile):
-                for source in sources:
-                    if source.module_name == file.file_path:
-                        file_content = source.source_code
-                        try:
-                            result = index_manager.verify_file_relevance.with_llm(llm).with_return_type(VerifyFileRelevance).run(
-                                file_content=file_content,
-                                query=args.query
-                            )
-                            if result.relevant_score >= args.verify_file_relevance_score:
-                                verified_files[file.file_path] = TargetFile(
-                                    file_path=file.file_path,
-                                    reason=f"Score:{result.relevant_score}, {result.reason}"
-                                )
-                                return file.file_path, result.relevant_score, "PASS", result.reason
-                            else:
-                                return file.file_path, result.relevant_score, "FAIL", result.reason
-                        except Exception as e:
-                            error_msg = str(e)
-                            verified_files[file.file_path] = TargetFile(
-                                file_path=file.file_path,
-                                reason=f"Verification failed: {error_msg}"
-                            )
-                            return file.file_path, None, "ERROR", error_msg
-                return None
+                source = sources_by_path.get(file.file_path)
+                if source is None:
+                    return None
+                file_content = source.source_code
+                try:
+                    result = index_manager.verify_file_relevance_with_cache(
+                        llm, file_content=file_content, query=args.query
+                    )
+                    if result.relevant_score >= args.verify_file_relevance_score:
+                        verified_files[file.file_path] = TargetFile(
+                            file_path=file.file_path,
+                            reason=f"Score:{result.relevant_score}, {result.reason}"
+                        )
+                        return file.file_path, result.relevant_score, "PASS", result.reason
+                    else:
+                        return file.file_path, result.relevant_score, "FAIL", result.reason
+                except Exception as e:
+                    error_msg = str(e)
+                    verified_files[file.file_path] = TargetFile(
+                        file_path=file.file_path,
+                        reason=f"Verification failed: {error_msg}"
+                    )
+                    return file.file_path, None, "ERROR", error_msg
 
             with ThreadPoolExecutor(max_workers=args.index_filter_workers) as executor:
                 futures = [executor.submit(verify_single_file, file)
@@ -758,7 +1170,6 @@ def build_index_and_filter_files(
                     result = future.result()
                     if result:
                         verification_results.append(result)
-                        time.sleep(args.anti_quota_limit)
 
             # Print verification results in a table
             print_verification_results(verification_results)
@@ -847,6 +1258,8 @@ def build_index_and_filter_files(
         if args.index_filter_file_num > 0:
             final_filenames = final_filenames[: args.index_filter_file_num]
 
+    final_filename_set = set(final_filenames)
+
     phase_end = time.monotonic()
     stats["timings"]["file_selection"] = phase_end - phase_start
 
@@ -858,7 +1271,7 @@ def build_index_and_filter_files(
             [
                 (file.file_path, file.reason)
                 for file in final_files.values()
-                if file.file_path in final_filenames
+                if file.file_path in final_filename_set
             ]
         )
     except Exception as e:
@@ -869,16 +1282,17 @@ def build_index_and_filter_files(
         for file in final_filenames:
             print(f"{file} - {final_files[file].reason}")
 
-    source_code = ""
+    source_code_parts = []
     depulicated_sources = set()
 
     for file in sources:
-        if file.module_name in final_filenames:
+        if file.module_name in final_filename_set:
             if file.module_name in depulicated_sources:
                 continue
             depulicated_sources.add(file.module_name)
-            source_code += f"##File: {file.module_name}\n"
-            source_code += f"{file.source_code}\n\n"
+            source_code_parts.append(f"##File: {file.module_name}\n")
+            source_code_parts.append(f"{file.source_code}\n\n")
+    source_code = "".join(source_code_parts)
 
     if args.request_id and not args.skip_events:
         queue_communicate.send_event(
@@ -0,0 +1,201 @@
+import os
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from loguru import logger
+
+INDEX_DB_NAME = "index.db"
+LEGACY_INDEX_FILE_NAME = "index.json"
+
+# 进程内缓存：db 路径 -> (版本号, 索引数据)
+_cache: Dict[str, Tuple[int, Dict[str, Dict[str, Any]]]] = {}
+_cache_lock = threading.Lock()
+
+
+class IndexStore:
+    """
+    .auto-coder 下的代码索引存储（SQLite）。
+
+    每个文件一行，支持按文件 upsert，不需要整体重写。
+    每次写入都会增加 meta 表中的版本号，读取时只要版本号没有变化就直接复用进程内缓存，
+    不会重复解析整个索引。第一次打开时会自动迁移旧的 index.json。
+    """
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        self.db_path = os.path.join(index_dir, INDEX_DB_NAME)
+        self.legacy_index_file = os.path.join(index_dir, LEGACY_INDEX_FILE_NAME)
+        if not os.path.exists(index_dir):
+            os.makedirs(index_dir)
+        self._init_db()
+        self._migrate_legacy_index()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS index_items (
+                    module_name TEXT PRIMARY KEY,
+                    symbols TEXT NOT NULL,
+                    last_modified REAL NOT NULL,
+                    md5 TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+            # 索引条目渲染成文本后的 token 数，variant 区分不同的渲染方式
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS item_tokens (
+                    module_name TEXT NOT NULL,
+                    variant TEXT NOT NULL,
+                    md5 TEXT NOT NULL,
+                    tokens INTEGER NOT NULL,
+                    PRIMARY KEY (module_name, variant)
+                )
+                """
+            )
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0)")
+
+    def _migrate_legacy_index(self):
+        if not os.path.exists(self.legacy_index_file):
+            return
+        try:
+            with open(self.legacy_index_file, "r") as f:
+                index_data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Failed to read legacy index {self.legacy_index_file}: {e}")
+            return
+
+        # 已经写入数据库的新结果优先，不会被旧的 index.json 覆盖
+        existing = self.read_all()
+        items = [
+            dict(item, module_name=module_name)
+            for module_name, item in index_data.items()
+            if module_name not in existing
+        ]
+        self.upsert(items)
+        os.replace(self.legacy_index_file, self.legacy_index_file + ".bak")
+        logger.info(
+            f"Migrated {len(items)} items from {self.legacy_index_file} to {self.db_path}"
+        )
+
+    @staticmethod
+    def _bump_version(conn: sqlite3.Connection):
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+
+    def version(self) -> int:
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return row[0] if row else 0
+
+    def read_all(self) -> Dict[str, Dict[str, Any]]:
+        """
+        返回 module_name -> 索引条目。返回的字典是共享缓存，调用方不要修改它。
+        """
+        version = self.version()
+        with _cache_lock:
+            cached = _cache.get(self.db_path)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+        with self._connect() as conn:
+            # 在同一个读事务里读取版本号和数据，保证二者一致
+            conn.execute("BEGIN")
+            version = conn.execute(
+                "SELECT value FROM meta WHERE key = 'version'"
+            ).fetchone()[0]
+            rows = conn.execute(
+                "SELECT module_name, symbols, last_modified, md5 FROM index_items ORDER BY rowid"
+            ).fetchall()
+        index_data = {
+            module_name: {
+                "module_name": module_name,
+                "symbols": symbols,
+                "last_modified": last_modified,
+                "md5": md5,
+            }
+            for module_name, symbols, last_modified, md5 in rows
+        }
+        with _cache_lock:
+            _cache[self.db_path] = (version, index_data)
+        return index_data
+
+    def get(self, module_name: str) -> Optional[Dict[str, Any]]:
+        return self.read_all().get(module_name)
+
+    def upsert(self, items: Iterable[Dict[str, Any]]):
+        rows = [
+            (
+                item["module_name"],
+                item["symbols"],
+                item["last_modified"],
+                item["md5"],
+            )
+            for item in items
+        ]
+        if not rows:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                """
+                INSERT INTO index_items (module_name, symbols, last_modified, md5)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(module_name) DO UPDATE SET
+                    symbols = excluded.symbols,
+                    last_modified = excluded.last_modified,
+                    md5 = excluded.md5
+                """,
+                rows,
+            )
+            self._bump_version(conn)
+
+    def delete(self, module_names: Iterable[str]):
+        rows = [(module_name,) for module_name in module_names]
+        if not rows:
+            return
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM index_items WHERE module_name = ?", rows)
+            conn.executemany("DELETE FROM item_tokens WHERE module_name = ?", rows)
+            self._bump_version(conn)
+
+    def get_item_tokens(self, variant: str) -> Dict[str, Tuple[str, int]]:
+        """返回 module_name -> (md5, tokens)"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT module_name, md5, tokens FROM item_tokens WHERE variant = ?",
+                (variant,),
+            ).fetchall()
+        return {module_name: (md5, tokens) for module_name, md5, tokens in rows}
+
+    def put_item_tokens(self, variant: str, rows: Iterable[Tuple[str, str, int]]):
+        """rows 为 (module_name, md5, tokens)"""
+        rows = [(module_name, variant, md5, tokens) for module_name, md5, tokens in rows]
+        if not rows:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO item_tokens (module_name, variant, md5, tokens) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+    def to_json(self) -> str:
+        return json.dumps(self.read_all(), ensure_ascii=False, indent=2)
+
+    def __len__(self) -> int:
+        return len(self.read_all())
@@ -0,0 +1,130 @@
+import os
+import re
+import ast
+from typing import List, Optional
+
+from loguru import logger
+from autocoder.index.symbols_utils import SymbolsInfo
+
+PYTHON_EXTS = {".py", ".pyi"}
+JS_TS_EXTS = {".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx"}
+
+JS_IDENT = r"[A-Za-z_$][\w$]*"
+JS_IMPORT_PATTERN = re.compile(
+    r"^[ \t]*import\b[^;'\"]*?['\"][^'\"\n]+['\"]", re.MULTILINE
+)
+JS_REQUIRE_PATTERN = re.compile(
+    rf"^[ \t]*(?:const|let|var)\s+[^=\n]+=\s*require\(\s*['\"][^'\"\n]+['\"]\s*\)",
+    re.MULTILINE,
+)
+JS_FUNCTION_PATTERN = re.compile(
+    rf"^[ \t]*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*({JS_IDENT})",
+    re.MULTILINE,
+)
+JS_ARROW_FUNCTION_PATTERN = re.compile(
+    rf"^[ \t]*(?:export\s+)?(?:const|let|var)\s+({JS_IDENT})\s*(?::[^=\n]+)?=\s*(?:async\s+)?(?:function\b|(?:\([^)]*\)|{JS_IDENT})\s*(?::[^=\n]+)?=>)",
+    re.MULTILINE,
+)
+JS_CLASS_PATTERN = re.compile(
+    rf"^[ \t]*(?:export\s+)?(?:default\s+)?(?:abstract\s+)?(?:class|interface)\s+({JS_IDENT})",
+    re.MULTILINE,
+)
+# 只取顶层（行首没有缩进）的变量声明
+JS_VARIABLE_PATTERN = re.compile(
+    rf"^(?:export\s+)?(?:const|let|var)\s+({JS_IDENT})", re.MULTILINE
+)
+
+
+def _unique(values: List[str]) -> List[str]:
+    return list(dict.fromkeys(v for v in values if v))
+
+
+def _one_line(text: str) -> str:
+    return " ".join(text.split())
+
+
+def extract_python_symbols(code: str) -> Optional[SymbolsInfo]:
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return None
+
+    functions, classes, variables, imports = [], [], [], []
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ClassDef):
+            classes.append(node.name)
+            for child in node.body:
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    functions.append(child.name)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            segment = ast.get_source_segment(code, node)
+            if segment:
+                imports.append(_one_line(segment))
+
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            functions.append(node.name)
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            for target in targets:
+                for name_node in ast.walk(target):
+                    if isinstance(name_node, ast.Name):
+                        variables.append(name_node.id)
+
+    usage = None
+    docstring = ast.get_docstring(tree)
+    if docstring and docstring.strip():
+        usage = _one_line(docstring.strip().splitlines()[0])[:100]
+
+    return SymbolsInfo(
+        usage=usage,
+        functions=_unique(functions),
+        variables=_unique(variables),
+        classes=_unique(classes),
+        import_statements=_unique(imports),
+    )
+
+
+def extract_js_ts_symbols(code: str) -> Optional[SymbolsInfo]:
+    imports = [_one_line(m.group(0)) for m in JS_IMPORT_PATTERN.finditer(code)]
+    imports += [_one_line(m.group(0)) for m in JS_REQUIRE_PATTERN.finditer(code)]
+    functions = [m.group(1) for m in JS_FUNCTION_PATTERN.finditer(code)]
+    functions += [m.group(1) for m in JS_ARROW_FUNCTION_PATTERN.finditer(code)]
+    classes = [m.group(1) for m in JS_CLASS_PATTERN.finditer(code)]
+
+    required = set()
+    for statement in imports:
+        if "require(" in statement:
+            required.update(re.findall(JS_IDENT, statement.split("=")[0]))
+    skip = set(functions) | required
+    variables = [
+        m.group(1)
+        for m in JS_VARIABLE_PATTERN.finditer(code)
+        if m.group(1) not in skip
+    ]
+
+    return SymbolsInfo(
+        functions=_unique(functions),
+        variables=_unique(variables),
+        classes=_unique(classes),
+        import_statements=_unique(imports),
+    )
+
+
+def extract_symbols_locally(file_path: str, code: str) -> Optional[SymbolsInfo]:
+    """
+    不调用大模型，直接解析源码得到符号信息。
+
+    目前支持 Python（ast）以及 JS/TS（正则）。不支持的语言或者解析失败时返回 None，
+    调用方应回退到大模型抽取。
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    try:
+        if ext in PYTHON_EXTS:
+            return extract_python_symbols(code)
+        if ext in JS_TS_EXTS:
+            return extract_js_ts_symbols(code)
+    except Exception as e:
+        logger.warning(f"Failed to extract symbols locally from {file_path}: {e}")
+    return None
@@ -0,0 +1,172 @@
+import os
+import re
+import difflib
+from bisect import bisect_left
+from typing import Any, Dict, List, Tuple
+
+from pydantic import BaseModel
+from autocoder.index.symbols_utils import extract_symbols, SymbolType
+
+SYMBOL_REF_PATTERN = re.compile(r"@@([^\s,;:，。；：]+)")
+FILE_REF_PATTERN = re.compile(r"(?<![@\w])@([^\s@,;:，。；：]+)")
+
+# 子串匹配要求的最短长度，以及最多返回的文件数，避免 @a 这类标记匹配到整个项目
+SUBSTRING_MIN_LENGTH = 3
+SUBSTRING_MAX_MATCHES = 10
+
+
+class QueryReferences(BaseModel):
+    file_refs: List[str] = []
+    symbol_refs: List[str] = []
+    text: str = ""
+
+
+class SymbolMatch(BaseModel):
+    module_name: str
+    symbol_name: str
+    symbol_type: SymbolType
+
+
+def parse_query_references(query: str) -> QueryReferences:
+    """拆分出 query 中的 @path 和 @@symbol 标记，text 为去掉这些标记后剩下的自由文本"""
+    symbol_refs = SYMBOL_REF_PATTERN.findall(query)
+    text = SYMBOL_REF_PATTERN.sub(" ", query)
+    file_refs = FILE_REF_PATTERN.findall(text)
+    text = FILE_REF_PATTERN.sub(" ", text)
+    return QueryReferences(
+        file_refs=file_refs,
+        symbol_refs=symbol_refs,
+        text=" ".join(text.split()),
+    )
+
+
+class SymbolIndex:
+    """
+    基于代码索引构建的内存倒排索引，用来直接解析 @path 和 @@symbol，不需要调用大模型。
+
+    路径匹配顺序：完整路径/路径后缀 -> 文件名（含或不含扩展名） -> 子串 -> 文件名模糊匹配；
+    子串匹配只对足够长的标记生效，文件名命中的排在前面、路径短的排在前面，并且限制返回数量；
+    符号匹配顺序：精确 -> 忽略大小写 -> 前缀 -> 模糊匹配。
+    每一级有结果就不再继续往下。
+    """
+
+    def __init__(self, index_data: Dict[str, Dict[str, Any]], fuzzy_cutoff: float = 0.8):
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.module_names: List[str] = list(index_data.keys())
+        self.basenames: Dict[str, List[str]] = {}
+        self.symbols: Dict[str, List[SymbolMatch]] = {}
+
+        for module_name, item in index_data.items():
+            basename = os.path.basename(module_name).lower()
+            for key in {basename, os.path.splitext(basename)[0]}:
+                self.basenames.setdefault(key, []).append(module_name)
+
+            info = extract_symbols(item.get("symbols") or "")
+            for symbol_type, names in [
+                (SymbolType.CLASSES, info.classes),
+                (SymbolType.FUNCTIONS, info.functions),
+                (SymbolType.VARIABLES, info.variables),
+            ]:
+                for name in names:
+                    if name:
+                        self.symbols.setdefault(name.lower(), []).append(
+                            SymbolMatch(
+                                module_name=module_name,
+                                symbol_name=name,
+                                symbol_type=symbol_type,
+                            )
+                        )
+
+        self.sorted_symbol_keys = sorted(self.symbols.keys())
+
+    def resolve_path(self, ref: str) -> List[str]:
+        ref = ref.strip().replace("\\", "/")
+        if not ref:
+            return []
+        lowered = re.sub(r"^(\./)+", "", ref.lower())
+
+        matches = [
+            m
+            for m in self.module_names
+            if m == ref or m.replace("\\", "/").lower().endswith("/" + lowered)
+        ]
+        if matches:
+            return matches
+
+        if "/" not in lowered and lowered in self.basenames:
+            return list(self.basenames[lowered])
+
+        if len(lowered) >= SUBSTRING_MIN_LENGTH:
+            matches = [
+                m for m in self.module_names if lowered in m.replace("\\", "/").lower()
+            ]
+            if matches:
+                matches.sort(
+                    key=lambda m: (
+                        lowered not in os.path.basename(m).lower(),
+                        len(m),
+                        m,
+                    )
+                )
+                return matches[:SUBSTRING_MAX_MATCHES]
+
+        basename = os.path.basename(lowered)
+        close = difflib.get_close_matches(
+            basename, list(self.basenames.keys()), n=3, cutoff=self.fuzzy_cutoff
+        )
+        return list(dict.fromkeys(m for key in close for m in self.basenames[key]))
+
+    def resolve_symbol(self, name: str) -> List[SymbolMatch]:
+        name = name.strip()
+        if not name:
+            return []
+        lowered = name.lower()
+        candidates = self.symbols.get(lowered, [])
+
+        exact = [m for m in candidates if m.symbol_name == name]
+        if exact:
+            return exact
+        if candidates:
+            return list(candidates)
+
+        matches = []
+        i = bisect_left(self.sorted_symbol_keys, lowered)
+        while i < len(self.sorted_symbol_keys) and self.sorted_symbol_keys[i].startswith(lowered):
+            matches.extend(self.symbols[self.sorted_symbol_keys[i]])
+            i += 1
+        if matches:
+            return matches
+
+        close = difflib.get_close_matches(
+            lowered, self.sorted_symbol_keys, n=3, cutoff=self.fuzzy_cutoff
+        )
+        return [m for key in close for m in self.symbols[key]]
+
+    def resolve_query(
+        self, query: str
+    ) -> Tuple[QueryReferences, List[Tuple[str, str]], List[str]]:
+        """
+        返回 (解析出的标记, [(文件路径, 原因)], 没有匹配到的标记)
+        """
+        refs = parse_query_references(query)
+        resolved: Dict[str, str] = {}
+        unresolved: List[str] = []
+
+        for ref in refs.file_refs:
+            matches = self.resolve_path(ref)
+            if not matches:
+                unresolved.append(f"@{ref}")
+            for module_name in matches:
+                resolved.setdefault(module_name, f"matched @{ref}")
+
+        for ref in refs.symbol_refs:
+            matches = self.resolve_symbol(ref)
+            if not matches:
+                unresolved.append(f"@@{ref}")
+            for m in matches:
+                resolved.setdefault(
+                    m.module_name,
+                    f"matched @@{ref} ({m.symbol_type.value}: {m.symbol_name})",
+                )
+
+        return refs, list(resolved.items()), unresolved
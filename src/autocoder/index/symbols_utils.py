@@ -61,3 +61,32 @@ def symbols_info_to_str(info: SymbolsInfo, symbol_types: List[SymbolType]) -> st
             result.append(f"{symbol_type.value}：{value_str}")
 
     return "\n".join(result)
+
+
+def symbols_info_to_text(info: SymbolsInfo) -> str:
+    """生成与 get_all_file_symbols 输出一致的文本，可以被 extract_symbols 解析回来"""
+    return "\n".join(
+        [
+            f"用途：{info.usage or ''}",
+            f"函数：{', '.join(info.functions)}",
+            f"变量：{', '.join(info.variables)}",
+            f"类：{', '.join(info.classes)}",
+            f"导入语句：{'^^'.join(info.import_statements)}",
+        ]
+    )
+
+
+def merge_symbols_texts(texts: List[str]) -> str:
+    """
+    合并同一个文件分块抽取得到的多段符号信息。
+    按分块顺序保留第一次出现的符号并去重，用途取第一个非空的值。
+    """
+    merged = SymbolsInfo()
+    for text in texts:
+        info = extract_symbols(text or "")
+        if not merged.usage and info.usage:
+            merged.usage = info.usage
+        for field in ("functions", "variables", "classes", "import_statements"):
+            values = getattr(merged, field) + getattr(info, field)
+            setattr(merged, field, list(dict.fromkeys(v for v in values if v)))
+    return symbols_info_to_text(merged)
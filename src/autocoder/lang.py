@@ -5,6 +5,7 @@ lang_desc = {
         "source_dir": "Path to the project source code directory",
         "git_url": "URL of the git repository to clone the source code from",
         "target_file": "The file path to write the generated source code to",
+        "source_output_mode": "How the collected project sources are output. lazy (default) keeps them in memory and streams them to the index; file also writes the full concatenation of all sources to target_file",
         "query": "The user query or instruction to handle the source code",
         "template": "The template to use for generating the source code. Default is 'common'",
         "project_type": "The type of the project. Options: py, ts, py-script, translate, or file suffix. Default is 'py'",
@@ -16,6 +17,10 @@ lang_desc = {
         "model_max_length": "The maximum length of the generated code by the model. Default is 1024. This only works when model is specified.",
         "file": "Path to the YAML configuration file",
         "anti_quota_limit": "Time to wait in seconds after each API request. Default is 1s",
+        "llm_rpm_limit": "Maximum requests per minute sent to each model by index building/filtering and translation. Default is 0, which means no proactive limit and only backing off on rate limit errors",
+        "llm_tpm_limit": "Maximum tokens per minute sent to each model by index building/filtering and translation. Default is 0, which means no limit",
+        "llm_max_concurrency": "Maximum concurrent requests to each model. Default is 0, which means no limit",
+        "llm_rate_limit_max_retries": "Maximum retries of a request when hitting rate limit errors. Default is 5",
         "skip_build_index": "Whether to skip building the source code index. Default is False",
         "print_request": "Whether to print the request sent to the model. Default is False",
         "cmd_args_title": "Command Line Arguments:",
@@ -52,7 +57,7 @@ lang_desc = {
         "enable_multi_round_generate":"Whether to enable multi-round conversation for generation. Default is False",
         "index_model_max_length":"The maximum length of the generated code by the index model. Default is 0, which means using the value of model_max_length",
         "index_model_max_input_length":"The maximum length of the input to the index model. Default is 0, which means using the value of model_max_input_length",
-        "index_model_anti_quota_limit":"Time to wait in seconds after each API request for the index model. Default is 0, which means using the value of anti_quota_limit",
+        "index_model_anti_quota_limit":"Deprecated, use llm_rpm_limit instead. Time to wait in seconds after each API request for the index model, converted to an equivalent requests-per-minute limit when llm_rpm_limit is not set. Default is 0",
         "doc_build_parse_required_exts":"The required file extensions for doc build. Default is empty string",
         "verify_file_relevance_score": "The relevance score threshold for file verification. Default is 6",
         "init_desc": "Initialize a new auto-coder project directory",
@@ -89,6 +94,7 @@ lang_desc = {
         "source_dir": "项目源代码目录路径",
         "git_url": "用于克隆源代码的Git仓库URL",
         "target_file": "生成的源代码的输出文件路径",
+        "source_output_mode": "项目源码的输出方式。lazy(默认)只保存在内存中并以流的方式交给索引;file 会额外把全部源码拼接后写入 target_file",
         "query": "用户查询或处理源代码的指令",
         "template": "生成源代码使用的模板。默认为'common'",
         "project_type": "项目类型。可选值:py、ts、py-script、translate或文件后缀名。默认为'py'",
@@ -100,6 +106,10 @@ lang_desc = {
         "model_max_length": "模型生成代码的最大长度。默认为1024。仅在指定模型时生效。",
         "file": "YAML配置文件路径",
         "anti_quota_limit": "每次API请求后等待的秒数。默认为1秒",
+        "llm_rpm_limit": "索引构建/过滤以及翻译时每个模型每分钟的最大请求数。默认为0,表示不主动限流,只在遇到限流错误时退避",
+        "llm_tpm_limit": "索引构建/过滤以及翻译时每个模型每分钟的最大token数。默认为0,表示不限制",
+        "llm_max_concurrency": "每个模型的最大并发请求数。默认为0,表示不限制",
+        "llm_rate_limit_max_retries": "遇到限流错误时单个请求的最大重试次数。默认为5",
         "skip_build_index": "是否跳过构建源代码索引。默认为False",
         "print_request": "是否打印发送到模型的请求。默认为False",
         "cmd_args_title": "命令行参数:", 
@@ -136,7 +146,7 @@ lang_desc = {
         "enable_multi_round_generate":"是否开启多轮对话生成。默认为False",
         "index_model_max_length":"索引模型生成代码的最大长度。默认为0,表示使用model_max_length的值",
         "index_model_max_input_length":"索引模型的最大输入长度。默认为0,表示使用model_max_input_length的值",
-        "index_model_anti_quota_limit": "每次索引模型API请求后等待的秒数。默认为0,表示使用anti_quota_limit的值",
+        "index_model_anti_quota_limit": "已废弃,请使用llm_rpm_limit。每次索引模型API请求后等待的秒数,未设置llm_rpm_limit时换算成等价的每分钟请求数。默认为0",
         "doc_build_parse_required_exts":"doc构建所需的文件扩展名。默认为空字符串",
         "verify_file_relevance_score": "验证文件相关性的分数阈值。默认为6",
         "init_desc": "初始化一个新的auto-coder项目目录",
@@ -1,6 +1,14 @@
 from autocoder.common import SourceCode, AutoCoderArgs
 from autocoder import common as FileUtils
 from autocoder.utils.rest import HttpDoc
+from autocoder.common.path_matcher import PathMatcher
+from autocoder.common.project_scanner import scan_project_files
+from autocoder.common.source_loader import (
+    format_source_dump,
+    iter_with_source_dump,
+    load_project_source_codes,
+)
+import io
 import os
 from typing import Optional, Generator, List, Dict, Any
 from git import Repo
@@ -119,6 +127,11 @@ class PyProject:
             ".vscode",
             ".idea",
         ]
+        self.path_matcher = PathMatcher(
+            exclude_patterns=self.exclude_patterns,
+            required_exts=[".py"],
+            exclude_dirs=self.default_exclude_dirs,
+        )
 
     @byzerllm.prompt()
     def generate_regex_pattern(self, desc: str) -> str:
@@ -169,32 +182,34 @@ class PyProject:
         return exclude_patterns
 
     def should_exclude(self, file_path):
-        for pattern in self.exclude_patterns:
-            if pattern.search(file_path):                
-                return True
-        return False
+        return self.path_matcher.is_excluded(file_path)
 
     def output(self):
-        return open(self.target_file, "r").read()
+        return format_source_dump(self.sources)
 
     def is_python_file(self, file_path):
         return file_path.endswith(".py")
 
-    def read_file_content(self, file_path):
+    def format_file_content(self, text: str) -> str:
+        """strict_diff 模式下给每一行加上行号，其他模式保持原文"""
         if self.args.auto_merge == "strict_diff":
             result = []
-            with open(file_path, "r") as file:
-                for line_number, line in enumerate(file, start=1):
-                    result.append(f"{line_number}:{line}")
+            for line_number, line in enumerate(io.StringIO(text), start=1):
+                result.append(f"{line_number}:{line}")
             return "\n".join(result)
+        return text
 
+    def read_file_content(self, file_path):
         with open(file_path, "r") as file:
-            return file.read()
+            return self.format_file_content(file.read())
 
-    def convert_to_source_code(self, file_path):
+    def convert_to_source_code(self, file_path, text: Optional[str] = None):
         module_name = file_path
         try:
-            source_code = self.read_file_content(file_path)
+            if text is not None:
+                source_code = self.format_file_content(text)
+            else:
+                source_code = self.read_file_content(file_path)
         except Exception as e:
             logger.warning(f"Failed to read file: {file_path}. Error: {str(e)}")
             return None
@@ -293,17 +308,14 @@ class PyProject:
             ]
         return temp + []
 
+    def get_source_file_paths(self) -> Generator[str, None, None]:
+        # 目录排除、后缀和 exclude_files 都由 path_matcher 在扫描时处理
+        yield from scan_project_files(self.directory, matcher=self.path_matcher)
+
     def get_source_codes(self) -> Generator[SourceCode, None, None]:
-        for root, dirs, files in os.walk(self.directory,followlinks=True):
-            dirs[:] = [d for d in dirs if d not in self.default_exclude_dirs]
-            for file in files:
-                file_path = os.path.join(root, file)
-                if self.should_exclude(file_path):
-                    continue
-                if self.is_python_file(file_path):
-                    source_code = self.convert_to_source_code(file_path)
-                    if source_code is not None:
-                        yield source_code
+        yield from load_project_source_codes(
+            self.get_source_file_paths(), self.convert_to_source_code, self.args
+        )
 
     @byzerllm.prompt()
     def get_simple_directory_structure(self) -> str:
@@ -314,8 +326,8 @@ class PyProject:
         {{ structure }}
         """
         structure = []
-        for source_code in self.get_source_codes():
-            relative_path = os.path.relpath(source_code.module_name, self.directory)
+        for file_path in self.get_source_file_paths():
+            relative_path = os.path.relpath(file_path, self.directory)
             structure.append(relative_path)
 
         subs = "\n".join(sorted(structure))
@@ -330,8 +342,8 @@ class PyProject:
         {{ structure }}
         """
         structure_dict = {}
-        for source_code in self.get_source_codes():
-            relative_path = os.path.relpath(source_code.module_name, self.directory)
+        for file_path in self.get_source_file_paths():
+            relative_path = os.path.relpath(file_path, self.directory)
             parts = relative_path.split(os.sep)
             current_level = structure_dict
             for part in parts:
@@ -354,33 +366,29 @@ class PyProject:
             "directory": self.directory,
         }
 
-    def run(self, packages: List[str] = []):
+    def iter_sources(self, packages: List[str] = []) -> Generator[SourceCode, None, None]:
+        """
+        以流的方式产出项目的全部源码，同时收集到 self.sources 中，
+        调用方可以一边读取一边处理（例如构建索引），不需要等待全部加载完成。
+        """
         if self.git_url is not None:
             self.clone_repository()
 
-        if self.target_file:
-            with open(self.target_file, "w") as file:
-
-                for code in self.get_rest_source_codes():
-                    self.sources.append(code)                    
-                    file.write(f"##File: {code.module_name}\n")
-                    file.write(f"{code.source_code}\n\n")
-
-                for code in self.get_search_source_codes():                    
-                    self.sources.append(code)                    
-                    file.write(f"##File: {code.module_name}\n")
-                    file.write(f"{code.source_code}\n\n")
-
-                for package in packages:
-                    for code in self.get_package_source_codes(package):
-                        self.sources.append(code)
-                        file.write(f"##File: {code.module_name}\n")
-                        file.write(f"{code.source_code}\n\n")
-
-                for code in self.get_source_codes():                    
-                    self.sources.append(code)
-                    file.write(f"##File: {code.module_name}\n")
-                    file.write(f"{code.source_code}\n\n")
+        def all_source_codes():
+            yield from self.get_rest_source_codes()
+            yield from self.get_search_source_codes()
+            for package in packages:
+                yield from self.get_package_source_codes(package)
+            yield from self.get_source_codes()
+
+        self.sources = []
+        for code in iter_with_source_dump(all_source_codes(), self.target_file, self.args):
+            self.sources.append(code)
+            yield code
+
+    def run(self, packages: List[str] = []):
+        for _ in self.iter_sources(packages):
+            pass
 
     def clone_repository(self):
         if self.git_url is None:
@@ -9,7 +9,6 @@ from loguru import logger
 import pathspec
 import os
 import uuid
-import json
 from autocoder.rag.utils import process_file_in_multi_process, process_file_local
 from byzerllm.apps.byzer_storage.simple_api import (
     ByzerStorage,
@@ -18,12 +17,17 @@ from byzerllm.apps.byzer_storage.simple_api import (
     SortOption,
 )
 from autocoder.common import AutoCoderArgs
+from autocoder.common.path_matcher import PathMatcher
+from autocoder.common.project_scanner import ProjectScanner
 import threading
 from multiprocessing import Pool
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from autocoder.rag.variable_holder import VariableHolder
+from autocoder.rag.cache.file_manifest import FileManifest
+from autocoder.rag.cache.segment_store import SegmentCacheStore
 import platform
 import hashlib
+import time
 from typing import Union
 
 if platform.system() != "Windows":
@@ -31,14 +35,6 @@ if platform.system() != "Windows":
 else:
     fcntl = None
 
-def generate_file_md5(file_path: str) -> str:
-    md5_hash = hashlib.md5()
-    with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            md5_hash.update(chunk)
-    return md5_hash.hexdigest()
-
-
 def generate_content_md5(content: Union[str, bytes]) -> str:
     if isinstance(content, str):
         content = content.encode("utf-8")
@@ -62,6 +58,9 @@ class ByzerStorageCache(BaseCacheManager):
         self.path = path
         self.ignore_spec = ignore_spec
         self.required_exts = required_exts
+        self.path_matcher = PathMatcher.for_rag_cache(
+            ignore_spec, required_exts, default_ignore_dirs
+        )
         self.storage = ByzerStorage("byzerai_store", "rag", "files")
         self.queue = []
         self.chunk_size = 1000
@@ -71,11 +70,18 @@ class ByzerStorageCache(BaseCacheManager):
             raise ValueError("extra_params is required for ByzerStorageCache")
 
         self.max_output_tokens = extra_params.hybrid_index_max_output_tokens
+        # 两次文件扫描之间的最小间隔（秒），0 表示每次请求都检查
+        self.scan_interval = extra_params.rag_cache_scan_interval or 0
+        self.last_scan_time = 0
 
         # 设置缓存文件路径
         self.cache_dir = os.path.join(self.path, ".cache")
         self.cache_file = os.path.join(self.cache_dir, "byzer_storage_speedup.jsonl")
+        self.store_dir = os.path.join(self.cache_dir, "byzer_storage_segments")
         self.cache = {}
+        self.manifest = FileManifest(
+            os.path.join(self.cache_dir, "byzer_storage_manifest.jsonl")
+        )
 
         self.lock = threading.Lock()
         self.stop_event = threading.Event()
@@ -122,49 +128,33 @@ class ByzerStorageCache(BaseCacheManager):
             .execute()
         )
 
-    def _load_cache(self) -> dict:
-        """Load cache from file"""
-        if os.path.exists(self.cache_file):
+    def _load_cache(self) -> SegmentCacheStore:
+        """Load cache from the segment store, migrating the legacy jsonl file if needed"""
+        cache = SegmentCacheStore(self.store_dir)
+        if not cache and os.path.exists(self.cache_file):
             try:
-                with open(self.cache_file, "r") as f:
-                    lines = f.readlines()
-                    cache = {}
-                    for line in lines:
-                        try:
-                            data = json.loads(line.strip())
-                            if isinstance(data, dict) and "file_path" in data:
-                                cache[data["file_path"]] = data
-                        except json.JSONDecodeError:
-                            continue
-                    return cache
+                count = cache.import_jsonl(self.cache_file)
+                logger.info(f"Migrated {count} records from {self.cache_file}")
+                os.remove(self.cache_file)
             except Exception as e:
-                logger.error(f"Error loading cache file: {str(e)}")
-                return {}
-        return {}    
+                logger.error(f"Error migrating cache file: {str(e)}")
+        return cache
 
     def write_cache(self):
-        cache_file = self.cache_file
+        # 记录在更新时已经追加写入段文件，这里只需落盘索引并按需压缩
+        lock_file = self.store_dir + ".lock"
 
         if not fcntl:
             try:
-                with open(cache_file, "w") as f:
-                    for data in self.cache.values():
-                        json.dump(data, f, ensure_ascii=False)
-                        f.write("\n")
+                self.cache.commit()
             except IOError as e:
                 logger.error(f"Error writing cache file: {str(e)}")
         else:
-            lock_file = cache_file + ".lock"
             with open(lock_file, "w") as lockf:
                 try:
                     # 获取文件锁
                     fcntl.flock(lockf, fcntl.LOCK_EX | fcntl.LOCK_NB)
-                    # 写入缓存文件
-                    with open(cache_file, "w") as f:
-                        for data in self.cache.values():
-                            json.dump(data, f, ensure_ascii=False)
-                            f.write("\n")
-
+                    self.cache.commit()
                 finally:
                     # 释放文件锁
                     fcntl.flock(lockf, fcntl.LOCK_UN)
@@ -178,7 +168,7 @@ class ByzerStorageCache(BaseCacheManager):
             file_path, _, modify_time, file_md5 = file_info
             if (
                 file_path not in self.cache                
-                or self.cache[file_path]["md5"] != file_md5
+                or self.cache.get_meta(file_path).get("md5", "") != file_md5
             ):
                 files_to_process.append(file_info)
                 
@@ -270,11 +260,12 @@ class ByzerStorageCache(BaseCacheManager):
         items = []
 
         if not is_delete:
+            cached_data = self.cache[file_path]
             content = [
                 SourceCode.model_validate(doc)
-                for doc in self.cache[file_path]["content"]
+                for doc in cached_data["content"]
             ]
-            modify_time = self.cache[file_path]["modify_time"]
+            modify_time = cached_data["modify_time"]
             for doc in content:
                 logger.info(f"Processing file: {doc.module_name}")
                 doc.module_name
@@ -307,12 +298,22 @@ class ByzerStorageCache(BaseCacheManager):
             elif isinstance(file_list, AddOrUpdateEvent):
                 for file_info in file_list.file_infos:
                     logger.info(f"{file_info[0]} is detected to be updated")
-                    result = process_file_local(file_info[0])
-                    self.cache[file_info[0]] = result
-                    self.update_storage(file_info[0], is_delete=False)
+                    file_path, relative_path, modify_time, file_md5 = file_info
+                    result = process_file_local(file_path)
+                    self.cache[file_path] = {
+                        "file_path": file_path,
+                        "relative_path": relative_path,
+                        "content": [c.model_dump() for c in result],
+                        "modify_time": modify_time,
+                        "md5": file_md5,
+                    }
+                    self.update_storage(file_path, is_delete=False)
             self.write_cache()
 
     def trigger_update(self):
+        if time.time() - self.last_scan_time < self.scan_interval:
+            return
+        self.last_scan_time = time.time()
         logger.info("检查文件是否有更新.....")
         files_to_process = []
         current_files = set()
@@ -321,7 +322,7 @@ class ByzerStorageCache(BaseCacheManager):
             current_files.add(file_path)
             if (
                 file_path not in self.cache
-                or self.cache[file_path]["md5"] != file_md5
+                or self.cache.get_meta(file_path).get("md5", "") != file_md5
             ):
                 files_to_process.append(file_info)
 
@@ -373,12 +374,12 @@ class ByzerStorageCache(BaseCacheManager):
         result = {}
         for file_path in file_paths:
             if file_path in self.cache:
-                cached_data = self.cache[file_path]
-                for doc in cached_data["content"]:                    
+                # 先用元数据中的 tokens 计算预算，只有被选中的文件才读取内容
+                for doc in self.cache.get_meta(file_path).get("docs", []):
                     if total_tokens + doc["tokens"] > self.max_output_tokens:
                         return result
                     total_tokens += doc["tokens"]
-                result[file_path] = cached_data
+                result[file_path] = self.cache[file_path]
 
         return result
 
@@ -386,32 +387,16 @@ class ByzerStorageCache(BaseCacheManager):
 
     def get_all_files(self) -> List[Tuple[str, str, float, str]]:
         all_files = []
-        for root, dirs, files in os.walk(self.path,followlinks=True):
-            dirs[:] = [d for d in dirs if not d.startswith(".") and d not in default_ignore_dirs]
-
-            if self.ignore_spec:
-                relative_root = os.path.relpath(root, self.path)
-                dirs[:] = [
-                    d
-                    for d in dirs
-                    if not self.ignore_spec.match_file(os.path.join(relative_root, d))
-                ]
-                files = [
-                    f
-                    for f in files
-                    if not self.ignore_spec.match_file(os.path.join(relative_root, f))
-                ]
-
+        for root, _, files in ProjectScanner(
+            self.path, matcher=self.path_matcher
+        ).walk():
             for file in files:
-                if self.required_exts and not any(
-                    file.endswith(ext) for ext in self.required_exts
-                ):
-                    continue
-
                 file_path = os.path.join(root, file)
                 relative_path = os.path.relpath(file_path, self.path)
-                modify_time = os.path.getmtime(file_path)
-                file_md5 = generate_file_md5(file_path)
-                all_files.append((file_path, relative_path, modify_time, file_md5))
+                stat = os.stat(file_path)
+                file_md5 = self.manifest.get_md5(file_path, stat)
+                all_files.append((file_path, relative_path, stat.st_mtime, file_md5))
 
+        self.manifest.retain(file_info[0] for file_info in all_files)
+        self.manifest.save()
         return all_files
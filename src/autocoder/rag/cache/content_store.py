@@ -0,0 +1,86 @@
+from typing import Any, Callable, Dict, Generator, Iterable, Optional
+from pydantic import PrivateAttr, model_serializer
+from autocoder.common import SourceCode
+from autocoder.rag.cache.segment_store import SegmentCacheStore
+
+
+class LazySourceCode(SourceCode):
+    """
+    source_code 延迟加载的 SourceCode。
+
+    module_name/tokens/metadata 来自内存中的元数据表，
+    source_code 只有在第一次被访问时才通过 loader 读取（例如进入 DocFilter/TokenLimiter 时），
+    读取后会缓存在对象上。content_md5 为缓存中记录的内容哈希（可能为空），
+    供切分等按内容缓存的逻辑直接使用，避免为了计算哈希而读取内容。
+    """
+
+    _loader: Optional[Callable[[], str]] = PrivateAttr(default=None)
+    _content_md5: Optional[str] = PrivateAttr(default=None)
+
+    @classmethod
+    def create(
+        cls,
+        loader: Callable[[], str],
+        module_name: str,
+        tokens: int = -1,
+        metadata: Optional[Dict[str, Any]] = None,
+        tag: str = "",
+        content_md5: Optional[str] = None,
+    ) -> "LazySourceCode":
+        doc = cls.model_construct(
+            module_name=module_name,
+            tokens=tokens,
+            metadata=metadata or {},
+            tag=tag,
+        )
+        doc._loader = loader
+        doc._content_md5 = content_md5
+        return doc
+
+    @property
+    def content_md5(self) -> Optional[str]:
+        return self._content_md5
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "source_code":
+            source_code = self._loader()
+            self.__dict__["source_code"] = source_code
+            self._loader = None
+            return source_code
+        return super().__getattr__(name)
+
+    def is_loaded(self) -> bool:
+        return "source_code" in self.__dict__
+
+    def load(self) -> "LazySourceCode":
+        # 访问 source_code 即触发 __getattr__ 中的延迟读取
+        _ = self.source_code
+        return self
+
+    @model_serializer(mode="wrap")
+    def _serialize(self, handler):
+        self.load()
+        return handler(self)
+
+
+def iter_lazy_documents(
+    store: SegmentCacheStore, keys: Optional[Iterable[str]] = None
+) -> Generator[LazySourceCode, None, None]:
+    """按元数据表生成文档，不读取任何文档内容。keys 为空时遍历所有记录"""
+    for key in store if keys is None else keys:
+        if key not in store:
+            continue
+        meta = store.get_meta(key)
+        file_md5 = meta.get("md5")
+        for doc_index, doc_meta in enumerate(meta.get("docs", [])):
+            yield LazySourceCode.create(
+                loader=lambda key=key, doc_index=doc_index: store.read_doc_text(
+                    key, doc_index
+                ),
+                module_name=doc_meta.get("module_name", key),
+                tokens=doc_meta.get("tokens", -1),
+                metadata=doc_meta.get("metadata") or {},
+                tag=doc_meta.get("tag", ""),
+                # 同一个文件可能转换出多个文档，用文件 md5 加文档序号标识每个文档的内容
+                content_md5=f"{file_md5}:{doc_index}" if file_md5 else None,
+            )
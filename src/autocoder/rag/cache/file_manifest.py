@@ -0,0 +1,109 @@
+import os
+import json
+import hashlib
+import threading
+from typing import Dict, Iterable, List, Optional
+from loguru import logger
+
+
+def generate_file_md5(file_path: str) -> str:
+    md5_hash = hashlib.md5()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(4096), b""):
+            md5_hash.update(chunk)
+    return md5_hash.hexdigest()
+
+
+class FileManifest:
+    """
+    持久化的 (path, size, mtime_ns, inode) -> md5 清单。
+
+    只有当文件的 stat 签名发生变化时才重新计算 md5，
+    避免每次扫描都把整个文档目录重新读一遍。
+    """
+
+    def __init__(self, manifest_file: str):
+        self.manifest_file = manifest_file
+        self.entries: Dict[str, List] = {}
+        self.dirty = False
+        self.lock = threading.Lock()
+        self.entries = self._load()
+
+    def _load(self) -> Dict[str, List]:
+        entries = {}
+        if not os.path.exists(self.manifest_file):
+            return entries
+        try:
+            with open(self.manifest_file, "r") as f:
+                for line in f:
+                    try:
+                        data = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    entries[data["file_path"]] = [
+                        data["size"],
+                        data["mtime_ns"],
+                        data["inode"],
+                        data["md5"],
+                    ]
+        except Exception as e:
+            logger.error(f"Error loading file manifest {self.manifest_file}: {e}")
+            return {}
+        return entries
+
+    def get_md5(self, file_path: str, stat: Optional[os.stat_result] = None) -> str:
+        stat = stat or os.stat(file_path)
+        signature = [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+        with self.lock:
+            entry = self.entries.get(file_path)
+            if entry is not None and entry[:3] == signature:
+                return entry[3]
+
+        file_md5 = generate_file_md5(file_path)
+        with self.lock:
+            self.entries[file_path] = signature + [file_md5]
+            self.dirty = True
+        return file_md5
+
+    def retain(self, file_paths: Iterable[str]):
+        """删除不在 file_paths 中的条目（文件已被删除或被忽略）"""
+        keep = set(file_paths)
+        with self.lock:
+            removed = [k for k in self.entries if k not in keep]
+            for k in removed:
+                del self.entries[k]
+            if removed:
+                self.dirty = True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            entries = dict(self.entries)
+            self.dirty = False
+
+        manifest_dir = os.path.dirname(self.manifest_file)
+        if manifest_dir and not os.path.exists(manifest_dir):
+            os.makedirs(manifest_dir)
+
+        tmp_file = f"{self.manifest_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_file, "w") as f:
+                for file_path, (size, mtime_ns, inode, file_md5) in entries.items():
+                    json.dump(
+                        {
+                            "file_path": file_path,
+                            "size": size,
+                            "mtime_ns": mtime_ns,
+                            "inode": inode,
+                            "md5": file_md5,
+                        },
+                        f,
+                        ensure_ascii=False,
+                    )
+                    f.write("\n")
+            os.replace(tmp_file, self.manifest_file)
+        except Exception as e:
+            logger.error(f"Error writing file manifest {self.manifest_file}: {e}")
+            with self.lock:
+                self.dirty = True
@@ -6,6 +6,8 @@ from loguru import logger
 from watchfiles import watch, Change
 from autocoder.rag.variable_holder import VariableHolder
 from autocoder.common import SourceCode
+from autocoder.common.path_matcher import PathMatcher
+from autocoder.common.project_scanner import ProjectScanner
 from autocoder.rag.utils import process_file_in_multi_process,process_file_local
 from watchfiles import Change, DefaultFilter, awatch, watch
 
@@ -41,6 +43,7 @@ class AutoCoderRAGDocListener(BaseCacheManager):
         self.path = path
         self.ignore_spec = ignore_spec
         self.required_exts = required_exts
+        self.path_matcher = PathMatcher.for_rag_cache(ignore_spec, required_exts)
         self.stop_event = threading.Event()
 
         # connect list
@@ -117,28 +120,10 @@ class AutoCoderRAGDocListener(BaseCacheManager):
 
     def get_all_files(self) -> List[str]:
         all_files = []
-        for root, dirs, files in os.walk(self.path,followlinks=True):
-            dirs[:] = [d for d in dirs if not d.startswith(".")]
-
-            if self.ignore_spec:
-                relative_root = os.path.relpath(root, self.path)
-                dirs[:] = [
-                    d
-                    for d in dirs
-                    if not self.ignore_spec.match_file(os.path.join(relative_root, d))
-                ]
-                files = [
-                    f
-                    for f in files
-                    if not self.ignore_spec.match_file(os.path.join(relative_root, f))
-                ]
-
+        for root, _, files in ProjectScanner(
+            self.path, matcher=self.path_matcher
+        ).walk():
             for file in files:
-                if self.required_exts and not any(
-                    file.endswith(ext) for ext in self.required_exts
-                ):
-                    continue
-
                 file_path = os.path.join(root, file)
                 absolute_path = os.path.abspath(file_path)
                 all_files.append(absolute_path)
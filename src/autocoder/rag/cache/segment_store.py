@@ -0,0 +1,361 @@
+import os
+import re
+import json
+import mmap
+import threading
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, List, Optional
+from loguru import logger
+
+SEGMENT_FILE_PATTERN = re.compile(r"^segment_(\d+)\.jsonl$")
+INDEX_FILE_NAME = "index.json"
+INDEX_VERSION = 2
+
+
+class SegmentCacheStore(MutableMapping):
+    """
+    追加写、分段存储的文档缓存。
+
+    每次 put/delete 只会在当前活动段的末尾追加一条记录，
+    内存中只保存 key -> (segment_id, offset, length) 的偏移索引和少量元数据
+    （包括每个文档的 module_name/tokens/metadata），
+    文档内容只有在真正被访问时才会通过 mmap 从磁盘读取。
+    当失效记录占比过高时，通过 compact() 把存活记录重写到新的段中。
+
+    目录结构:
+        <store_dir>/segment_000001.jsonl
+        <store_dir>/segment_000002.jsonl
+        <store_dir>/index.json
+    """
+
+    def __init__(
+        self,
+        store_dir: str,
+        segment_max_bytes: int = 64 * 1024 * 1024,
+        compact_ratio: float = 0.5,
+        compact_min_bytes: int = 4 * 1024 * 1024,
+    ):
+        self.store_dir = store_dir
+        self.segment_max_bytes = segment_max_bytes
+        self.compact_ratio = compact_ratio
+        self.compact_min_bytes = compact_min_bytes
+        self.lock = threading.RLock()
+
+        # key -> [segment_id, offset, length]
+        self.index: Dict[str, List[int]] = {}
+        # key -> 记录中除 content 以外的字段
+        self.meta: Dict[str, Dict[str, Any]] = {}
+        # segment_id -> 已写入的字节数
+        self.segments: Dict[int, int] = {}
+        self.live_bytes = 0
+        self.dirty = False
+        # segment_id -> 只读 mmap
+        self._mmaps: Dict[int, mmap.mmap] = {}
+
+        if not os.path.exists(self.store_dir):
+            os.makedirs(self.store_dir)
+        self._load()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["lock"]
+        del state["_mmaps"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.RLock()
+        self._mmaps = {}
+
+    def _segment_path(self, segment_id: int) -> str:
+        return os.path.join(self.store_dir, f"segment_{segment_id:06d}.jsonl")
+
+    def _index_path(self) -> str:
+        return os.path.join(self.store_dir, INDEX_FILE_NAME)
+
+    def _list_segments(self) -> List[int]:
+        segment_ids = []
+        for name in os.listdir(self.store_dir):
+            match = SEGMENT_FILE_PATTERN.match(name)
+            if match:
+                segment_ids.append(int(match.group(1)))
+        return sorted(segment_ids)
+
+    @staticmethod
+    def _extract_meta(value: Any) -> Dict[str, Any]:
+        if not isinstance(value, dict):
+            return {}
+        meta = {k: v for k, v in value.items() if k != "content"}
+        if isinstance(value.get("content"), list):
+            meta["docs"] = [
+                {k: v for k, v in doc.items() if k != "source_code"}
+                for doc in value["content"]
+                if isinstance(doc, dict)
+            ]
+        return meta
+
+    def _apply_record(self, record: Dict[str, Any], location: List[int]):
+        key = record["key"]
+        old = self.index.pop(key, None)
+        if old is not None:
+            self.live_bytes -= old[2]
+        self.meta.pop(key, None)
+        if not record.get("deleted", False):
+            self.index[key] = location
+            self.meta[key] = self._extract_meta(record.get("value"))
+            self.live_bytes += location[2]
+
+    def _replay_segment(self, segment_id: int, start_offset: int = 0):
+        segment_path = self._segment_path(segment_id)
+        offset = start_offset
+        with open(segment_path, "rb") as f:
+            f.seek(start_offset)
+            for line in f:
+                length = len(line)
+                if not line.endswith(b"\n"):
+                    # 写入过程中被中断的半条记录，截断掉
+                    logger.warning(
+                        f"Truncating incomplete record in {segment_path} at offset {offset}"
+                    )
+                    break
+                try:
+                    record = json.loads(line)
+                    self._apply_record(record, [segment_id, offset, length])
+                except (json.JSONDecodeError, KeyError) as e:
+                    logger.error(f"Skip broken record in {segment_path}: {e}")
+                offset += length
+        if offset < os.path.getsize(segment_path):
+            with open(segment_path, "r+b") as f:
+                f.truncate(offset)
+        self.segments[segment_id] = offset
+
+    def _load_index(self) -> bool:
+        index_path = self._index_path()
+        if not os.path.exists(index_path):
+            return False
+        try:
+            with open(index_path, "r") as f:
+                data = json.load(f)
+            if data.get("version") != INDEX_VERSION:
+                return False
+            self.segments = {int(k): v for k, v in data["segments"].items()}
+            self.index = {}
+            self.meta = {}
+            self.live_bytes = 0
+            for key, (segment_id, offset, length, meta) in data["entries"].items():
+                self.index[key] = [segment_id, offset, length]
+                self.meta[key] = meta
+                self.live_bytes += length
+            return True
+        except Exception as e:
+            logger.error(f"Error loading segment index {index_path}: {e}")
+            return False
+
+    def _load(self):
+        segment_ids = self._list_segments()
+        if self._load_index():
+            consistent = all(
+                segment_id in segment_ids
+                and os.path.getsize(self._segment_path(segment_id)) >= size
+                for segment_id, size in self.segments.items()
+            )
+            if consistent:
+                # 只回放索引落盘之后追加的记录
+                for segment_id in segment_ids:
+                    recorded = self.segments.get(segment_id, 0)
+                    if os.path.getsize(self._segment_path(segment_id)) != recorded:
+                        self.dirty = True
+                        self._replay_segment(segment_id, recorded)
+                    else:
+                        self.segments[segment_id] = recorded
+                return
+
+        # 索引缺失或与段文件不一致，全量重建
+        self.index = {}
+        self.meta = {}
+        self.segments = {}
+        self.live_bytes = 0
+        for segment_id in segment_ids:
+            self._replay_segment(segment_id)
+        self.dirty = True
+
+    def _active_segment(self, record_length: int) -> int:
+        if not self.segments:
+            self.segments[1] = 0
+            return 1
+        segment_id = max(self.segments)
+        size = self.segments[segment_id]
+        if size > 0 and size + record_length > self.segment_max_bytes:
+            segment_id += 1
+            self.segments[segment_id] = 0
+        return segment_id
+
+    def _append(self, record: Dict[str, Any]):
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self.lock:
+            segment_id = self._active_segment(len(line))
+            offset = self.segments[segment_id]
+            with open(self._segment_path(segment_id), "ab") as f:
+                f.write(line)
+            self.segments[segment_id] = offset + len(line)
+            self._apply_record(record, [segment_id, offset, len(line)])
+            self.dirty = True
+
+    def _segment_mmap(self, segment_id: int, end: int) -> mmap.mmap:
+        mm = self._mmaps.get(segment_id)
+        if mm is None or len(mm) < end:
+            # 段文件在映射之后又被追加了内容，重新映射
+            if mm is not None:
+                mm.close()
+            with open(self._segment_path(segment_id), "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mmaps[segment_id] = mm
+        return mm
+
+    def _close_mmaps(self, segment_ids: Optional[List[int]] = None):
+        for segment_id in list(segment_ids or self._mmaps.keys()):
+            mm = self._mmaps.pop(segment_id, None)
+            if mm is not None:
+                mm.close()
+
+    def _read_raw(self, location: List[int]) -> bytes:
+        segment_id, offset, length = location
+        mm = self._segment_mmap(segment_id, offset + length)
+        return mm[offset : offset + length]
+
+    def __getitem__(self, key: str) -> Any:
+        with self.lock:
+            location = self.index[key]
+            raw = self._read_raw(location)
+        return json.loads(raw)["value"]
+
+    def __setitem__(self, key: str, value: Any):
+        self._append({"key": key, "value": value})
+
+    def __delitem__(self, key: str):
+        if key not in self.index:
+            raise KeyError(key)
+        self._append({"key": key, "deleted": True})
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.index
+
+    def __iter__(self) -> Iterator[str]:
+        with self.lock:
+            keys = list(self.index.keys())
+        return iter(keys)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def get_meta(self, key: str) -> Dict[str, Any]:
+        """获取记录的元数据（不包含 content），不会触发磁盘读取"""
+        return self.meta.get(key, {})
+
+    def read_doc_text(self, key: str, doc_index: int) -> str:
+        """读取记录中第 doc_index 个文档的 source_code"""
+        return self[key]["content"][doc_index]["source_code"]
+
+    def total_bytes(self) -> int:
+        return sum(self.segments.values())
+
+    def flush(self):
+        """把偏移索引落盘，使下一次启动无需解析段文件"""
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {
+                "version": INDEX_VERSION,
+                "segments": {str(k): v for k, v in self.segments.items()},
+                "entries": {
+                    key: location + [self.meta.get(key, {})]
+                    for key, location in self.index.items()
+                },
+            }
+            self.dirty = False
+
+        index_path = self._index_path()
+        tmp_path = f"{index_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, index_path)
+        except Exception as e:
+            logger.error(f"Error writing segment index {index_path}: {e}")
+            with self.lock:
+                self.dirty = True
+
+    def should_compact(self) -> bool:
+        total = self.total_bytes()
+        garbage = total - self.live_bytes
+        return total >= self.compact_min_bytes and garbage > total * self.compact_ratio
+
+    def compact(self):
+        """把存活记录按原始字节复制到新的段中，然后删除旧段"""
+        with self.lock:
+            old_segments = sorted(self.segments.keys())
+            next_id = (old_segments[-1] if old_segments else 0) + 1
+            new_segments: Dict[int, int] = {}
+            new_index: Dict[str, List[int]] = {}
+
+            segment_id = next_id
+            new_segments[segment_id] = 0
+            out = open(self._segment_path(segment_id), "ab")
+            try:
+                for key, location in self.index.items():
+                    raw = self._read_raw(location)
+                    if (
+                        new_segments[segment_id] > 0
+                        and new_segments[segment_id] + len(raw) > self.segment_max_bytes
+                    ):
+                        out.close()
+                        segment_id += 1
+                        new_segments[segment_id] = 0
+                        out = open(self._segment_path(segment_id), "ab")
+                    offset = new_segments[segment_id]
+                    out.write(raw)
+                    new_segments[segment_id] = offset + len(raw)
+                    new_index[key] = [segment_id, offset, len(raw)]
+            finally:
+                out.close()
+
+            self.index = new_index
+            self.segments = new_segments
+            self.live_bytes = sum(location[2] for location in new_index.values())
+            self.dirty = True
+            self.flush()
+
+            self._close_mmaps(old_segments)
+            for old_segment_id in old_segments:
+                try:
+                    os.remove(self._segment_path(old_segment_id))
+                except OSError as e:
+                    logger.warning(f"Failed to remove segment {old_segment_id}: {e}")
+
+        logger.info(
+            f"Compacted {self.store_dir}: {len(old_segments)} segments -> {len(new_segments)} segments"
+        )
+
+    def commit(self):
+        """落盘索引，并在失效数据过多时压缩"""
+        if self.should_compact():
+            self.compact()
+        else:
+            self.flush()
+
+    def import_jsonl(self, jsonl_file: str, key_field: str = "file_path") -> int:
+        """从旧版整文件 jsonl 缓存迁移数据"""
+        count = 0
+        with open(jsonl_file, "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    data = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(data, dict) and key_field in data:
+                    self[data[key_field]] = data
+                    count += 1
+        self.flush()
+        return count
@@ -1,11 +1,12 @@
 
 from multiprocessing import Pool
 from autocoder.common import SourceCode
+from autocoder.common.path_matcher import PathMatcher
+from autocoder.common.project_scanner import ProjectScanner
 from autocoder.rag.cache.base_cache import BaseCacheManager, DeleteEvent, AddOrUpdateEvent
 from typing import Dict, List, Tuple, Any, Optional, Union
 import os
 import threading
-import json
 import platform
 if platform.system() != "Windows":
     import fcntl
@@ -15,6 +16,8 @@ import time
 from loguru import logger
 from autocoder.rag.utils import process_file_in_multi_process, process_file_local
 from autocoder.rag.variable_holder import VariableHolder
+from autocoder.rag.cache.file_manifest import FileManifest
+from autocoder.rag.cache.segment_store import SegmentCacheStore
 import hashlib
 
 default_ignore_dirs = [
@@ -24,14 +27,6 @@ default_ignore_dirs = [
 ]
 
 
-def generate_file_md5(file_path: str) -> str:
-    md5_hash = hashlib.md5()
-    with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            md5_hash.update(chunk)
-    return md5_hash.hexdigest()
-
-
 def generate_content_md5(content: Union[str, bytes]) -> str:
     if isinstance(content, str):
         content = content.encode("utf-8")
@@ -41,10 +36,25 @@ def generate_content_md5(content: Union[str, bytes]) -> str:
 
 
 class AutoCoderRAGAsyncUpdateQueue(BaseCacheManager):
-    def __init__(self, path: str, ignore_spec, required_exts: list):
+    def __init__(
+        self,
+        path: str,
+        ignore_spec,
+        required_exts: list,
+        scan_interval: float = 0,
+    ):
         self.path = path
         self.ignore_spec = ignore_spec
         self.required_exts = required_exts
+        self.path_matcher = PathMatcher.for_rag_cache(
+            ignore_spec, required_exts, default_ignore_dirs
+        )
+        # 两次文件扫描之间的最小间隔（秒），0 表示每次请求都检查
+        self.scan_interval = scan_interval or 0
+        self.last_scan_time = 0
+        self.manifest = FileManifest(
+            os.path.join(self.path, ".cache", "file_manifest.jsonl")
+        )
         self.queue = []
         self.cache = {}
         self.lock = threading.Lock()
@@ -78,7 +88,7 @@ class AutoCoderRAGAsyncUpdateQueue(BaseCacheManager):
                 file_path, _, modify_time, file_md5 = file_info
                 if (
                     file_path not in self.cache
-                    or self.cache[file_path].get("md5","") != file_md5
+                    or self.cache.get_meta(file_path).get("md5", "") != file_md5
                 ):
                     files_to_process.append(file_info)
             if not files_to_process:
@@ -106,6 +116,9 @@ class AutoCoderRAGAsyncUpdateQueue(BaseCacheManager):
             self.write_cache()
 
     def trigger_update(self):
+        if time.time() - self.last_scan_time < self.scan_interval:
+            return
+        self.last_scan_time = time.time()
         logger.info("检查文件是否有更新.....")
         files_to_process = []
         current_files = set()
@@ -114,7 +127,7 @@ class AutoCoderRAGAsyncUpdateQueue(BaseCacheManager):
             current_files.add(file_path)
             if (
                 file_path not in self.cache
-                or self.cache[file_path].get("md5","") != file_md5
+                or self.cache.get_meta(file_path).get("md5", "") != file_md5
             ):
                 files_to_process.append(file_info)
 
@@ -151,50 +164,34 @@ class AutoCoderRAGAsyncUpdateQueue(BaseCacheManager):
 
             self.write_cache()
 
-    def read_cache(self) -> Dict[str, Dict]:
+    def read_cache(self) -> SegmentCacheStore:
         cache_dir = os.path.join(self.path, ".cache")
-        cache_file = os.path.join(cache_dir, "cache.jsonl")
+        legacy_cache_file = os.path.join(cache_dir, "cache.jsonl")
 
         if not os.path.exists(cache_dir):
             os.makedirs(cache_dir)
 
-        cache = {}
-        if os.path.exists(cache_file):
-            with open(cache_file, "r") as f:
-                for line in f:
-                    data = json.loads(line)
-                    cache[data["file_path"]] = data
+        cache = SegmentCacheStore(os.path.join(cache_dir, "cache_segments"))
+        # 迁移旧版的整文件 cache.jsonl
+        if not cache and os.path.exists(legacy_cache_file):
+            count = cache.import_jsonl(legacy_cache_file)
+            logger.info(f"Migrated {count} records from {legacy_cache_file}")
+            os.remove(legacy_cache_file)
         return cache
 
     def write_cache(self):
+        # 记录在 update_cache/删除时已经追加写入段文件，这里只需落盘索引并按需压缩
         cache_dir = os.path.join(self.path, ".cache")
-        cache_file = os.path.join(cache_dir, "cache.jsonl")
+        lock_file = os.path.join(cache_dir, "cache_segments.lock")
 
         if not fcntl:
-            with open(cache_file, "w") as f:
-                for data in self.cache.values():
-                    try:
-                        json.dump(data, f, ensure_ascii=False)
-                        f.write("\n")
-                    except Exception as e:
-                        logger.error(
-                            f"Failed to write {data['file_path']} to .cache/cache.jsonl: {e}")
+            self.cache.commit()
         else:
-            lock_file = cache_file + ".lock"
             with open(lock_file, "w") as lockf:
                 try:
                     # 获取文件锁
                     fcntl.flock(lockf, fcntl.LOCK_EX | fcntl.LOCK_NB)
-                    # 写入缓存文件
-                    with open(cache_file, "w") as f:
-                        for data in self.cache.values():
-                            try:
-                                json.dump(data, f, ensure_ascii=False)
-                                f.write("\n")
-                            except Exception as e:
-                                logger.error(
-                                    f"Failed to write {data['file_path']} to .cache/cache.jsonl: {e}")
-
+                    self.cache.commit()
                 finally:
                     # 释放文件锁
                     fcntl.flock(lockf, fcntl.LOCK_UN)
@@ -218,34 +215,17 @@ class AutoCoderRAGAsyncUpdateQueue(BaseCacheManager):
 
     def get_all_files(self) -> List[Tuple[str, str, float]]:
         all_files = []
-        for root, dirs, files in os.walk(self.path, followlinks=True):
-            dirs[:] = [d for d in dirs if not d.startswith(
-                ".") and d not in default_ignore_dirs]
-
-            if self.ignore_spec:
-                relative_root = os.path.relpath(root, self.path)
-                dirs[:] = [
-                    d
-                    for d in dirs
-                    if not self.ignore_spec.match_file(os.path.join(relative_root, d))
-                ]
-                files[:] = [
-                    f
-                    for f in files
-                    if not self.ignore_spec.match_file(os.path.join(relative_root, f))
-                ]
-
+        for root, _, files in ProjectScanner(
+            self.path, matcher=self.path_matcher
+        ).walk():
             for file in files:
-                if self.required_exts and not any(
-                    file.endswith(ext) for ext in self.required_exts
-                ):
-                    continue
-
                 file_path = os.path.join(root, file)
                 relative_path = os.path.relpath(file_path, self.path)
-                modify_time = os.path.getmtime(file_path)
-                file_md5 = generate_file_md5(file_path)
+                stat = os.stat(file_path)
+                file_md5 = self.manifest.get_md5(file_path, stat)
                 all_files.append(
-                    (file_path, relative_path, modify_time, file_md5))
+                    (file_path, relative_path, stat.st_mtime, file_md5))
 
+        self.manifest.retain(file_info[0] for file_info in all_files)
+        self.manifest.save()
         return all_files
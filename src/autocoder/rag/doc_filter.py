@@ -1,7 +1,7 @@
 import time
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterable, Generator
 from loguru import logger
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
 
 from autocoder.rag.relevant_utils import (
     parse_relevance,
@@ -11,6 +11,9 @@ from autocoder.rag.relevant_utils import (
 
 from autocoder.common import SourceCode, AutoCoderArgs
 from autocoder.rag.rag_config import RagConfigManager
+from autocoder.rag.relevance_cache import RelevanceCache
+from autocoder.rag.cache.simple_cache import generate_content_md5
+from autocoder.utils.llm_client_pool import get_llm_client_pool
 from byzerllm import ByzerLLM
 import byzerllm
 
@@ -49,6 +52,16 @@ def _check_relevance_with_conversation(
     """
 
 
+def relevance_cache_key(doc: SourceCode, prompt_doc: str) -> str:
+    """
+    相关性缓存的内容 key。合并文档的名字带有随机后缀，每次都不同，
+    所以只使用合并后的内容（其中已经包含了各个原始文件名）。
+    """
+    if doc.metadata.get("original_docs"):
+        return generate_content_md5(doc.source_code)
+    return generate_content_md5(prompt_doc)
+
+
 class DocFilter:
     def __init__(
         self,
@@ -56,6 +69,7 @@ class DocFilter:
         args: AutoCoderArgs,
         on_ray: bool = False,
         path: Optional[str] = None,
+        relevance_cache: Optional[RelevanceCache] = None,
     ):
         self.llm = llm
         if self.llm.get_sub_client("recall_model"):
@@ -66,7 +80,8 @@ class DocFilter:
         self.args = args
         self.relevant_score = self.args.rag_doc_filter_relevance or 5
         self.on_ray = on_ray
-        self.path = path        
+        self.path = path
+        self.relevance_cache = relevance_cache
 
     def filter_docs(
         self, conversations: List[Dict[str, str]], documents: List[SourceCode]
@@ -76,101 +91,202 @@ class DocFilter:
     def filter_docs_with_threads(
         self, conversations: List[Dict[str, str]], documents: List[SourceCode]
     ) -> List[FilterDoc]:
-        
+        relevant_docs = list(self.filter_docs_stream(conversations, documents))
+        # Sort relevant_docs by relevance score in descending order
+        relevant_docs.sort(
+            key=lambda x: x.relevance.relevant_score, reverse=True)
+        return relevant_docs
+
+    def filter_docs_stream(
+        self,
+        conversations: List[Dict[str, str]],
+        documents: Iterable[SourceCode],
+        token_budget: Optional[int] = None,
+        top_k: Optional[int] = None,
+        deadline: Optional[float] = None,
+    ) -> Generator[FilterDoc, None, None]:
+        """
+        按完成顺序逐个产出相关文档。
+
+        同时在途的任务数量被限制在工作线程数的两倍以内，文档是边迭代边提交的。
+        满足以下任一条件时停止提交新任务，并取消尚未开始的任务：
+        - 已收集的相关文档 token 总数达到 token_budget
+        - 已收集的相关文档数量达到 top_k
+        - 从开始过滤算起超过 deadline 秒
+        已经发出的模型请求无法中断，它们的结果会被直接丢弃。
+        """
         rag_manager = RagConfigManager(path=self.path)
         rag_config = rag_manager.load_config()
-        documents = list(documents)   
-        logger.info(f"Filtering {len(documents)} documents....")
-        with ThreadPoolExecutor(
-            max_workers=self.args.index_filter_workers or 5
-        ) as executor:
-            future_to_doc = {}
-            for doc in documents:
-                submit_time = time.time()
-
-                def _run(conversations, docs):
-                    submit_time_1 = time.time()
-                    try:
-                        llm = ByzerLLM()
-                        llm.skip_nontext_check = True
-                        llm.setup_default_model_name(self.recall_llm.default_model_name)
-
-                        v = (
-                            _check_relevance_with_conversation.with_llm(
-                                llm)
-                            .options({"llm_config": {"max_length": 10}})
-                            .run(
-                                conversations=conversations,
-                                documents=docs,
-                                filter_config=rag_config.filter_config,
-                            )
-                        )
-                    except Exception as e:
-                        logger.error(
-                            f"Error in _check_relevance_with_conversation: {str(e)}"
-                        )
-                        return (None, submit_time_1, time.time())
+        max_workers = self.args.index_filter_workers or 5
+        max_in_flight = max_workers * 2
+        client_pool = get_llm_client_pool(
+            self.recall_llm.default_model_name, max_size=max_workers
+        )
 
-                    end_time_2 = time.time()
-                    return (v, submit_time_1, end_time_2)
+        def _run(conversations, doc):
+            submit_time_1 = time.time()
+            try:
+                # 文档内容可能是延迟加载的，在工作线程中读取
+                docs = [f"##File: {doc.module_name}\n{doc.source_code}"]
+                model_name = self.recall_llm.default_model_name
 
-                m = executor.submit(
-                    _run,
-                    conversations,
-                    [f"##File: {doc.module_name}\n{doc.source_code}"],
-                )
-                future_to_doc[m] = (doc, submit_time)
+                doc_md5 = None
+                if self.relevance_cache is not None:
+                    doc_md5 = relevance_cache_key(doc, docs[0])
+                    v = self.relevance_cache.get(
+                        "relevance",
+                        conversations,
+                        doc_md5,
+                        model_name,
+                        extra=rag_config.filter_config,
+                    )
+                    if v is not None:
+                        return (v, submit_time_1, time.time(), 0)
 
-        relevant_docs = []
-        for future in as_completed(list(future_to_doc.keys())):
-            try:
-                doc, submit_time = future_to_doc[future]
-                end_time = time.time()
-                v, submit_time_1, end_time_2 = future.result()
-                task_timing = TaskTiming(
-                    submit_time=submit_time,
-                    end_time=end_time,
-                    duration=end_time - submit_time,
-                    real_start_time=submit_time_1,
-                    real_end_time=end_time_2,
-                    real_duration=end_time_2 - submit_time_1,
-                )                
-
-                relevance = parse_relevance(v)
-                logger.info(
-                    f"Document filtering progress:\n"
-                    f"  - File: {doc.module_name}\n"
-                    f"  - Relevance: {'Relevant' if relevance and relevance.is_relevant else 'Not Relevant'}\n"
-                    f"  - Score: {relevance.relevant_score if relevance else 'N/A'}\n"
-                    f"  - Raw Response: {v}\n"
-                    f"  - Timing:\n"
-                    f"    * Total Duration: {task_timing.duration:.2f}s\n"
-                    f"    * Real Duration: {task_timing.real_duration:.2f}s\n"
-                    f"    * Queue Time: {(task_timing.real_start_time - task_timing.submit_time):.2f}s"
-                )
-                if (
-                    relevance
-                    and relevance.is_relevant
-                    and relevance.relevant_score >= self.relevant_score
-                ):
-                    relevant_docs.append(
-                        FilterDoc(
-                            source_code=doc,
-                            relevance=relevance,
-                            task_timing=task_timing,
+                acquire_start_time = time.time()
+                with client_pool.acquire() as llm:
+                    client_wait_time = time.time() - acquire_start_time
+                    v = (
+                        _check_relevance_with_conversation.with_llm(
+                            llm)
+                        .options({"llm_config": {"max_length": 10}})
+                        .run(
+                            conversations=conversations,
+                            documents=docs,
+                            filter_config=rag_config.filter_config,
                         )
                     )
-            except Exception as exc:
-                try:
-                    doc, submit_time = future_to_doc[future]
-                    logger.error(
-                        f"Filtering document generated an exception (doc: {doc.module_name}): {exc}")
-                except Exception as e:
-                    logger.error(
-                        f"Filtering document generated an exception: {exc}")
 
-        # Sort relevant_docs by relevance score in descending order
-        relevant_docs.sort(
-            key=lambda x: x.relevance.relevant_score, reverse=True)
-        return relevant_docs
-    
+                # 只缓存能被正确解析的结果
+                if self.relevance_cache is not None and parse_relevance(v):
+                    self.relevance_cache.put(
+                        "relevance",
+                        conversations,
+                        doc_md5,
+                        model_name,
+                        v,
+                        extra=rag_config.filter_config,
+                    )
+            except Exception as e:
+                logger.error(
+                    f"Error in _check_relevance_with_conversation: {str(e)}"
+                )
+                return (None, submit_time_1, time.time(), 0)
+
+            end_time_2 = time.time()
+            return (v, submit_time_1, end_time_2, client_wait_time)
+
+        start_time = time.time()
+        doc_iter = iter(documents)
+        future_to_doc = {}
+        submitted = 0
+        collected = 0
+        collected_tokens = 0
+        stop_reason = None
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            exhausted = False
+            while True:
+                while not exhausted and len(future_to_doc) < max_in_flight:
+                    doc = next(doc_iter, None)
+                    if doc is None:
+                        exhausted = True
+                        break
+                    m = executor.submit(_run, conversations, doc)
+                    future_to_doc[m] = (doc, time.time())
+                    submitted += 1
+
+                if not future_to_doc:
+                    break
+
+                timeout = None
+                if deadline:
+                    timeout = max(0, start_time + deadline - time.time())
+                done, _ = wait(
+                    list(future_to_doc.keys()),
+                    timeout=timeout,
+                    return_when=FIRST_COMPLETED,
+                )
+                if not done:
+                    stop_reason = f"deadline {deadline}s reached"
+                    break
+
+                for future in done:
+                    doc, submit_time = future_to_doc.pop(future)
+                    filter_doc = self._to_filter_doc(future, doc, submit_time)
+                    if filter_doc is None:
+                        continue
+                    collected += 1
+                    if filter_doc.source_code.tokens > 0:
+                        collected_tokens += filter_doc.source_code.tokens
+                    yield filter_doc
+
+                if top_k and collected >= top_k:
+                    stop_reason = f"top_k {top_k} reached"
+                elif token_budget and collected_tokens >= token_budget:
+                    stop_reason = f"token budget {token_budget} reached"
+                if stop_reason:
+                    break
+        finally:
+            for future in future_to_doc:
+                future.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if stop_reason:
+            logger.info(
+                f"Document filtering stopped early ({stop_reason}): "
+                f"{collected} relevant docs ({collected_tokens} tokens) collected, "
+                f"{submitted} docs submitted, {len(future_to_doc)} in flight dropped"
+            )
+        else:
+            logger.info(f"Filtered {submitted} documents....")
+
+        pool_stats = client_pool.stats()
+        logger.info(
+            f"Recall model client pool: {pool_stats['created']} clients created, "
+            f"avg wait {pool_stats['avg_wait_time']:.2f}s, max wait {pool_stats['max_wait_time']:.2f}s"
+        )
+
+    def _to_filter_doc(
+        self, future: Future, doc: SourceCode, submit_time: float
+    ) -> Optional[FilterDoc]:
+        try:
+            end_time = time.time()
+            v, submit_time_1, end_time_2, client_wait_time = future.result()
+            task_timing = TaskTiming(
+                submit_time=submit_time,
+                end_time=end_time,
+                duration=end_time - submit_time,
+                real_start_time=submit_time_1,
+                real_end_time=end_time_2,
+                real_duration=end_time_2 - submit_time_1,
+                client_wait_time=client_wait_time,
+            )                
+
+            relevance = parse_relevance(v)
+            logger.info(
+                f"Document filtering progress:\n"
+                f"  - File: {doc.module_name}\n"
+                f"  - Relevance: {'Relevant' if relevance and relevance.is_relevant else 'Not Relevant'}\n"
+                f"  - Score: {relevance.relevant_score if relevance else 'N/A'}\n"
+                f"  - Raw Response: {v}\n"
+                f"  - Timing:\n"
+                f"    * Total Duration: {task_timing.duration:.2f}s\n"
+                f"    * Real Duration: {task_timing.real_duration:.2f}s\n"
+                f"    * Queue Time: {(task_timing.real_start_time - task_timing.submit_time):.2f}s\n"
+                f"    * Client Wait Time: {task_timing.client_wait_time:.2f}s"
+            )
+            if (
+                relevance
+                and relevance.is_relevant
+                and relevance.relevant_score >= self.relevant_score
+            ):
+                return FilterDoc(
+                    source_code=doc,
+                    relevance=relevance,
+                    task_timing=task_timing,
+                )
+        except Exception as exc:
+            logger.error(
+                f"Filtering document generated an exception (doc: {doc.module_name}): {exc}")
+        return None
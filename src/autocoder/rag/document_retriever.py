@@ -20,13 +20,20 @@ from autocoder.rag.cache.base_cache import BaseCacheManager
 from autocoder.rag.cache.simple_cache import AutoCoderRAGAsyncUpdateQueue
 from autocoder.rag.cache.file_monitor_cache import AutoCoderRAGDocListener
 from autocoder.rag.cache.byzer_storage_cache import ByzerStorageCache
+from autocoder.rag.cache.segment_store import SegmentCacheStore
+from autocoder.rag.cache.content_store import LazySourceCode, iter_lazy_documents
+from autocoder.rag.cache.simple_cache import generate_content_md5
+from autocoder.rag.lexical_index import BM25Index
+from autocoder.rag.document_splitter import TokenSplitter
 from autocoder.rag.utils import process_file_in_multi_process, process_file_local
 from autocoder.common import AutoCoderArgs
 
 cache_lock = threading.Lock()
 
 
-def get_or_create_actor(path: str, ignore_spec, required_exts: list, cacher={}):
+def get_or_create_actor(
+    path: str, ignore_spec, required_exts: list, cacher={}, scan_interval: float = 0
+):
     with cache_lock:
         # 处理路径名
         actor_name = "AutoCoderRAGAsyncUpdateQueue_" + path.replace(
@@ -40,7 +47,7 @@ def get_or_create_actor(path: str, ignore_spec, required_exts: list, cacher={}):
             actor = (
                 ray.remote(AutoCoderRAGAsyncUpdateQueue)
                 .options(name=actor_name, num_cpus=0)
-                .remote(path, ignore_spec, required_exts)
+                .remote(path, ignore_spec, required_exts, scan_interval)
             )
             ray.get(actor.load_first.remote())
         cacher[actor_name] = actor
@@ -91,9 +98,20 @@ class LocalDocumentRetriever(BaseDocumentRetriever):
         # 合并后的最大文件大小
         self.small_file_merge_limit = self.single_file_token_limit / 2
 
+        scan_interval = extra_params.rag_cache_scan_interval if extra_params else 0
+
+        # 按 token 切分超大文档，结果按内容 md5 缓存
+        self.splitter = TokenSplitter()
+
+        # 本地 BM25 索引，用于在 LLM 过滤之前做词法预筛选
+        self.lexical_index = BM25Index()
+        self.lexical_index_lock = threading.Lock()
+
         self.on_ray = on_ray
         if self.on_ray:
-            self.cacher = get_or_create_actor(path, ignore_spec, required_exts)
+            self.cacher = get_or_create_actor(
+                path, ignore_spec, required_exts, scan_interval=scan_interval
+            )
         else:
             if self.enable_hybrid_index:
                 self.cacher = ByzerStorageCache(
@@ -106,7 +124,7 @@ class LocalDocumentRetriever(BaseDocumentRetriever):
                     )
                 else:
                     self.cacher = AutoCoderRAGAsyncUpdateQueue(
-                        path, ignore_spec, required_exts
+                        path, ignore_spec, required_exts, scan_interval=scan_interval
                     )
 
         logger.info(f"DocumentRetriever initialized with:")
@@ -134,31 +152,100 @@ class LocalDocumentRetriever(BaseDocumentRetriever):
         logger.info("Starting document retrieval process")
         waiting_list = []
         waiting_tokens = 0
-        for _, data in self.get_cache(options=options).items():
-            for source_code in data["content"]:
-                doc = SourceCode.model_validate(source_code)
-                if self.disable_auto_window:
+        for doc in self._iter_cached_documents(options=options):
+            if self.disable_auto_window:
+                yield doc
+            else:
+                if doc.tokens <= 0:
                     yield doc
+                elif doc.tokens < self.small_file_token_limit:
+                    waiting_list, waiting_tokens = self._add_to_waiting_list(
+                        doc, waiting_list, waiting_tokens
+                    )
+                    if waiting_tokens >= self.small_file_merge_limit:
+                        yield from self._process_waiting_list(waiting_list)
+                        waiting_list = []
+                        waiting_tokens = 0
+                elif doc.tokens > self.single_file_token_limit:
+                    yield from self._split_large_document(doc)
                 else:
-                    if doc.tokens <= 0:
-                        yield doc
-                    elif doc.tokens < self.small_file_token_limit:
-                        waiting_list, waiting_tokens = self._add_to_waiting_list(
-                            doc, waiting_list, waiting_tokens
-                        )
-                        if waiting_tokens >= self.small_file_merge_limit:
-                            yield from self._process_waiting_list(waiting_list)
-                            waiting_list = []
-                            waiting_tokens = 0
-                    elif doc.tokens > self.single_file_token_limit:
-                        yield from self._split_large_document(doc)
-                    else:
-                        yield doc
+                    yield doc
         if waiting_list and not self.disable_auto_window:
             yield from self._process_waiting_list(waiting_list)
 
         logger.info("Document retrieval process completed")
 
+    def _iter_cached_documents(
+        self, options: Optional[Dict[str, Any]] = None
+    ) -> Generator[SourceCode, None, None]:
+        options = options or {}
+        cache = self.get_cache(options=options)
+
+        keys = None
+        lexical_top_n = options.get("lexical_top_n") or 0
+        # hybrid index 已经基于检索缩小了范围，不再做词法预筛选
+        if lexical_top_n > 0 and options.get("query") and not self.enable_hybrid_index:
+            keys = self._lexical_candidates(cache, options["query"], lexical_top_n)
+
+        if isinstance(cache, SegmentCacheStore):
+            # 只使用内存中的元数据表，内容在真正需要时才从磁盘读取
+            yield from iter_lazy_documents(cache, keys=keys)
+        else:
+            for key in cache.keys() if keys is None else keys:
+                for source_code in cache[key]["content"]:
+                    yield SourceCode.model_validate(source_code)
+
+    def _cache_entry_version(self, cache, key: str) -> str:
+        if isinstance(cache, SegmentCacheStore):
+            meta = cache.get_meta(key)
+            return meta.get("md5") or str(meta.get("modify_time", ""))
+        data = cache[key]
+        if data.get("md5"):
+            return data["md5"]
+        return generate_content_md5(
+            "".join(doc["source_code"] for doc in data["content"])
+        )
+
+    def _sync_lexical_index(self, cache):
+        """根据缓存增量更新 BM25 索引，只有新增或变化的文件才会被重新读取"""
+        current_keys = set()
+        updated = 0
+        for key in list(cache.keys()):
+            current_keys.add(key)
+            version = self._cache_entry_version(cache, key)
+            if key in self.lexical_index and self.lexical_index.get_version(key) == version:
+                continue
+            data = cache.get(key)
+            if not data:
+                continue
+            text = "\n".join(
+                [key] + [doc["source_code"] for doc in data["content"]]
+            )
+            self.lexical_index.add(key, text, version)
+            updated += 1
+
+        removed = [k for k in self.lexical_index.doc_ids() if k not in current_keys]
+        for key in removed:
+            self.lexical_index.remove(key)
+        if updated or removed:
+            logger.info(
+                f"Lexical index updated: {updated} updated, {len(removed)} removed, {len(self.lexical_index)} total"
+            )
+
+    def _lexical_candidates(self, cache, query: str, top_n: int) -> Optional[List[str]]:
+        with self.lexical_index_lock:
+            self._sync_lexical_index(cache)
+            results = self.lexical_index.search(query, top_n)
+        if not results:
+            logger.warning(
+                "Lexical pre-filter found no matching documents, falling back to all documents"
+            )
+            return None
+        logger.info(
+            f"Lexical pre-filter kept {len(results)} of {len(self.lexical_index)} files (top_n: {top_n})"
+        )
+        return [key for key, _ in results]
+
     def _add_to_waiting_list(
         self, doc: SourceCode, waiting_list: List[SourceCode], waiting_tokens: int
     ) -> Tuple[List[SourceCode], int]:
@@ -174,60 +261,79 @@ class LocalDocumentRetriever(BaseDocumentRetriever):
             yield self._merge_documents(waiting_list)
 
     def _merge_documents(self, docs: List[SourceCode]) -> SourceCode:
-        merged_content = "\n".join(
-            [f"#File: {doc.module_name}\n{doc.source_code}" for doc in docs]
+        def merged_content():
+            return "\n".join(
+                [f"#File: {doc.module_name}\n{doc.source_code}" for doc in docs]
+            )
+
+        # 每个文件前的 "#File: ..." 标题以及文件之间的换行也会占用 token
+        headers = [
+            ("\n" if i else "") + f"#File: {doc.module_name}\n"
+            for i, doc in enumerate(docs)
+        ]
+        merged_tokens = sum([doc.tokens for doc in docs]) + self._count_header_tokens(
+            headers
         )
-        merged_tokens = sum([doc.tokens for doc in docs])
         merged_name = f"Merged_{len(docs)}_docs_{str(uuid4())}"
         logger.info(
             f"Merged {len(docs)} documents into {merged_name} (tokens: {merged_tokens})."
         )
-        return SourceCode(
+        return LazySourceCode.create(
+            loader=merged_content,
             module_name=merged_name,
-            source_code=merged_content,
             tokens=merged_tokens,
             metadata={"original_docs": [doc.module_name for doc in docs]},
         )
 
+    def _count_header_tokens(self, headers: List[str]) -> int:
+        tokenizer = VariableHolder.TOKENIZER_MODEL
+        if tokenizer is not None:
+            try:
+                return sum(
+                    len(e.ids)
+                    for e in tokenizer.encode_batch(headers, add_special_tokens=False)
+                )
+            except Exception as e:
+                logger.warning(f"Failed to count header tokens: {e}")
+        # 没有 tokenizer 时按 4 个字符一个 token 估算
+        return sum((len(header) + 3) // 4 for header in headers)
+
     def _split_large_document(
         self, doc: SourceCode
     ) -> Generator[SourceCode, None, None]:
         chunk_size = self.single_file_token_limit
-        total_chunks = (doc.tokens + chunk_size - 1) // chunk_size
+        # 缓存中已经记录了内容哈希时直接作为切分缓存的 key，命中时不需要读取文档
+        content_md5 = getattr(doc, "content_md5", None)
+        ranges = self.splitter.split(
+            lambda: doc.source_code,
+            chunk_size,
+            total_tokens=doc.tokens,
+            content_key=content_md5,
+        )
         logger.info(
-            f"Splitting document {doc.module_name} into {total_chunks} chunks")
-        for i in range(0, doc.tokens, chunk_size):
-            chunk_content = doc.source_code[i: i + chunk_size]
-            chunk_tokens = min(chunk_size, doc.tokens - i)
-            chunk_name = f"{doc.module_name}#chunk{i//chunk_size+1}"
+            f"Splitting document {doc.module_name} into {len(ranges)} chunks")
+        for chunk_index, (start, end, chunk_tokens) in enumerate(ranges, 1):
+            chunk_name = f"{doc.module_name}#chunk{chunk_index}"
             # logger.debug(f"  Created chunk: {chunk_name} (tokens: {chunk_tokens})")
-            yield SourceCode(
+            yield LazySourceCode.create(
+                loader=lambda start=start, end=end: doc.source_code[start:end],
                 module_name=chunk_name,
-                source_code=chunk_content,
                 tokens=chunk_tokens,
                 metadata={
                     "original_doc": doc.module_name,
-                    "chunk_index": i // chunk_size + 1,
+                    "chunk_index": chunk_index,
                 },
             )
 
     def _split_document(
         self, doc: SourceCode, token_limit: int
     ) -> Generator[SourceCode, None, None]:
-        remaining_tokens = doc.tokens
-        chunk_number = 1
-        start_index = 0
-
-        while remaining_tokens > 0:
-            end_index = start_index + token_limit
-            chunk_content = doc.source_code[start_index:end_index]
-            chunk_tokens = min(token_limit, remaining_tokens)
-
+        source_code = doc.source_code
+        ranges = self.splitter.split(source_code, token_limit, total_tokens=doc.tokens)
+        for chunk_number, (start, end, chunk_tokens) in enumerate(ranges, 1):
             chunk_name = f"{doc.module_name}#{chunk_number:06d}"
             yield SourceCode(
-                module_name=chunk_name, source_code=chunk_content, tokens=chunk_tokens
+                module_name=chunk_name,
+                source_code=source_code[start:end],
+                tokens=chunk_tokens,
             )
-
-            start_index = end_index
-            remaining_tokens -= chunk_tokens
-            chunk_number += 1
@@ -0,0 +1,129 @@
+import hashlib
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple, Union
+
+from loguru import logger
+from autocoder.rag.variable_holder import VariableHolder
+
+# (起始字符位置, 结束字符位置, token 数)
+SplitRange = Tuple[int, int, int]
+
+
+def _find_boundary(text: str, start: int, limit: int) -> int:
+    """
+    在 (start, limit] 中找一个尽量靠后的切分点：优先段落边界，其次行边界。
+    切分点不会早于窗口的一半，避免产生过小的分块；找不到时直接在 limit 处切分。
+    """
+    if limit >= len(text):
+        return len(text)
+    floor = start + (limit - start) // 2
+    for sep in ("\n\n", "\n"):
+        pos = text.rfind(sep, floor, limit)
+        if pos != -1:
+            return pos + len(sep)
+    return limit
+
+
+class TokenSplitter:
+    """
+    按 token 数切分长文档。
+
+    有 tokenizer 时使用其 offset mapping 精确地把 token 上限换算成字符位置，
+    然后在附近的段落/行边界处切分；没有 tokenizer 时根据文档整体的字符/token 比例估算。
+    切分结果（只保存字符范围和 token 数）按文档内容的 md5 缓存。
+    调用方已经有内容哈希时可以通过 content_key 传入，text 也可以是延迟读取内容的函数，
+    这样命中缓存时既不需要读取文档也不需要重新计算哈希。
+    """
+
+    def __init__(self, tokenizer=None, cache_size: int = 256):
+        self.tokenizer = tokenizer
+        self.cache_size = cache_size
+        self.cache: "OrderedDict[Tuple[str, int, bool], List[SplitRange]]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_tokenizer(self):
+        return self.tokenizer or VariableHolder.TOKENIZER_MODEL
+
+    def split(
+        self,
+        text: Union[str, Callable[[], str]],
+        token_limit: int,
+        total_tokens: Optional[int] = None,
+        content_key: Optional[str] = None,
+    ) -> List[SplitRange]:
+        token_limit = max(1, int(token_limit))
+        tokenizer = self.get_tokenizer()
+        if content_key is None:
+            if callable(text):
+                text = text()
+            content_key = hashlib.md5(text.encode("utf-8")).hexdigest()
+        key = (content_key, token_limit, tokenizer is not None)
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+
+        if callable(text):
+            text = text()
+        ranges = None
+        if tokenizer is not None:
+            try:
+                ranges = self._split_with_offsets(tokenizer, text, token_limit)
+            except Exception as e:
+                logger.warning(f"Failed to split document with tokenizer: {e}")
+        if ranges is None:
+            ranges = self._split_estimated(text, token_limit, total_tokens)
+
+        with self.lock:
+            self.cache[key] = ranges
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return ranges
+
+    def _split_with_offsets(
+        self, tokenizer, text: str, token_limit: int
+    ) -> List[SplitRange]:
+        offsets = tokenizer.encode(text, add_special_tokens=False).offsets
+        starts = [offset[0] for offset in offsets]
+        total = len(starts)
+
+        ranges = []
+        start, token_index = 0, 0
+        while start < len(text):
+            if total - token_index <= token_limit:
+                ranges.append((start, len(text), total - token_index))
+                break
+            # 第 token_limit + 1 个 token 的起始位置就是本块最多能到达的字符位置
+            limit = starts[token_index + token_limit]
+            end = _find_boundary(text, start, limit)
+            if end <= start:
+                end = limit
+            next_token_index = bisect_left(starts, end, lo=token_index)
+            if next_token_index <= token_index:
+                # 单个 token 覆盖了整个窗口，至少前进一个 token
+                next_token_index = token_index + 1
+                end = starts[next_token_index] if next_token_index < total else len(text)
+            ranges.append((start, end, next_token_index - token_index))
+            start, token_index = end, next_token_index
+        return ranges
+
+    def _split_estimated(
+        self, text: str, token_limit: int, total_tokens: Optional[int]
+    ) -> List[SplitRange]:
+        chars_per_token = (
+            len(text) / total_tokens if total_tokens and total_tokens > 0 else 4.0
+        )
+        char_limit = max(1, int(token_limit * chars_per_token))
+
+        ranges = []
+        start = 0
+        while start < len(text):
+            end = _find_boundary(text, start, min(len(text), start + char_limit))
+            if end <= start:
+                end = min(len(text), start + char_limit)
+            tokens = max(1, int(round((end - start) / chars_per_token)))
+            ranges.append((start, end, min(tokens, token_limit)))
+            start = end
+        return ranges
@@ -0,0 +1,103 @@
+import re
+import math
+import heapq
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9_]+|[\u4e00-\u9fff\u3400-\u4dbf]+")
+_CJK_PATTERN = re.compile(r"[\u4e00-\u9fff\u3400-\u4dbf]")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    英文/数字按单词切分，中文按单字 + 相邻双字切分。
+    """
+    tokens = []
+    for match in _TOKEN_PATTERN.findall(text.lower()):
+        if _CJK_PATTERN.match(match):
+            tokens.extend(match)
+            tokens.extend(match[i : i + 2] for i in range(len(match) - 1))
+        else:
+            tokens.append(match)
+    return tokens
+
+
+class BM25Index:
+    """
+    纯内存、可增量更新的 BM25 倒排索引。
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.lock = threading.RLock()
+        # term -> {doc_id: term frequency}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.doc_terms: Dict[str, List[str]] = {}
+        self.versions: Dict[str, Optional[str]] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def __contains__(self, doc_id: object) -> bool:
+        return doc_id in self.doc_lengths
+
+    def doc_ids(self) -> List[str]:
+        with self.lock:
+            return list(self.doc_lengths.keys())
+
+    def get_version(self, doc_id: str) -> Optional[str]:
+        return self.versions.get(doc_id)
+
+    def add(self, doc_id: str, text: str, version: Optional[str] = None):
+        counts = Counter(tokenize(text))
+        with self.lock:
+            self.remove(doc_id)
+            for term, tf in counts.items():
+                self.postings.setdefault(term, {})[doc_id] = tf
+            length = sum(counts.values())
+            self.doc_lengths[doc_id] = length
+            self.doc_terms[doc_id] = list(counts.keys())
+            self.versions[doc_id] = version
+            self.total_length += length
+
+    def remove(self, doc_id: str):
+        with self.lock:
+            if doc_id not in self.doc_lengths:
+                return
+            for term in self.doc_terms.pop(doc_id):
+                posting = self.postings.get(term)
+                if posting is None:
+                    continue
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self.postings[term]
+            self.total_length -= self.doc_lengths.pop(doc_id)
+            self.versions.pop(doc_id, None)
+
+    def search(self, query: str, top_n: int) -> List[Tuple[str, float]]:
+        """返回得分最高的 top_n 个 (doc_id, score)，得分为 0 的文档不返回"""
+        query_terms = set(tokenize(query))
+        with self.lock:
+            num_docs = len(self.doc_lengths)
+            if num_docs == 0 or not query_terms:
+                return []
+            avg_length = self.total_length / num_docs or 1
+            scores: Dict[str, float] = {}
+            for term in query_terms:
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                df = len(posting)
+                idf = math.log(1 + (num_docs - df + 0.5) / (df + 0.5))
+                for doc_id, tf in posting.items():
+                    norm = self.k1 * (
+                        1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length
+                    )
+                    scores[doc_id] = scores.get(doc_id, 0) + idf * tf * (
+                        self.k1 + 1
+                    ) / (tf + norm)
+        return heapq.nlargest(top_n, scores.items(), key=lambda x: x[1])
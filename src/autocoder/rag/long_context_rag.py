@@ -18,6 +18,7 @@ import traceback
 from autocoder.common import AutoCoderArgs, SourceCode
 from autocoder.rag.doc_filter import DocFilter
 from autocoder.rag.document_retriever import LocalDocumentRetriever
+from autocoder.rag.relevance_cache import RelevanceCache
 from autocoder.rag.relevant_utils import (
     DocRelevance,
     FilterDoc,
@@ -42,6 +43,28 @@ except ImportError:
     LLMComputeEngine = None
 
 
+def parse_query_options(query: str) -> Tuple[str, bool, Optional[int]]:
+    """
+    解析 JSON 形式的查询 {"query": ..., "only_contexts": ..., "lexical_top_n": ...}，各字段都可以单独出现；
+    不是 JSON 对象时原样返回。返回 (query, only_contexts, lexical_top_n)
+    """
+    try:
+        v = json.loads(query)
+    except (json.JSONDecodeError, TypeError):
+        return query, False, None
+    if not isinstance(v, dict):
+        return query, False, None
+
+    lexical_top_n = v.get("lexical_top_n")
+    if lexical_top_n is not None:
+        try:
+            lexical_top_n = int(lexical_top_n)
+        except (TypeError, ValueError):
+            logger.warning(f"Ignore invalid lexical_top_n: {lexical_top_n}")
+            lexical_top_n = None
+    return v.get("query", query), bool(v.get("only_contexts", False)), lexical_top_n
+
+
 class LongContextRAG:
     def __init__(
         self,
@@ -137,8 +160,20 @@ class LongContextRAG:
             extra_params=self.args
         )
 
+        self.relevance_cache = None
+        if not self.args.disable_rag_relevance_cache and self.path:
+            self.relevance_cache = RelevanceCache(
+                os.path.join(self.path, ".cache", "relevance_cache.db"),
+                ttl=self.args.rag_relevance_cache_ttl,
+                max_entries=self.args.rag_relevance_cache_max_entries,
+            )
+
         self.doc_filter = DocFilter(
-            self.index_model, self.args, on_ray=self.on_ray, path=self.path
+            self.index_model,
+            self.args,
+            on_ray=self.on_ray,
+            path=self.path,
+            relevance_cache=self.relevance_cache,
         )
 
         doc_num = 0
@@ -163,6 +198,10 @@ class LongContextRAG:
             f"  Full text limit:   {self.full_text_limit}\n"
             f"  Segment limit:     {self.segment_limit}\n"
             f"  Buff limit:        {self.buff_limit}\n"
+            f"  Lexical top n:     {self.args.rag_lexical_top_n}\n"
+            f"  Filter early stop: {self.args.rag_filter_early_stop}\n"
+            f"  Filter top k:      {self.args.rag_filter_top_k}\n"
+            f"  Filter deadline:   {self.args.rag_filter_deadline}\n"
             f"  Max doc tokens:    {max(token_counts) if token_counts else 0}\n"
             f"  Min doc tokens:    {min(token_counts) if token_counts else 0}\n"
             f"  Avg doc tokens:    {avg_tokens:.2f}\n"
@@ -174,6 +213,11 @@ class LongContextRAG:
             return -1
         return self.tokenizer.count_tokens(text)
 
+    def count_tokens_batch(self, texts: List[str]) -> List[int]:
+        if self.tokenizer is None:
+            return [-1] * len(texts)
+        return self.tokenizer.count_tokens_batch(texts)
+
     @byzerllm.prompt()
     def extract_relevance_info_from_docs_with_conversation(
         self, conversations: List[Dict[str, str]], documents: List[str]
@@ -301,12 +345,49 @@ class LongContextRAG:
                 url = ",".join(contexts)
                 return [SourceCode(module_name=f"RAG:{url}", source_code="".join(v))]
 
-    def _filter_docs(self, conversations: List[Dict[str, str]]) -> List[FilterDoc]:
+    def _filter_docs(
+        self,
+        conversations: List[Dict[str, str]],
+        lexical_top_n: Optional[int] = None,
+    ) -> List[FilterDoc]:
+        """
+        返回按相关性从高到低排序的相关文档。
+
+        回答需要完整排序的文档列表才能经过 TokenLimiter 组装上下文，所以这里会等过滤结束，
+        而不是边过滤边回答。配置了 rag_filter_early_stop/rag_filter_top_k 时可以提前结束；
+        rag_filter_deadline 是开始回答前等待过滤的时间上限（已经发出的请求返回前不会多等）。
+        """
         query = conversations[-1]["content"]
-        documents = self._retrieve_documents(options={"query":query})
-        return self.doc_filter.filter_docs(
-            conversations=conversations, documents=documents
+        if lexical_top_n is None:
+            lexical_top_n = self.args.rag_lexical_top_n
+        documents = self._retrieve_documents(
+            options={"query": query, "lexical_top_n": lexical_top_n}
+        )
+        if not (
+            self.args.rag_filter_early_stop
+            or self.args.rag_filter_top_k
+            or self.args.rag_filter_deadline
+        ):
+            return self.doc_filter.filter_docs(
+                conversations=conversations, documents=documents
+            )
+
+        ## 找到足够多的相关文档（能填满 TokenLimiter 的全文区和片段区）或超时后，
+        ## 不再等待剩余文档的相关性判断，避免单个慢请求拖慢首个 token 的返回
+        token_budget = None
+        if self.args.rag_filter_early_stop:
+            token_budget = self.full_text_limit + self.segment_limit
+        relevant_docs = list(
+            self.doc_filter.filter_docs_stream(
+                conversations=conversations,
+                documents=documents,
+                token_budget=token_budget,
+                top_k=self.args.rag_filter_top_k,
+                deadline=self.args.rag_filter_deadline,
+            )
         )
+        relevant_docs.sort(key=lambda x: x.relevance.relevant_score, reverse=True)
+        return relevant_docs
 
     def stream_chat_oai(
         self,
@@ -422,19 +503,14 @@ class LongContextRAG:
                 )
 
 
-            only_contexts = False
-            try:
-                v = json.loads(query)
-                if "only_contexts" in v:
-                    query = v["query"]
-                    only_contexts = v["only_contexts"]
-                    conversations[-1]["content"] = query
-            except json.JSONDecodeError:
-                pass
+            query, only_contexts, lexical_top_n = parse_query_options(query)
+            conversations[-1]["content"] = query
 
             logger.info(f"Query: {query} only_contexts: {only_contexts}")
             start_time = time.time()
-            relevant_docs: List[FilterDoc] = self._filter_docs(conversations)
+            relevant_docs: List[FilterDoc] = self._filter_docs(
+                conversations, lexical_top_n=lexical_top_n
+            )
             filter_time = time.time() - start_time
 
             # Filter relevant_docs to only include those with is_relevant=True
@@ -509,11 +585,13 @@ class LongContextRAG:
 
                 token_limiter = TokenLimiter(
                     count_tokens=self.count_tokens,
+                    count_tokens_batch=self.count_tokens_batch,
                     full_text_limit=self.full_text_limit,
                     segment_limit=self.segment_limit,
                     buff_limit=self.buff_limit,
                     llm=self.llm,
                     disable_segment_reorder=self.args.disable_segment_reorder,
+                    relevance_cache=self.relevance_cache,
                 )
                 final_relevant_docs = token_limiter.limit_tokens(
                     relevant_docs=relevant_docs,
@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional
+from loguru import logger
+
+
+def normalize_conversations(conversations: List[Dict[str, str]]) -> List[List[str]]:
+    """忽略大小写和多余空白，让几乎相同的问题命中同一条缓存"""
+    return [
+        [msg.get("role", ""), " ".join(str(msg.get("content", "")).split()).lower()]
+        for msg in conversations
+    ]
+
+
+class RelevanceCache:
+    """
+    持久化的文档相关性判断缓存（SQLite）。
+
+    缓存 key 由 (kind, 归一化后的对话, 文档内容 md5, 模型名, 额外参数) 计算得到，
+    用于缓存 DocFilter 的相关性判断结果以及 TokenLimiter 抽取的行号范围。
+    支持 TTL 过期以及按最近访问时间淘汰的条数上限。
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        ttl: float = 7 * 24 * 3600,
+        max_entries: int = 100000,
+        evict_every: int = 100,
+    ):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self.lock = threading.Lock()
+        self.puts_since_evict = 0
+
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS relevance_cache (
+                    key TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_relevance_cache_accessed_at ON relevance_cache(accessed_at)"
+            )
+            self.conn.commit()
+
+    @staticmethod
+    def make_key(
+        kind: str,
+        conversations: List[Dict[str, str]],
+        doc_md5: str,
+        model: str,
+        extra: Optional[Any] = None,
+    ) -> str:
+        payload = json.dumps(
+            [kind, normalize_conversations(conversations), doc_md5, model, extra],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(
+        self,
+        kind: str,
+        conversations: List[Dict[str, str]],
+        doc_md5: str,
+        model: str,
+        extra: Optional[Any] = None,
+    ) -> Optional[Any]:
+        key = self.make_key(kind, conversations, doc_md5, model, extra)
+        now = time.time()
+        try:
+            with self.lock:
+                row = self.conn.execute(
+                    "SELECT value, created_at FROM relevance_cache WHERE key = ?",
+                    (key,),
+                ).fetchone()
+                if row is None:
+                    return None
+                value, created_at = row
+                if self.ttl and now - created_at > self.ttl:
+                    self.conn.execute("DELETE FROM relevance_cache WHERE key = ?", (key,))
+                    self.conn.commit()
+                    return None
+                self.conn.execute(
+                    "UPDATE relevance_cache SET accessed_at = ? WHERE key = ?",
+                    (now, key),
+                )
+                self.conn.commit()
+            return json.loads(value)
+        except Exception as e:
+            logger.warning(f"Failed to read relevance cache: {e}")
+            return None
+
+    def put(
+        self,
+        kind: str,
+        conversations: List[Dict[str, str]],
+        doc_md5: str,
+        model: str,
+        value: Any,
+        extra: Optional[Any] = None,
+    ):
+        key = self.make_key(kind, conversations, doc_md5, model, extra)
+        now = time.time()
+        try:
+            with self.lock:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO relevance_cache (key, kind, value, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, kind, json.dumps(value, ensure_ascii=False), now, now),
+                )
+                self.conn.commit()
+                self.puts_since_evict += 1
+                if self.puts_since_evict >= self.evict_every:
+                    self._evict(now)
+                    self.puts_since_evict = 0
+        except Exception as e:
+            logger.warning(f"Failed to write relevance cache: {e}")
+
+    def _evict(self, now: float):
+        if self.ttl:
+            self.conn.execute(
+                "DELETE FROM relevance_cache WHERE created_at < ?", (now - self.ttl,)
+            )
+        count = self.conn.execute("SELECT COUNT(*) FROM relevance_cache").fetchone()[0]
+        if self.max_entries and count > self.max_entries:
+            self.conn.execute(
+                """
+                DELETE FROM relevance_cache WHERE key IN (
+                    SELECT key FROM relevance_cache ORDER BY accessed_at ASC LIMIT ?
+                )
+                """,
+                (count - self.max_entries,),
+            )
+        self.conn.commit()
+
+    def evict(self):
+        with self.lock:
+            self._evict(time.time())
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM relevance_cache").fetchone()[0]
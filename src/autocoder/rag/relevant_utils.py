@@ -16,6 +16,7 @@ class TaskTiming(BaseModel):
     real_start_time: float = 0
     real_end_time: float = 0
     real_duration: float = 0
+    client_wait_time: float = 0
     
 class FilterDoc(BaseModel):
     source_code: SourceCode
@@ -1,4 +1,5 @@
 import time
+from typing import List
 from loguru import logger
 from tokenizers import Tokenizer
 from multiprocessing import Pool, cpu_count
@@ -19,6 +20,9 @@ class RemoteTokenCounter:
             logger.error(f"Error counting tokens: {str(e)}")
             return -1
 
+    def count_tokens_batch(self, texts: List[str]) -> List[int]:
+        return [self.count_tokens(text) for text in texts]
+
 
 def initialize_tokenizer(tokenizer_path):
     global tokenizer_model    
@@ -38,6 +42,17 @@ def count_tokens(text: str) -> int:
         return -1
 
 
+def count_tokens_batch(texts: List[str]) -> List[int]:
+    try:
+        encoded = VariableHolder.TOKENIZER_MODEL.encode_batch(
+            ['{"role":"user","content":"' + text + '"}' for text in texts]
+        )
+        return [len(e.ids) for e in encoded]
+    except Exception as e:
+        logger.error(f"Error counting tokens: {str(e)}")
+        return [-1] * len(texts)
+
+
 def count_tokens_worker(text: str) -> int:
     try:
         # start_time = time.time_ns()
@@ -51,6 +66,17 @@ def count_tokens_worker(text: str) -> int:
         return -1
 
 
+def count_tokens_batch_worker(texts: List[str]) -> List[int]:
+    try:
+        encoded = tokenizer_model.encode_batch(
+            ['{"role":"user","content":"' + text + '"}' for text in texts]
+        )
+        return [len(e.ids) for e in encoded]
+    except Exception as e:
+        logger.error(f"Error counting tokens: {str(e)}")
+        return [-1] * len(texts)
+
+
 class TokenCounter:
     def __init__(self, tokenizer_path: str):
         self.tokenizer_path = tokenizer_path
@@ -63,3 +89,6 @@ class TokenCounter:
 
     def count_tokens(self, text: str) -> int:
         return self.pool.apply(count_tokens_worker, (text,))
+
+    def count_tokens_batch(self, texts: List[str]) -> List[int]:
+        return self.pool.apply(count_tokens_batch_worker, (texts,))
@@ -1,14 +1,45 @@
 import json
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Callable, Dict
+from typing import List, Callable, Dict, Optional
 from loguru import logger
 from autocoder.common import SourceCode
+from autocoder.rag.relevance_cache import RelevanceCache
+from autocoder.rag.cache.simple_cache import generate_content_md5
+from autocoder.utils.llm_client_pool import get_llm_client_pool
 from byzerllm.utils.client.code_utils import extract_code
 import byzerllm
 from byzerllm import ByzerLLM
 
 
+def reorder_segments(docs: List[SourceCode]) -> List[SourceCode]:
+    """
+    把来自同一个原始文档的 segments 聚到一起并按 chunk_index 排序。
+
+    每组放在该文档第一个 segment 出现的位置，其它文档保持原有的相对顺序，
+    整体只需要一次分组遍历加上组内排序。
+    """
+    groups: Dict[str, List[SourceCode]] = {}
+    ordered: List[List[SourceCode]] = []
+    for doc in docs:
+        if "original_doc" in doc.metadata and "chunk_index" in doc.metadata:
+            original_doc_name = doc.metadata["original_doc"]
+            group = groups.get(original_doc_name)
+            if group is None:
+                group = groups[original_doc_name] = []
+                ordered.append(group)
+            group.append(doc)
+        else:
+            ordered.append([doc])
+
+    result = []
+    for group in ordered:
+        if len(group) > 1:
+            group.sort(key=lambda x: x.metadata["chunk_index"])
+        result.extend(group)
+    return result
+
+
 class TokenLimiter:
     def __init__(
         self,
@@ -18,8 +49,11 @@ class TokenLimiter:
         buff_limit: int,
         llm:ByzerLLM,
         disable_segment_reorder: bool,
+        relevance_cache: Optional[RelevanceCache] = None,
+        count_tokens_batch: Optional[Callable[[List[str]], List[int]]] = None,
     ):
         self.count_tokens = count_tokens
+        self.count_tokens_batch = count_tokens_batch
         self.full_text_limit = full_text_limit
         self.segment_limit = segment_limit
         self.buff_limit = buff_limit
@@ -32,6 +66,7 @@ class TokenLimiter:
         self.second_round_extracted_docs = []
         self.sencond_round_time = 0
         self.disable_segment_reorder = disable_segment_reorder
+        self.relevance_cache = relevance_cache
 
     @byzerllm.prompt()
     def extract_relevance_range_from_docs_with_conversation(
@@ -99,47 +134,25 @@ class TokenLimiter:
         token_count = 0
         doc_num_count = 0
 
-        reorder_relevant_docs = []
-
         ## 文档分段（单个文档过大）和重排序逻辑
         ## 1. 背景：在检索过程中，许多文档被切割成多个段落（segments）
         ## 2. 问题：这些segments在召回时因为是按相关分做了排序可能是乱序的，不符合原文顺序，会强化大模型的幻觉。
         ## 3. 目标：重新排序这些segments，确保来自同一文档的segments保持连续且按正确顺序排列。
-        ## 4. 实现方案：
-        ##    a) 方案一（保留位置）：统一文档的不同segments 根据chunk_index 来置换位置
-        ##    b) 方案二（当前实现）：遍历文档，发现某文档的segment A，立即查找该文档的所有其他segments，
-        ##       对它们进行排序，并将排序后多个segments插入到当前的segment A 位置中。
+        ## 4. 实现方案：按 original_doc 分组，每组放在该文档第一个 segment 出现的位置，
+        ##    组内按 chunk_index 排序，见 reorder_segments。
         ## TODO:
         ##     1. 未来根据参数决定是否开启重排以及重排的策略
         if not self.disable_segment_reorder:
-            num_count = 0
-            for doc in relevant_docs:
-                num_count += 1
-                reorder_relevant_docs.append(doc)
-                if "original_doc" in doc.metadata and "chunk_index" in doc.metadata:
-                    original_doc_name = doc.metadata["original_doc"]
-
-                    temp_docs = []
-                    for temp_doc in relevant_docs[num_count:]:
-                        if (
-                            "original_doc" in temp_doc.metadata
-                            and "chunk_index" in temp_doc.metadata
-                        ):
-                            if (
-                                temp_doc.metadata["original_doc"]
-                                == original_doc_name
-                            ):
-                                if temp_doc not in reorder_relevant_docs:
-                                    temp_docs.append(temp_doc)
-
-                    temp_docs.sort(key=lambda x: x.metadata["chunk_index"])
-                    reorder_relevant_docs.extend(temp_docs)
+            reorder_relevant_docs = reorder_segments(relevant_docs)
         else:
             reorder_relevant_docs = relevant_docs
 
+        ## 文档的 token 数在构建缓存、合并和切分时都已经算好，只有缺失的才需要重新计算
+        self.ensure_tokens(reorder_relevant_docs)
+
         ## 非窗口分区实现
         for doc in reorder_relevant_docs:
-            doc_tokens = self.count_tokens(doc.source_code)
+            doc_tokens = doc.tokens
             doc_num_count += 1
             if token_count + doc_tokens <= self.full_text_limit + self.segment_limit:
                 final_relevant_docs.append(doc)
@@ -154,7 +167,7 @@ class TokenLimiter:
             new_token_limit = self.full_text_limit
             doc_num_count = 0
             for doc in reorder_relevant_docs:
-                doc_tokens = self.count_tokens(doc.source_code)
+                doc_tokens = doc.tokens
                 doc_num_count += 1
                 if token_count + doc_tokens <= new_token_limit:
                     self.first_round_full_docs.append(doc)
@@ -179,6 +192,10 @@ class TokenLimiter:
                 f"first round docs: {len(self.first_round_full_docs)} remaining docs: {len(remaining_docs)} index_filter_workers: {index_filter_workers}"
             )
 
+            # 保证客户端池至少能满足所有工作线程同时借用
+            get_llm_client_pool(
+                self.chunk_llm.default_model_name, max_size=index_filter_workers or 5
+            )
             with ThreadPoolExecutor(max_workers=index_filter_workers or 5) as executor:
                 future_to_doc = {
                     executor.submit(self.process_range_doc, doc, conversations): doc
@@ -213,6 +230,20 @@ class TokenLimiter:
 
         return final_relevant_docs
 
+    def ensure_tokens(self, docs: List[SourceCode]):
+        """为缺少 token 数的文档补齐 token 数，有批量接口时一次性计算"""
+        missing = [doc for doc in docs if doc.tokens <= 0]
+        if not missing:
+            return
+        texts = [doc.source_code for doc in missing]
+        if self.count_tokens_batch is not None:
+            counts = self.count_tokens_batch(texts)
+        else:
+            counts = [self.count_tokens(text) for text in texts]
+        for doc, tokens in zip(missing, counts):
+            doc.tokens = tokens
+        logger.info(f"Counted tokens for {len(missing)} of {len(docs)} docs")
+
     def process_range_doc(
         self, doc: SourceCode, conversations: List[Dict[str, str]], max_retries=3
     ) -> SourceCode:
@@ -223,20 +254,30 @@ class TokenLimiter:
                 source_code_lines = doc.source_code.split("\n")
                 for idx, line in enumerate(source_code_lines):
                     source_code_with_line_number += f"{idx+1} {line}\n"
-                
-                llm = ByzerLLM()
-                llm.skip_nontext_check = True
-                llm.setup_default_model_name(self.chunk_llm.default_model_name)
-
-                extracted_info = (
-                    self.extract_relevance_range_from_docs_with_conversation.options(
-                        {"llm_config": {"max_length": 100}}
+
+                model_name = self.chunk_llm.default_model_name
+                json_objs = None
+                if self.relevance_cache is not None:
+                    doc_md5 = generate_content_md5(doc.source_code)
+                    json_objs = self.relevance_cache.get(
+                        "chunk_ranges", conversations, doc_md5, model_name
                     )
-                    .with_llm(llm)
-                    .run(conversations, [source_code_with_line_number])
-                )
-                json_str = extract_code(extracted_info)[0][1]
-                json_objs = json.loads(json_str)
+
+                if json_objs is None:
+                    with get_llm_client_pool(model_name).acquire() as llm:
+                        extracted_info = (
+                            self.extract_relevance_range_from_docs_with_conversation.options(
+                                {"llm_config": {"max_length": 100}}
+                            )
+                            .with_llm(llm)
+                            .run(conversations, [source_code_with_line_number])
+                        )
+                    json_str = extract_code(extracted_info)[0][1]
+                    json_objs = json.loads(json_str)
+                    if self.relevance_cache is not None:
+                        self.relevance_cache.put(
+                            "chunk_ranges", conversations, doc_md5, model_name, json_objs
+                        )
 
                 for json_obj in json_objs:
                     start_line = json_obj["start_line"] - 1
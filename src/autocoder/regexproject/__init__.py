@@ -2,6 +2,12 @@ import re
 from autocoder.common import SourceCode, AutoCoderArgs
 from autocoder import common as FileUtils
 from autocoder.utils.rest import HttpDoc
+from autocoder.common.project_scanner import scan_project_files
+from autocoder.common.source_loader import (
+    format_source_dump,
+    iter_with_source_dump,
+    load_project_source_codes,
+)
 import os
 from typing import Optional, Generator, List, Dict, Any, Callable
 from git import Repo
@@ -39,6 +45,7 @@ class RegexProject:
         self.sources = []
         self.llm = llm
         self.regex_pattern = self.extract_regex_pattern(self.project_type)
+        self.regex = re.compile(self.regex_pattern)
 
     @byzerllm.prompt()
     def generate_regex_pattern(self, desc: str) -> str:
@@ -78,32 +85,37 @@ class RegexProject:
             raise ValueError("Invalid project_type format. Expected 'regex//<pattern>'")
 
     def output(self):
-        return open(self.target_file, "r").read()
+        return format_source_dump(self.sources)
 
     def is_regex_match(self, file_path):
-        return re.search(self.regex_pattern, file_path) is not None
+        return self.regex.search(file_path) is not None
 
     def read_file_content(self, file_path):
         with open(file_path, "r") as file:
             return file.read()
 
-    def convert_to_source_code(self, file_path):
+    def convert_to_source_code(self, file_path, text: Optional[str] = None):
         module_name = file_path
-        source_code = self.read_file_content(file_path)
+        source_code = text if text is not None else self.read_file_content(file_path)
         return SourceCode(module_name=module_name, source_code=source_code)
 
+    def get_source_file_paths(self) -> Generator[str, None, None]:
+        for file_path in scan_project_files(self.directory):
+            if self.is_regex_match(file_path):
+                if self.file_filter is None or self.file_filter(
+                    file_path, [self.regex_pattern]
+                ):
+                    yield file_path
+
     def get_source_codes(self) -> Generator[SourceCode, None, None]:
-        for root, dirs, files in os.walk(self.directory,followlinks=True):
-            for file in files:
-                file_path = os.path.join(root, file)
-                if self.is_regex_match(file_path):
-                    if self.file_filter is None or self.file_filter(
-                        file_path, [self.regex_pattern]
-                    ):
-                        logger.info(f"collect file: {file_path}")
-                        source_code = self.convert_to_source_code(file_path)
-                        if source_code is not None:
-                            yield source_code
+        def collect_file_paths():
+            for file_path in self.get_source_file_paths():
+                logger.info(f"collect file: {file_path}")
+                yield file_path
+
+        yield from load_project_source_codes(
+            collect_file_paths(), self.convert_to_source_code, self.args
+        )
 
     def get_rest_source_codes(self) -> Generator[SourceCode, None, None]:
         if self.args.urls:
@@ -187,8 +199,8 @@ class RegexProject:
         {{ structure }}
         """
         structure = []
-        for source_code in self.get_source_codes():
-            relative_path = os.path.relpath(source_code.module_name, self.directory)
+        for file_path in self.get_source_file_paths():
+            relative_path = os.path.relpath(file_path, self.directory)
             structure.append(relative_path)
 
         subs = "\n".join(sorted(structure))
@@ -203,8 +215,8 @@ class RegexProject:
         {{ structure }}
         """
         structure_dict = {}
-        for source_code in self.get_source_codes():
-            relative_path = os.path.relpath(source_code.module_name, self.directory)
+        for file_path in self.get_source_file_paths():
+            relative_path = os.path.relpath(file_path, self.directory)
             parts = relative_path.split(os.sep)
             current_level = structure_dict
             for part in parts:
@@ -227,26 +239,27 @@ class RegexProject:
             "directory": self.directory,
         }
 
-    def run(self):
+    def iter_sources(self) -> Generator[SourceCode, None, None]:
+        """
+        以流的方式产出项目的全部源码，同时收集到 self.sources 中，
+        调用方可以一边读取一边处理（例如构建索引），不需要等待全部加载完成。
+        """
         if self.git_url is not None:
             self.clone_repository()
 
-        if self.target_file:
-            with open(self.target_file, "w") as file:
-                for code in self.get_source_codes():
-                    self.sources.append(code)
-                    file.write(f"##File: {code.module_name}\n")
-                    file.write(f"{code.source_code}\n\n")
-
-                for code in self.get_rest_source_codes():
-                    self.sources.append(code)
-                    file.write(f"##File: {code.module_name}\n")
-                    file.write(f"{code.source_code}\n\n")
-
-                for code in self.get_search_source_codes():
-                    self.sources.append(code)
-                    file.write(f"##File: {code.module_name}\n")
-                    file.write(f"{code.source_code}\n\n")
+        def all_source_codes():
+            yield from self.get_source_codes()
+            yield from self.get_rest_source_codes()
+            yield from self.get_search_source_codes()
+
+        self.sources = []
+        for code in iter_with_source_dump(all_source_codes(), self.target_file, self.args):
+            self.sources.append(code)
+            yield code
+
+    def run(self):
+        for _ in self.iter_sources():
+            pass
 
     def clone_repository(self):
         if self.git_url is None:
@@ -1,6 +1,13 @@
 from autocoder.common import SourceCode, AutoCoderArgs
 from autocoder import common as FileUtils
 from autocoder.utils.rest import HttpDoc
+from autocoder.common.path_matcher import PathMatcher
+from autocoder.common.project_scanner import scan_project_files
+from autocoder.common.source_loader import (
+    format_source_dump,
+    iter_with_source_dump,
+    load_project_source_codes,
+)
 import os
 from typing import Optional, Generator, List, Dict, Any
 
@@ -24,6 +31,39 @@ class RegPattern(BaseModel):
     )
 
 
+IGNORE_DIRS = frozenset(
+    [
+        "node_modules",
+        "dist",
+        "build",
+        "coverage",
+        "public",
+        "config",
+        "__tests__",
+        "__mocks__",
+    ]
+)
+
+IGNORE_EXTENSIONS = (
+    ".json",
+    ".md",
+    ".txt",
+    ".png",
+    ".jpg",
+    ".jpeg",
+    ".gif",
+    ".svg",
+    ".ico",
+    ".css",
+    ".less",
+    ".scss",
+    ".sass",
+    ".map",
+)
+
+INCLUDE_EXTENSIONS = (".ts", ".tsx", ".js", ".jsx")
+
+
 class TSProject:
 
     def __init__(self, args: AutoCoderArgs, llm: Optional[byzerllm.ByzerLLM] = None):
@@ -48,6 +88,12 @@ class TSProject:
             ".vscode",
             ".idea",
         ]
+        # 构建产物/依赖等目录下的文件都会被 is_likely_useful_file 排除，扫描时直接剪枝
+        self.path_matcher = PathMatcher(
+            exclude_patterns=self.exclude_patterns,
+            required_exts=INCLUDE_EXTENSIONS,
+            exclude_dirs=list(self.default_exclude_dirs) + list(IGNORE_DIRS),
+        )
 
     @byzerllm.prompt()
     def generate_regex_pattern(self, desc: str) -> str:
@@ -98,13 +144,10 @@ class TSProject:
         return exclude_patterns
 
     def should_exclude(self, file_path):
-        for pattern in self.exclude_patterns:
-            if pattern.search(file_path):                
-                return True
-        return False
+        return self.path_matcher.is_excluded(file_path)
 
     def output(self):
-        return open(self.target_file, "r").read()
+        return format_source_dump(self.sources)
 
     def read_file_content(self, file_path):
         with open(file_path, "r") as file:
@@ -112,54 +155,23 @@ class TSProject:
 
     def is_likely_useful_file(self, file_path):
         # Ignore common build output, dependency and configuration directories
-        ignore_dirs = [
-            "node_modules",
-            "dist",
-            "build",
-            "coverage",
-            "public",
-            "config",
-            "__tests__",
-            "__mocks__",
-        ]
-
-        if any(dir in file_path.split(os.path.sep) for dir in ignore_dirs):
+        if not IGNORE_DIRS.isdisjoint(file_path.split(os.path.sep)):
             return False
 
         # Ignore common non-source files in React + TS projects
-        ignore_extensions = [
-            ".json",
-            ".md",
-            ".txt",
-            ".png",
-            ".jpg",
-            ".jpeg",
-            ".gif",
-            ".svg",
-            ".ico",
-            ".css",
-            ".less",
-            ".scss",
-            ".sass",
-            ".map",
-        ]
-        if any(file_path.endswith(ext) for ext in ignore_extensions):
+        if file_path.endswith(IGNORE_EXTENSIONS):
             return False
 
         # Include .ts, .tsx, .js and .jsx files
-        include_extensions = [".ts", ".tsx", ".js", ".jsx"]
-        if any(file_path.endswith(ext) for ext in include_extensions):
-            return True
-
-        return False
+        return file_path.endswith(INCLUDE_EXTENSIONS)
 
-    def convert_to_source_code(self, file_path):
+    def convert_to_source_code(self, file_path, text: Optional[str] = None):
         if not self.is_likely_useful_file(file_path):
             return None
 
         module_name = file_path
         try:
-            source_code = self.read_file_content(file_path)
+            source_code = text if text is not None else self.read_file_content(file_path)
         except Exception as e:
             logger.warning(f"Failed to read file: {file_path}. Error: {str(e)}")
             return None
@@ -169,16 +181,15 @@ class TSProject:
 
         return SourceCode(module_name=module_name, source_code=source_code)
 
+    def get_source_file_paths(self) -> Generator[str, None, None]:
+        for file_path in scan_project_files(self.directory, matcher=self.path_matcher):
+            if self.is_likely_useful_file(file_path):
+                yield file_path
+
     def get_source_codes(self) -> Generator[SourceCode, None, None]:
-        for root, dirs, files in os.walk(self.directory,followlinks=True):
-            dirs[:] = [d for d in dirs if d not in self.default_exclude_dirs]
-            for file in files:
-                file_path = os.path.join(root, file)
-                if self.should_exclude(file_path):
-                    continue
-                source_code = self.convert_to_source_code(file_path)
-                if source_code is not None:
-                    yield source_code
+        yield from load_project_source_codes(
+            self.get_source_file_paths(), self.convert_to_source_code, self.args
+        )
 
     def get_rest_source_codes(self) -> Generator[SourceCode, None, None]:
         if self.args.urls:
@@ -237,8 +248,8 @@ class TSProject:
         {{ structure }}
         """
         structure = []
-        for source_code in self.get_source_codes():
-            relative_path = os.path.relpath(source_code.module_name, self.directory)
+        for file_path in self.get_source_file_paths():
+            relative_path = os.path.relpath(file_path, self.directory)
             structure.append(relative_path)
 
         subs = "\n".join(sorted(structure))
@@ -253,8 +264,8 @@ class TSProject:
         {{ structure }}
         """
         structure_dict = {}
-        for source_code in self.get_source_codes():
-            relative_path = os.path.relpath(source_code.module_name, self.directory)
+        for file_path in self.get_source_file_paths():
+            relative_path = os.path.relpath(file_path, self.directory)
             parts = relative_path.split(os.sep)
             current_level = structure_dict
             for part in parts:
@@ -302,26 +313,27 @@ class TSProject:
             ]
         return temp + []
 
-    def run(self):
+    def iter_sources(self) -> Generator[SourceCode, None, None]:
+        """
+        以流的方式产出项目的全部源码，同时收集到 self.sources 中，
+        调用方可以一边读取一边处理（例如构建索引），不需要等待全部加载完成。
+        """
         if self.git_url is not None:
             self.clone_repository()
 
-        if self.target_file:
-            with open(self.target_file, "w") as file:
-                for code in self.get_rest_source_codes():
-                    self.sources.append(code)
-                    file.write(f"##File: {code.module_name}\n")
-                    file.write(f"{code.source_code}\n\n")
-
-                for code in self.get_search_source_codes():
-                    self.sources.append(code)
-                    file.write(f"##File: {code.module_name}\n")
-                    file.write(f"{code.source_code}\n\n")
-
-                for code in self.get_source_codes():
-                    self.sources.append(code)
-                    file.write(f"##File: {code.module_name}\n")
-                    file.write(f"{code.source_code}\n\n")
+        def all_source_codes():
+            yield from self.get_rest_source_codes()
+            yield from self.get_search_source_codes()
+            yield from self.get_source_codes()
+
+        self.sources = []
+        for code in iter_with_source_dump(all_source_codes(), self.target_file, self.args):
+            self.sources.append(code)
+            yield code
+
+    def run(self):
+        for _ in self.iter_sources():
+            pass
 
     def clone_repository(self):
         if self.git_url is None:
@@ -0,0 +1,115 @@
+import time
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from loguru import logger
+
+
+def create_byzerllm_client(model_name: str):
+    from byzerllm import ByzerLLM
+
+    llm = ByzerLLM()
+    llm.skip_nontext_check = True
+    llm.setup_default_model_name(model_name)
+    return llm
+
+
+class LLMClientPool:
+    """
+    按模型名复用的、有上限的 LLM 客户端池。
+
+    同一时刻一个客户端只会被一个线程借用；
+    当所有客户端都被借出且已达到上限时，acquire 会阻塞等待，
+    等待时间会被记录下来用于观察客户端是否成为瓶颈。
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        max_size: int = 8,
+        factory: Optional[Callable[[str], Any]] = None,
+    ):
+        self.model_name = model_name
+        self.max_size = max(1, max_size)
+        self.factory = factory or create_byzerllm_client
+        self.lock = threading.Lock()
+        self.semaphore = threading.Semaphore(self.max_size)
+        self.idle: List[Any] = []
+
+        self.created = 0
+        self.acquire_count = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def ensure_capacity(self, max_size: int):
+        """扩大池的上限（不会缩小）"""
+        with self.lock:
+            if max_size <= self.max_size:
+                return
+            for _ in range(max_size - self.max_size):
+                self.semaphore.release()
+            self.max_size = max_size
+
+    @contextmanager
+    def acquire(self) -> Iterator[Any]:
+        start_time = time.time()
+        self.semaphore.acquire()
+        wait_time = time.time() - start_time
+        try:
+            with self.lock:
+                client = self.idle.pop() if self.idle else None
+                self.acquire_count += 1
+                self.total_wait_time += wait_time
+                self.max_wait_time = max(self.max_wait_time, wait_time)
+            if client is None:
+                client = self.factory(self.model_name)
+                with self.lock:
+                    self.created += 1
+        except Exception:
+            self.semaphore.release()
+            raise
+
+        try:
+            yield client
+        finally:
+            with self.lock:
+                self.idle.append(client)
+            self.semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "model_name": self.model_name,
+                "max_size": self.max_size,
+                "created": self.created,
+                "idle": len(self.idle),
+                "acquire_count": self.acquire_count,
+                "total_wait_time": self.total_wait_time,
+                "avg_wait_time": (
+                    self.total_wait_time / self.acquire_count
+                    if self.acquire_count
+                    else 0.0
+                ),
+                "max_wait_time": self.max_wait_time,
+            }
+
+
+_pools: Dict[str, LLMClientPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_llm_client_pool(
+    model_name: str, max_size: Optional[int] = None
+) -> LLMClientPool:
+    """获取（或创建）某个模型共享的客户端池，max_size 只会扩大已有池的上限"""
+    with _pools_lock:
+        pool = _pools.get(model_name)
+        if pool is None:
+            pool = LLMClientPool(model_name, max_size=max_size or 8)
+            _pools[model_name] = pool
+            logger.info(
+                f"Created LLM client pool for {model_name} (max_size: {pool.max_size})"
+            )
+        elif max_size:
+            pool.ensure_capacity(max_size)
+        return pool
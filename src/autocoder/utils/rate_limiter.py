@@ -0,0 +1,340 @@
+import re
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, Set, Tuple, TypeVar
+from loguru import logger
+
+T = TypeVar("T")
+
+RATE_LIMIT_MARKERS = (
+    "rate limit",
+    "rate_limit",
+    "rate-limit",
+    "ratelimit",
+    "too many requests",
+    "too_many_requests",
+)
+# 余额不足、账单问题等错误重试也不会成功（部分服务同样返回 429），需要直接失败
+FATAL_QUOTA_MARKERS = (
+    "insufficient_quota",
+    "insufficient quota",
+    "exceeded your current quota",
+    "billing",
+)
+RETRY_AFTER_PATTERN = re.compile(r"retry[\s_-]*after\D{0,10}(\d+(?:\.\d+)?)", re.I)
+
+
+def _status_code(e: Exception) -> Optional[int]:
+    status_code = getattr(e, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(e, "response", None), "status_code", None)
+    return status_code if isinstance(status_code, int) else None
+
+
+def is_rate_limit_error(e: Exception) -> bool:
+    """只有 429 状态码或者明确的限流描述才视为限流；余额不足、账单错误不重试"""
+    message = str(e).lower()
+    if getattr(e, "code", None) == "insufficient_quota" or any(
+        marker in message for marker in FATAL_QUOTA_MARKERS
+    ):
+        return False
+    if _status_code(e) == 429:
+        return True
+    return any(marker in message for marker in RATE_LIMIT_MARKERS)
+
+
+def parse_retry_after(e: Exception) -> Optional[float]:
+    m = RETRY_AFTER_PATTERN.search(str(e))
+    return float(m.group(1)) if m else None
+
+
+def estimate_tokens(*texts: str) -> int:
+    """估算请求的 token 数，优先使用内置 tokenizer，不可用时按字符数估算"""
+    texts = [t for t in texts if t]
+    if not texts:
+        return 0
+    try:
+        from autocoder.common.buildin_tokenizer import BuildinTokenizer
+
+        tokenizer = BuildinTokenizer().tokenizer
+        return sum(len(e.ids) for e in tokenizer.encode_batch(texts))
+    except Exception:
+        return sum(len(t) for t in texts)
+
+
+class TokenBucket:
+    """按分钟速率连续补充的令牌桶，容量为一秒的量，允许单次请求透支"""
+
+    def __init__(self, rate_per_minute: float):
+        self.set_rate(rate_per_minute)
+        self.level = self.capacity
+        self.last = time.monotonic()
+
+    def set_rate(self, rate_per_minute: float):
+        self.rate = max(rate_per_minute, 1e-6) / 60.0
+        self.capacity = max(1.0, self.rate)
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.last) * self.rate)
+        self.last = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        need = min(amount, self.capacity)
+        if self.level >= need:
+            return 0.0
+        return (need - self.level) / self.rate
+
+    def consume(self, amount: float):
+        self.level -= amount
+
+
+class RateLimiter:
+    """
+    按模型共享的请求限流器，替代每次请求后固定的 sleep。
+
+    - rpm/tpm 为 0 时不做主动限流，直接以服务端的真实上限运行；
+    - 遇到 429/限流错误时所有线程一起退避（优先使用错误信息中的 retry after），
+      并把请求速率减半；之后每次成功都会逐步加回，直到配置的上限（加性增、乘性减）；
+    - max_concurrency 大于 0 时同时限制并发请求数。
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        rpm: int = 0,
+        tpm: int = 0,
+        max_concurrency: int = 0,
+        max_retries: int = 5,
+        base_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+    ):
+        self.model_name = model_name
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.lock = threading.Lock()
+
+        self.rpm = 0
+        self.tpm = 0
+        self.max_concurrency = 0
+        self.current_rpm: Optional[float] = None
+        self.request_bucket: Optional[TokenBucket] = None
+        self.token_bucket: Optional[TokenBucket] = None
+        # 并发数限制：修改 max_concurrency 时只调整上限，正在执行的请求不受影响
+        self.concurrency_cond = threading.Condition()
+        self.in_flight = 0
+        self.configure(rpm=rpm, tpm=tpm, max_concurrency=max_concurrency)
+
+        self.backoff_until = 0.0
+        self.consecutive_rate_limits = 0
+        self.recent_requests: Deque[float] = deque()
+
+        self.request_count = 0
+        self.rate_limited_count = 0
+        self.total_wait_time = 0.0
+
+    def configure(
+        self,
+        rpm: Optional[int] = None,
+        tpm: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+    ):
+        with self.lock:
+            if rpm is not None and rpm != self.rpm:
+                self.rpm = max(0, rpm)
+                self._set_current_rpm(self.rpm or None)
+            if tpm is not None and tpm != self.tpm:
+                self.tpm = max(0, tpm)
+                self.token_bucket = TokenBucket(self.tpm) if self.tpm else None
+        if max_concurrency is not None and max_concurrency != self.max_concurrency:
+            with self.concurrency_cond:
+                self.max_concurrency = max(0, max_concurrency)
+                self.concurrency_cond.notify_all()
+
+    def _set_current_rpm(self, rpm: Optional[float]):
+        self.current_rpm = rpm
+        if rpm is None:
+            self.request_bucket = None
+        elif self.request_bucket is None:
+            self.request_bucket = TokenBucket(rpm)
+        else:
+            self.request_bucket.set_rate(rpm)
+
+    def acquire(self, tokens: int = 0):
+        """阻塞直到允许发出一个（约 tokens 个 token 的）请求"""
+        start_time = time.monotonic()
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                wait = self.backoff_until - now
+                if wait <= 0:
+                    wait = max(
+                        self.request_bucket.wait_time(1, now) if self.request_bucket else 0.0,
+                        self.token_bucket.wait_time(tokens, now)
+                        if self.token_bucket and tokens
+                        else 0.0,
+                    )
+                if wait <= 0:
+                    if self.request_bucket:
+                        self.request_bucket.consume(1)
+                    if self.token_bucket and tokens:
+                        self.token_bucket.consume(tokens)
+                    self.recent_requests.append(now)
+                    while now - self.recent_requests[0] >= 60:
+                        self.recent_requests.popleft()
+                    self.request_count += 1
+                    self.total_wait_time += now - start_time
+                    return
+            time.sleep(min(wait, 1.0))
+
+    @contextmanager
+    def _concurrency(self) -> Iterator[None]:
+        with self.concurrency_cond:
+            while self.max_concurrency and self.in_flight >= self.max_concurrency:
+                self.concurrency_cond.wait()
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self.concurrency_cond:
+                self.in_flight -= 1
+                self.concurrency_cond.notify()
+
+    def report_success(self):
+        with self.lock:
+            self.consecutive_rate_limits = 0
+            if self.current_rpm is None:
+                return
+            target = self.current_rpm + 1
+            if self.rpm and target >= self.rpm:
+                target = self.rpm
+            self._set_current_rpm(target)
+
+    def report_rate_limited(self, retry_after: Optional[float] = None):
+        with self.lock:
+            now = time.monotonic()
+            self.rate_limited_count += 1
+            self.consecutive_rate_limits += 1
+            delay = retry_after or min(
+                self.max_backoff,
+                self.base_backoff * 2 ** (self.consecutive_rate_limits - 1),
+            )
+            self.backoff_until = max(self.backoff_until, now + delay)
+
+            # 没有配置 rpm 时，以最近一分钟实际发出的请求数作为起点
+            while self.recent_requests and now - self.recent_requests[0] >= 60:
+                self.recent_requests.popleft()
+            base = self.current_rpm or len(self.recent_requests) or 1
+            self._set_current_rpm(max(1.0, base / 2))
+            logger.warning(
+                f"Rate limited by {self.model_name}, backing off {delay:.1f}s, "
+                f"request rate reduced to {self.current_rpm:.1f} rpm"
+            )
+
+    def call(self, func: Callable[[], T], tokens: int = 0) -> T:
+        """在限流下执行 func，遇到限流错误时退避重试，其他错误直接抛出"""
+        attempt = 0
+        while True:
+            self.acquire(tokens)
+            try:
+                with self._concurrency():
+                    result = func()
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                self.report_rate_limited(parse_retry_after(e))
+                continue
+            self.report_success()
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "model_name": self.model_name,
+                "rpm": self.rpm,
+                "tpm": self.tpm,
+                "current_rpm": self.current_rpm,
+                "max_concurrency": self.max_concurrency,
+                "request_count": self.request_count,
+                "rate_limited_count": self.rate_limited_count,
+                "total_wait_time": self.total_wait_time,
+            }
+
+
+_limiters: Dict[str, RateLimiter] = {}
+# 模型名 -> 上一次传入的 (rpm, tpm, max_concurrency, max_retries)
+_applied_settings: Dict[str, Tuple[Optional[int], ...]] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(
+    model_name: str,
+    rpm: Optional[int] = None,
+    tpm: Optional[int] = None,
+    max_concurrency: Optional[int] = None,
+    max_retries: Optional[int] = None,
+) -> RateLimiter:
+    """
+    获取（或创建）某个模型共享的限流器。
+    传入的参数会更新已有限流器的配置，为 None 的参数表示调用方没有要求，保留原来的配置；
+    与上一次传入的配置相同时不会重新配置。
+    """
+    settings = (rpm, tpm, max_concurrency, max_retries)
+    with _limiters_lock:
+        limiter = _limiters.get(model_name)
+        if limiter is None:
+            limiter = RateLimiter(model_name)
+            _limiters[model_name] = limiter
+        if _applied_settings.get(model_name) != settings:
+            limiter.configure(rpm=rpm, tpm=tpm, max_concurrency=max_concurrency)
+            if max_retries is not None:
+                limiter.max_retries = max_retries
+            _applied_settings[model_name] = settings
+        return limiter
+
+
+_warned_options: Set[str] = set()
+
+
+def anti_quota_limit_to_rpm(option: str, seconds: Optional[int]) -> int:
+    """
+    兼容旧的 *_anti_quota_limit（每次请求后等待的秒数）：换算成等价的每分钟请求数，
+    并提示改用 llm_rpm_limit。没有设置时返回 0。
+    """
+    if not seconds or seconds <= 0:
+        return 0
+    rpm = max(1, int(60 / seconds))
+    if option not in _warned_options:
+        _warned_options.add(option)
+        logger.warning(
+            f"{option} is deprecated, use llm_rpm_limit instead. "
+            f"Treating {option}={seconds} as llm_rpm_limit={rpm}"
+        )
+    return rpm
+
+
+def get_rate_limiter_for_llm(
+    llm, args, anti_quota_option: Optional[str] = None
+) -> RateLimiter:
+    """
+    根据 AutoCoderArgs 中的配置获取 llm 对应模型的限流器。
+    anti_quota_option 为旧的等待秒数参数名，没有配置 llm_rpm_limit 时按它换算 rpm。
+    没有设置（为 0）的限制按“没有要求”传给 get_rate_limiter，不会覆盖其他调用方对同一个模型的配置。
+    """
+    model_name = getattr(llm, "default_model_name", None) or "default"
+    rpm = args.llm_rpm_limit
+    if not rpm and anti_quota_option:
+        rpm = anti_quota_limit_to_rpm(
+            anti_quota_option, getattr(args, anti_quota_option, None)
+        )
+    return get_rate_limiter(
+        model_name,
+        rpm=rpm or None,
+        tpm=args.llm_tpm_limit or None,
+        max_concurrency=args.llm_max_concurrency or None,
+        max_retries=args.llm_rate_limit_max_retries,
+    )
@@ -2,6 +2,7 @@ import requests
 from bs4 import BeautifulSoup
 from typing import List,Dict,Type,Optional
 from autocoder.common import SourceCode
+from autocoder.common.project_scanner import scan_project_files
 import byzerllm
 from bs4 import BeautifulSoup
 from loguru import logger
@@ -120,11 +121,8 @@ class HttpDoc:
                     return temp_documents                                    
 
                  if os.path.isdir(url):
-                    for root, dirs, files in os.walk(url,followlinks=True):
-                        dirs[:] = [d for d in dirs if d not in ['.git',"node_modules"]]  # Exclude .git directory
-                        for file in files:
-                            file_path = os.path.join(root, file)                            
-                            documents.extend(process_single_file(file_path))
+                    for file_path in scan_project_files(url, ['.git',"node_modules"]):
+                        documents.extend(process_single_file(file_path))
                     
                  else:                    
                     documents.extend(process_single_file(url,skip_binary_file_test=True))
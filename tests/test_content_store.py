@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from autocoder.common import SourceCode
+from autocoder.rag.cache.content_store import LazySourceCode, iter_lazy_documents
+from autocoder.rag.cache.segment_store import SegmentCacheStore
+
+
+class TestLazySourceCode(unittest.TestCase):
+    def test_source_code_is_loaded_once_on_access(self):
+        loader = MagicMock(return_value="hello")
+        doc = LazySourceCode.create(loader=loader, module_name="a", tokens=3)
+        self.assertIsInstance(doc, SourceCode)
+        self.assertFalse(doc.is_loaded())
+        loader.assert_not_called()
+
+        self.assertEqual(doc.source_code, "hello")
+        self.assertEqual(doc.source_code, "hello")
+        loader.assert_called_once()
+        self.assertEqual(doc.model_dump()["source_code"], "hello")
+
+    def test_iter_lazy_documents_reads_only_metadata(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = SegmentCacheStore(os.path.join(tmp_dir, "segments"))
+            store["/docs/a.xlsx"] = {
+                "file_path": "/docs/a.xlsx",
+                "md5": "m",
+                "content": [
+                    {"module_name": "a#sheet1", "source_code": "s1", "tokens": 2},
+                    {"module_name": "a#sheet2", "source_code": "s2", "tokens": 4},
+                ],
+            }
+            store.read_doc_text = MagicMock(wraps=store.read_doc_text)
+
+            docs = list(iter_lazy_documents(store))
+            self.assertEqual([d.module_name for d in docs], ["a#sheet1", "a#sheet2"])
+            self.assertEqual([d.tokens for d in docs], [2, 4])
+            self.assertEqual([d.content_md5 for d in docs], ["m:0", "m:1"])
+            store.read_doc_text.assert_not_called()
+
+            self.assertEqual(docs[1].source_code, "s2")
+            store.read_doc_text.assert_called_once_with("/docs/a.xlsx", 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from autocoder.common import AutoCoderArgs, SourceCode
+from autocoder.rag.doc_filter import DocFilter
+from autocoder.rag.document_retriever import LocalDocumentRetriever
+from autocoder.rag.relevance_cache import RelevanceCache
+from autocoder.utils.llm_client_pool import LLMClientPool
+
+
+def _fake_prompt(delays):
+    """模拟相关性判断：文件名中带 slow 的文档会卡住 delays[name] 秒"""
+    prompt = MagicMock()
+
+    def run(conversations, documents, filter_config=None):
+        name = documents[0].split("\n")[0].replace("##File: ", "")
+        time.sleep(delays.get(name, 0.01))
+        return "yes/8"
+
+    prompt.with_llm.return_value.options.return_value.run.side_effect = run
+    return prompt
+
+
+class TestDocFilterStream(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        llm = MagicMock()
+        llm.get_sub_client.return_value = None
+        llm.default_model_name = "recall"
+        self.doc_filter = DocFilter(
+            llm,
+            AutoCoderArgs(index_filter_workers=2, rag_doc_filter_relevance=5),
+            path=self.temp_dir.name,
+        )
+        self.pool = LLMClientPool("recall", max_size=2, factory=lambda name: object())
+        pool_patcher = patch(
+            "autocoder.rag.doc_filter.get_llm_client_pool", return_value=self.pool
+        )
+        pool_patcher.start()
+        self.addCleanup(pool_patcher.stop)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _docs(self, names, tokens=100):
+        return [
+            SourceCode(module_name=name, source_code=f"content of {name}", tokens=tokens)
+            for name in names
+        ]
+
+    def test_filter_docs_returns_all_relevant_docs(self):
+        names = [f"doc{i}" for i in range(7)]
+        with patch(
+            "autocoder.rag.doc_filter._check_relevance_with_conversation",
+            _fake_prompt({}),
+        ):
+            docs = self.doc_filter.filter_docs(
+                [{"role": "user", "content": "q"}], iter(self._docs(names))
+            )
+        self.assertEqual(sorted(d.source_code.module_name for d in docs), names)
+
+    def test_stops_at_token_budget(self):
+        names = [f"doc{i}" for i in range(20)]
+        with patch(
+            "autocoder.rag.doc_filter._check_relevance_with_conversation",
+            _fake_prompt({}),
+        ):
+            docs = list(
+                self.doc_filter.filter_docs_stream(
+                    [{"role": "user", "content": "q"}],
+                    self._docs(names),
+                    token_budget=300,
+                )
+            )
+        self.assertGreaterEqual(sum(d.source_code.tokens for d in docs), 300)
+        self.assertLess(len(docs), len(names))
+
+    def test_top_k_does_not_wait_for_slow_doc(self):
+        names = ["slow", "doc1", "doc2", "doc3"]
+        with patch(
+            "autocoder.rag.doc_filter._check_relevance_with_conversation",
+            _fake_prompt({"slow": 2}),
+        ):
+            start = time.time()
+            docs = list(
+                self.doc_filter.filter_docs_stream(
+                    [{"role": "user", "content": "q"}], self._docs(names), top_k=2
+                )
+            )
+            elapsed = time.time() - start
+        self.assertEqual(len(docs), 2)
+        self.assertNotIn("slow", [d.source_code.module_name for d in docs])
+        self.assertLess(elapsed, 1)
+
+    def test_deadline_drops_unfinished_docs(self):
+        names = ["doc1", "slow"]
+        with patch(
+            "autocoder.rag.doc_filter._check_relevance_with_conversation",
+            _fake_prompt({"slow": 2}),
+        ):
+            start = time.time()
+            docs = list(
+                self.doc_filter.filter_docs_stream(
+                    [{"role": "user", "content": "q"}], self._docs(names), deadline=0.3
+                )
+            )
+            elapsed = time.time() - start
+        self.assertEqual([d.source_code.module_name for d in docs], ["doc1"])
+        self.assertLess(elapsed, 1)
+
+
+class TestDocFilterMergedDocsCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        llm = MagicMock()
+        llm.get_sub_client.return_value = None
+        llm.default_model_name = "recall"
+        self.cache = RelevanceCache(f"{self.temp_dir.name}/relevance_cache.db")
+        self.doc_filter = DocFilter(
+            llm,
+            AutoCoderArgs(index_filter_workers=2, rag_doc_filter_relevance=5),
+            path=self.temp_dir.name,
+            relevance_cache=self.cache,
+        )
+        pool = LLMClientPool("recall", max_size=2, factory=lambda name: object())
+        pool_patcher = patch(
+            "autocoder.rag.doc_filter.get_llm_client_pool", return_value=pool
+        )
+        pool_patcher.start()
+        self.addCleanup(pool_patcher.stop)
+        # 只用到 _merge_documents，不需要初始化文档缓存
+        self.retriever = LocalDocumentRetriever.__new__(LocalDocumentRetriever)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _merged_doc(self):
+        docs = [
+            SourceCode(module_name=f"small{i}.md", source_code=f"text {i}", tokens=3)
+            for i in range(3)
+        ]
+        return self.retriever._merge_documents(docs)
+
+    def test_repeated_query_hits_cache_for_merged_docs(self):
+        prompt = _fake_prompt({})
+        run = prompt.with_llm.return_value.options.return_value.run
+        conversations = [{"role": "user", "content": "q"}]
+        with patch("autocoder.rag.doc_filter._check_relevance_with_conversation", prompt):
+            first = self._merged_doc()
+            self.doc_filter.filter_docs(conversations, [first])
+            self.assertEqual(run.call_count, 1)
+
+            second = self._merged_doc()
+            self.assertNotEqual(first.module_name, second.module_name)
+            docs = self.doc_filter.filter_docs(conversations, [second])
+        self.assertEqual(run.call_count, 1)
+        self.assertEqual([d.source_code.module_name for d in docs], [second.module_name])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from tokenizers import Tokenizer
+from tokenizers.models import WordLevel
+from tokenizers.pre_tokenizers import Whitespace
+
+from autocoder.common import SourceCode
+from autocoder.rag.cache.content_store import LazySourceCode
+from autocoder.rag.document_retriever import LocalDocumentRetriever
+from autocoder.rag.document_splitter import TokenSplitter
+from autocoder.rag.variable_holder import VariableHolder
+
+
+def _word_tokenizer():
+    tokenizer = Tokenizer(WordLevel({"[UNK]": 0}, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = Whitespace()
+    return tokenizer
+
+
+class TestTokenSplitter(unittest.TestCase):
+    def setUp(self):
+        self.tokenizer = _word_tokenizer()
+        self.splitter = TokenSplitter(tokenizer=self.tokenizer)
+
+    def _count(self, text):
+        return len(self.tokenizer.encode(text, add_special_tokens=False).ids)
+
+    def test_chunks_respect_token_limit_and_cover_text(self):
+        text = "\n".join(" ".join(f"w{i}_{j}" for j in range(7)) for i in range(50))
+        ranges = self.splitter.split(text, 40)
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], len(text))
+        for (start, end, tokens), nxt in zip(ranges, ranges[1:] + [None]):
+            self.assertLessEqual(tokens, 40)
+            self.assertEqual(tokens, self._count(text[start:end]))
+            if nxt is not None:
+                self.assertEqual(end, nxt[0])
+        self.assertEqual(sum(r[2] for r in ranges), self._count(text))
+
+    def test_prefers_paragraph_then_line_boundaries(self):
+        paragraph = "\n".join(["a b c d"] * 3)
+        text = "\n\n".join([paragraph] * 4)
+        ranges = self.splitter.split(text, 30)
+        for start, end, _ in ranges[:-1]:
+            self.assertTrue(text[start:end].endswith("\n\n"))
+
+        text = "\n".join(["a b c d e"] * 10)
+        for start, end, _ in self.splitter.split(text, 12)[:-1]:
+            self.assertTrue(text[start:end].endswith("\n"))
+
+    def test_hard_cut_without_newlines(self):
+        text = " ".join(f"w{i}" for i in range(100))
+        ranges = self.splitter.split(text, 30)
+        self.assertEqual([r[2] for r in ranges], [30, 30, 30, 10])
+
+    def test_results_are_cached_by_content(self):
+        text = "\n".join(["x y z"] * 20)
+        first = self.splitter.split(text, 10)
+        self.assertIs(self.splitter.split(text, 10), first)
+        self.assertIsNot(self.splitter.split(text, 11), first)
+
+    def test_content_key_skips_loading_on_cache_hit(self):
+        text = "\n".join(["x y z"] * 20)
+        loader = MagicMock(return_value=text)
+        first = self.splitter.split(loader, 10, content_key="k")
+        loader.assert_called_once()
+        self.assertIs(self.splitter.split(loader, 10, content_key="k"), first)
+        loader.assert_called_once()
+
+    def test_estimated_split_without_tokenizer(self):
+        splitter = TokenSplitter()
+        splitter.get_tokenizer = lambda: None
+        text = "\n".join(["0123456789"] * 100)
+        ranges = splitter.split(text, 100, total_tokens=len(text) // 4)
+        self.assertEqual(ranges[-1][1], len(text))
+        for start, end, tokens in ranges:
+            self.assertLessEqual(end - start, 400)
+            self.assertLessEqual(tokens, 100)
+
+
+class TestSplitLargeDocument(unittest.TestCase):
+    def test_chunks_are_lazy_and_reuse_cached_md5(self):
+        retriever = LocalDocumentRetriever.__new__(LocalDocumentRetriever)
+        retriever.single_file_token_limit = 10
+        retriever.splitter = TokenSplitter(tokenizer=_word_tokenizer())
+        text = "\n".join(" ".join(f"w{i}_{j}" for j in range(5)) for i in range(6))
+
+        def make_doc():
+            loader = MagicMock(return_value=text)
+            doc = LazySourceCode.create(
+                loader=loader, module_name="big.md", tokens=30, content_md5="m:0"
+            )
+            return doc, loader
+
+        doc, loader = make_doc()
+        chunks = list(retriever._split_large_document(doc))
+        self.assertEqual("".join(c.source_code for c in chunks), text)
+        loader.assert_called_once()
+
+        # 同一个内容哈希再次切分时命中缓存，生成分块时不读取文档
+        doc, loader = make_doc()
+        chunks = list(retriever._split_large_document(doc))
+        loader.assert_not_called()
+        self.assertFalse(any(c.is_loaded() for c in chunks))
+        self.assertEqual(chunks[0].metadata, {"original_doc": "big.md", "chunk_index": 1})
+        start, end, _ = retriever.splitter.split(text, 10, content_key="m:0")[1]
+        self.assertEqual(chunks[1].source_code, text[start:end])
+        loader.assert_called_once()
+
+
+class TestMergeDocuments(unittest.TestCase):
+    def test_merged_tokens_include_file_headers(self):
+        tokenizer = _word_tokenizer()
+        retriever = LocalDocumentRetriever.__new__(LocalDocumentRetriever)
+
+        def count(text):
+            return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+        docs = [
+            SourceCode(module_name=f"small{i}.md", source_code=f"text {i}", tokens=2)
+            for i in range(3)
+        ]
+        with patch.object(VariableHolder, "TOKENIZER_MODEL", tokenizer):
+            merged = retriever._merge_documents(docs)
+        self.assertEqual(merged.tokens, count(merged.source_code))
+        self.assertGreater(merged.tokens, sum(doc.tokens for doc in docs))
+
+
+if __name__ == "__main__":
+    unittest.main()
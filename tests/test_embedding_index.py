@@ -0,0 +1,132 @@
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from autocoder.common import AutoCoderArgs
+from autocoder.index.embedding_index import (
+    EmbeddingIndex,
+    byzerllm_embed_function,
+    hashing_embed_function,
+)
+from autocoder.index.index import IndexManager
+
+
+def make_index_data():
+    return {
+        "/p/auth/login.py": {
+            "symbols": "用途：用户登录\n函数：login_user, check_password\n类：LoginForm",
+            "md5": "a",
+        },
+        "/p/db/models.py": {
+            "symbols": "用途：数据库模型\n函数：\n类：User, Order",
+            "md5": "b",
+        },
+        "/p/web/HttpServer.py": {
+            "symbols": "用途：web 服务\n函数：start_server, handle_request\n类：HTTPServer",
+            "md5": "c",
+        },
+    }
+
+
+class TestEmbeddingIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.calls = []
+        embed = hashing_embed_function(dim=256)
+
+        def counting_embed(texts):
+            self.calls.append(len(texts))
+            return embed(texts)
+
+        self.embed = counting_embed
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_search_and_incremental_update(self):
+        index = EmbeddingIndex(self.temp_dir.name, self.embed, "hash")
+        index_data = make_index_data()
+        self.assertEqual(index.update(index_data), 3)
+
+        results = index.search("check password when user login", top_k=2)
+        self.assertEqual(results[0][0], "/p/auth/login.py")
+        self.assertEqual(len(results), 2)
+        self.assertGreaterEqual(results[0][1], results[1][1])
+        self.assertEqual(index.search("handle http request", top_k=1)[0][0], "/p/web/HttpServer.py")
+
+        # 新建实例时复用磁盘上的向量，只重新计算变化的文件
+        index = EmbeddingIndex(self.temp_dir.name, self.embed, "hash")
+        index_data["/p/db/models.py"] = dict(index_data["/p/db/models.py"], md5="b2")
+        del index_data["/p/web/HttpServer.py"]
+        self.assertEqual(index.update(index_data), 1)
+        self.assertEqual(
+            {m for m, _ in index.search("server", top_k=10)},
+            {"/p/auth/login.py", "/p/db/models.py"},
+        )
+
+        # 换了模型需要全部重新计算
+        index = EmbeddingIndex(self.temp_dir.name, self.embed, "other")
+        self.assertEqual(index.update(index_data), 2)
+
+    def test_target_files_by_embedding_skip_llm_filter(self):
+        args = AutoCoderArgs(source_dir=self.temp_dir.name, index_embedding_top_k=1)
+        manager = IndexManager(llm=None, sources=[], args=args)
+        manager.embed_function = self.embed
+        manager.embed_model_name = "hash"
+        manager.index_store.upsert(
+            [
+                dict(item, module_name=module_name, last_modified=0)
+                for module_name, item in make_index_data().items()
+            ]
+        )
+        with patch.object(IndexManager, "_query_index_with_thread") as query_index:
+            result = manager.get_target_files_by_query("user login")
+        query_index.assert_not_called()
+        self.assertEqual([f.file_path for f in result.file_list], ["/p/auth/login.py"])
+        self.assertTrue(result.file_list[0].reason.startswith("Embedding similarity"))
+
+        # 代码索引没有变化时，后续查询不再同步向量索引
+        with patch.object(EmbeddingIndex, "update") as update:
+            manager.get_target_files_by_embedding("user login")
+            update.assert_not_called()
+            item = make_index_data()["/p/db/models.py"]
+            manager.index_store.upsert(
+                [dict(item, module_name="/p/db/models.py", md5="b2", last_modified=0)]
+            )
+            manager.get_target_files_by_embedding("user login")
+            update.assert_called_once()
+
+
+class TestByzerllmEmbedFunction(unittest.TestCase):
+    def _llm(self, name):
+        llm = MagicMock()
+        llm.default_model_name = name
+        return llm
+
+    def test_batches_texts_in_one_request(self):
+        llm = self._llm("emb-batch")
+        llm.emb_query.side_effect = lambda texts: [
+            MagicMock(output=[float(len(t))]) for t in texts
+        ]
+        embed = byzerllm_embed_function(llm, AutoCoderArgs(llm_rpm_limit=6000))
+        self.assertEqual(embed(["a", "bb", "ccc"]), [[1.0], [2.0], [3.0]])
+        llm.emb_query.assert_called_once_with(["a", "bb", "ccc"])
+
+    def test_falls_back_to_single_requests(self):
+        llm = self._llm("emb-single")
+
+        def emb_query(text):
+            if isinstance(text, list):
+                raise ValueError("input must be a string")
+            return [MagicMock(output=[float(len(text))])]
+
+        llm.emb_query.side_effect = emb_query
+        embed = byzerllm_embed_function(llm, AutoCoderArgs(llm_rpm_limit=6000))
+        self.assertEqual(embed(["a", "bb"]), [[1.0], [2.0]])
+        self.assertEqual(embed(["ccc", "d"]), [[3.0], [1.0]])
+        # 确认不支持批量后不再尝试批量请求
+        self.assertEqual(llm.emb_query.call_count, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
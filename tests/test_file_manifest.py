@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from autocoder.rag.cache import file_manifest
+from autocoder.rag.cache.file_manifest import FileManifest, generate_file_md5
+
+
+class TestFileManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.manifest_file = os.path.join(self.tmp_dir.name, ".cache", "manifest.jsonl")
+        self.file_path = os.path.join(self.tmp_dir.name, "a.md")
+        with open(self.file_path, "w") as f:
+            f.write("hello")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_unchanged_file_is_not_rehashed(self):
+        manifest = FileManifest(self.manifest_file)
+        md5 = manifest.get_md5(self.file_path)
+        self.assertEqual(md5, generate_file_md5(self.file_path))
+        manifest.save()
+
+        reloaded = FileManifest(self.manifest_file)
+        with patch.object(file_manifest, "generate_file_md5") as mock_md5:
+            self.assertEqual(reloaded.get_md5(self.file_path), md5)
+            mock_md5.assert_not_called()
+
+    def test_changed_file_is_rehashed(self):
+        manifest = FileManifest(self.manifest_file)
+        old_md5 = manifest.get_md5(self.file_path)
+        with open(self.file_path, "w") as f:
+            f.write("hello world")
+        self.assertNotEqual(manifest.get_md5(self.file_path), old_md5)
+
+    def test_retain_drops_missing_files(self):
+        manifest = FileManifest(self.manifest_file)
+        manifest.get_md5(self.file_path)
+        manifest.save()
+        manifest.retain([])
+        manifest.save()
+        self.assertEqual(FileManifest(self.manifest_file).entries, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import tempfile
+import unittest
+
+from autocoder.index.import_graph import ImportGraph
+
+
+def _item(module_name, imports, md5="m"):
+    return {
+        "module_name": module_name,
+        "symbols": f"用途：\n函数：\n变量：\n类：\n导入语句：{'^^'.join(imports)}",
+        "last_modified": 0,
+        "md5": md5,
+    }
+
+
+INDEX_DATA = {
+    "/p/src/pkg/__init__.py": _item("/p/src/pkg/__init__.py", []),
+    "/p/src/pkg/main.py": _item(
+        "/p/src/pkg/main.py",
+        [
+            "import os",
+            "from pkg.models import User",
+            "from .utils import helper",
+            "from pkg.missing import nothing",
+            "import requests",
+        ],
+    ),
+    "/p/src/pkg/models.py": _item("/p/src/pkg/models.py", ["from pkg import db"]),
+    "/p/src/pkg/db.py": _item("/p/src/pkg/db.py", ["import sqlite3"]),
+    "/p/src/pkg/utils/__init__.py": _item("/p/src/pkg/utils/__init__.py", []),
+    "/p/src/pkg/types.py": _item("/p/src/pkg/types.py", []),
+    "/p/web/app.ts": _item(
+        "/p/web/app.ts",
+        [
+            "import React from 'react'",
+            "import { api } from './api'",
+            "import Button from './components/Button'",
+            "const x = require('./gone')",
+        ],
+    ),
+    "/p/web/api.ts": _item("/p/web/api.ts", []),
+    "/p/web/components/Button/index.tsx": _item("/p/web/components/Button/index.tsx", []),
+}
+
+
+class TestImportGraph(unittest.TestCase):
+    def setUp(self):
+        self.graph = ImportGraph(INDEX_DATA)
+
+    def test_python_edges(self):
+        self.assertEqual(
+            self.graph.edges["/p/src/pkg/main.py"],
+            ["/p/src/pkg/models.py", "/p/src/pkg/utils/__init__.py"],
+        )
+        self.assertEqual(self.graph.edges["/p/src/pkg/models.py"], ["/p/src/pkg/db.py"])
+        self.assertEqual(
+            self.graph.unresolved["/p/src/pkg/main.py"], ["from pkg.missing import nothing"]
+        )
+        # 标准库导入不会匹配到项目中同名的 types.py
+        self.assertNotIn("/p/src/pkg/db.py", self.graph.unresolved)
+
+    def test_js_edges(self):
+        self.assertEqual(
+            self.graph.edges["/p/web/app.ts"],
+            ["/p/web/api.ts", "/p/web/components/Button/index.tsx"],
+        )
+        self.assertEqual(self.graph.unresolved["/p/web/app.ts"], ["const x = require('./gone')"])
+
+    def test_related_files_depth_and_caps(self):
+        related = [f for f, _ in self.graph.related_files(["/p/src/pkg/main.py"], depth=1)]
+        self.assertEqual(related, ["/p/src/pkg/models.py", "/p/src/pkg/utils/__init__.py"])
+
+        related = [f for f, _ in self.graph.related_files(["/p/src/pkg/main.py"], depth=2)]
+        self.assertIn("/p/src/pkg/db.py", related)
+
+        related = self.graph.related_files(["/p/src/pkg/main.py"], depth=2, max_fanout=1)
+        self.assertEqual(
+            [f for f, _ in related], ["/p/src/pkg/models.py", "/p/src/pkg/db.py"]
+        )
+        self.assertEqual(
+            len(self.graph.related_files(["/p/src/pkg/main.py"], depth=3, max_files=1)), 1
+        )
+
+    def test_load_or_build_persists_graph(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            graph_file = os.path.join(temp_dir, "import_graph.json")
+            built = ImportGraph.load_or_build(INDEX_DATA, graph_file)
+            self.assertTrue(os.path.exists(graph_file))
+
+            loaded = ImportGraph.load_or_build(INDEX_DATA, graph_file)
+            self.assertEqual(loaded.edges, built.edges)
+            self.assertFalse(hasattr(loaded, "py_modules"))
+
+            changed = dict(INDEX_DATA)
+            changed["/p/src/pkg/db.py"] = _item("/p/src/pkg/db.py", [], md5="m2")
+            rebuilt = ImportGraph.load_or_build(changed, graph_file)
+            self.assertNotEqual(rebuilt.signature, built.signature)
+
+
+if __name__ == "__main__":
+    unittest.main()
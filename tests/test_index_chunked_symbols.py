@@ -0,0 +1,92 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from autocoder.common import AutoCoderArgs, SourceCode
+from autocoder.index.index import IndexManager
+from autocoder.index.symbols_utils import extract_symbols
+
+
+class TestChunkedSymbolExtraction(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.temp_dir.name, "big.go")
+        # 本地解析不支持 go，超长时需要分块交给大模型
+        self.code = "\n".join(f"func f{i}() {{}}" for i in range(400))
+        with open(self.file_path, "w") as f:
+            f.write(self.code)
+        self.args = AutoCoderArgs(
+            source_dir=self.temp_dir.name,
+            model_max_input_length=1500,
+            index_build_workers=4,
+        )
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_chunks_run_concurrently_and_merge_in_order(self):
+        lock = threading.Lock()
+        running = []
+        peak = []
+
+        def fake_chunk_symbols(self, module_name, chunk):
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.pop()
+            first = chunk.splitlines()[0].split()[1].rstrip("(){")
+            return (
+                f"用途：chunk {first}\n函数：{first}, shared\n变量：\n类：\n"
+                f"导入语句：import \"fmt\""
+            )
+
+        manager = IndexManager(
+            llm=None,
+            sources=[SourceCode(module_name=self.file_path, source_code=self.code)],
+            args=self.args,
+        )
+        with patch.object(
+            IndexManager, "get_chunk_symbols", autospec=True, side_effect=fake_chunk_symbols
+        ) as chunk_symbols:
+            index_data = manager.build_index()
+
+        num_chunks = chunk_symbols.call_count
+        self.assertGreater(num_chunks, 2)
+        self.assertGreater(max(peak), 1)
+
+        info = extract_symbols(index_data[self.file_path]["symbols"])
+        self.assertEqual(info.usage, "chunk f0")
+        self.assertEqual(info.functions[0], "f0")
+        self.assertEqual(info.functions.count("shared"), 1)
+        self.assertEqual(len(info.functions), num_chunks + 1)
+        self.assertEqual(info.import_statements, ['import "fmt"'])
+        self.assertIn(self.file_path, manager.index_store.read_all())
+
+    def test_failed_chunk_skips_file(self):
+        calls = []
+
+        def failing_chunk_symbols(self, module_name, chunk):
+            calls.append(chunk)
+            if len(calls) == 1:
+                raise RuntimeError("boom")
+            return "函数：x"
+
+        manager = IndexManager(
+            llm=None,
+            sources=[SourceCode(module_name=self.file_path, source_code=self.code)],
+            args=self.args,
+        )
+        with patch.object(
+            IndexManager, "get_chunk_symbols", autospec=True, side_effect=failing_chunk_symbols
+        ):
+            index_data = manager.build_index()
+        self.assertNotIn(self.file_path, index_data)
+
+
+if __name__ == "__main__":
+    unittest.main()
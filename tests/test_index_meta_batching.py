@@ -0,0 +1,66 @@
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from autocoder.common import AutoCoderArgs
+from autocoder.index.index import IndexManager
+
+
+class TestMetaStrBatching(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        args = AutoCoderArgs(
+            source_dir=self.temp_dir.name,
+            model_max_input_length=1000,
+            filter_batch_token_ratio=0.5,
+        )
+        self.manager = IndexManager(llm=None, sources=[], args=args)
+        self.manager.index_store.upsert(
+            [
+                {
+                    "module_name": f"/p/file{i}.py",
+                    "symbols": "用途：x\n函数：" + "f" * (i * 10),
+                    "last_modified": 0,
+                    "md5": f"m{i}",
+                }
+                for i in range(10)
+            ]
+        )
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_batches_respect_token_budget_and_counts_are_cached(self):
+        with patch.object(
+            IndexManager,
+            "count_tokens_batch",
+            autospec=True,
+            side_effect=lambda self, texts: [len(t) for t in texts],
+        ) as count:
+            chunks = list(self.manager._get_meta_str(max_chunk_size=-1))
+            self.assertEqual(count.call_count, 1)
+            self.assertEqual(sum(c.count("##/p/file") for c in chunks), 10)
+            for chunk in chunks:
+                self.assertTrue(len(chunk) <= 500 or chunk.count("##/p/file") == 1)
+            self.assertLess(len(chunks), 10)
+
+            # 第二次直接使用缓存的 token 数
+            self.assertEqual(list(self.manager._get_meta_str(max_chunk_size=-1)), chunks)
+            self.assertEqual(count.call_count, 1)
+
+            # 某个文件变化后只重新计算这一个
+            self.manager.index_store.upsert(
+                [{"module_name": "/p/file3.py", "symbols": "函数：g", "last_modified": 0, "md5": "new"}]
+            )
+            list(self.manager._get_meta_str(max_chunk_size=-1))
+            self.assertEqual(count.call_count, 2)
+            self.assertEqual(len(count.call_args[0][1]), 1)
+
+    def test_count_based_batching_when_disabled(self):
+        self.manager.args.filter_batch_token_ratio = 0
+        chunks = list(self.manager._get_meta_str(max_chunk_size=-1))
+        self.assertEqual([c.count("##/p/file") for c in chunks], [6, 4])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import json
+import os
+import tempfile
+import unittest
+
+from autocoder.index.index_store import IndexStore
+
+
+def _item(name, md5="m1"):
+    return {
+        "module_name": name,
+        "symbols": f"函数：{os.path.basename(name)}",
+        "last_modified": 1.0,
+        "md5": md5,
+    }
+
+
+class TestIndexStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.index_dir = os.path.join(self.temp_dir.name, ".auto-coder")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_upsert_and_delete(self):
+        store = IndexStore(self.index_dir)
+        store.upsert([_item("/p/a.py"), _item("/p/b.py")])
+        store.upsert([_item("/p/a.py", md5="m2")])
+        self.assertEqual(len(store), 2)
+        self.assertEqual(store.get("/p/a.py")["md5"], "m2")
+
+        store.delete(["/p/b.py"])
+        self.assertEqual(list(store.read_all().keys()), ["/p/a.py"])
+
+    def test_read_is_cached_until_version_changes(self):
+        store = IndexStore(self.index_dir)
+        store.upsert([_item("/p/a.py")])
+        first = store.read_all()
+        self.assertIs(store.read_all(), first)
+
+        # 其它进程/实例写入后缓存失效
+        IndexStore(self.index_dir).upsert([_item("/p/b.py")])
+        second = store.read_all()
+        self.assertIsNot(second, first)
+        self.assertIn("/p/b.py", second)
+
+    def test_migrates_legacy_json(self):
+        os.makedirs(self.index_dir)
+        legacy = {"/p/a.py": _item("/p/a.py"), "/p/b.py": _item("/p/b.py")}
+        with open(os.path.join(self.index_dir, "index.json"), "w") as f:
+            json.dump(legacy, f)
+
+        store = IndexStore(self.index_dir)
+        self.assertEqual(store.read_all(), legacy)
+        self.assertFalse(os.path.exists(os.path.join(self.index_dir, "index.json")))
+        self.assertTrue(os.path.exists(os.path.join(self.index_dir, "index.json.bak")))
+        self.assertEqual(json.loads(store.to_json()), legacy)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+
+from autocoder.rag.lexical_index import BM25Index, tokenize
+
+
+class TestBM25Index(unittest.TestCase):
+    def setUp(self):
+        self.index = BM25Index()
+        self.index.add("elephant.md", "大象是陆地上最大的动物之一。它们生活在非洲和亚洲。", "v1")
+        self.index.add("earth.md", "地球是太阳系第三行星，有海洋、沙漠。", "v1")
+        self.index.add("fruit.md", "apple banana orange fruit vitamins", "v1")
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Foo_bar 大象"), ["foo_bar", "大", "象", "大象"])
+
+    def test_search_ranks_matching_docs(self):
+        results = self.index.search("大象生活在哪里？", top_n=2)
+        self.assertEqual(results[0][0], "elephant.md")
+        self.assertEqual(self.index.search("Banana", top_n=5)[0][0], "fruit.md")
+        self.assertEqual(self.index.search("zebra", top_n=5), [])
+
+    def test_incremental_update_and_remove(self):
+        self.index.add("fruit.md", "nothing to see here", "v2")
+        self.assertEqual(self.index.get_version("fruit.md"), "v2")
+        self.assertEqual(self.index.search("banana", top_n=5), [])
+
+        self.index.remove("elephant.md")
+        self.assertNotIn("elephant.md", self.index)
+        self.assertNotIn("大象", self.index.postings)
+        self.assertEqual(len(self.index), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from autocoder.utils.llm_client_pool import LLMClientPool
+
+
+class TestLLMClientPool(unittest.TestCase):
+    def test_clients_are_reused(self):
+        factory = MagicMock(side_effect=lambda name: object())
+        pool = LLMClientPool("model", max_size=2, factory=factory)
+        with pool.acquire() as first:
+            pass
+        with pool.acquire() as second:
+            pass
+        self.assertIs(first, second)
+        factory.assert_called_once_with("model")
+        self.assertEqual(pool.stats()["acquire_count"], 2)
+
+    def test_pool_is_bounded(self):
+        pool = LLMClientPool("model", max_size=2, factory=lambda name: object())
+        in_use = []
+        peak = []
+        lock = threading.Lock()
+
+        def worker():
+            with pool.acquire() as client:
+                with lock:
+                    in_use.append(client)
+                    peak.append(len(in_use))
+                time.sleep(0.02)
+                with lock:
+                    in_use.remove(client)
+
+        threads = [threading.Thread(target=worker) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        stats = pool.stats()
+        self.assertLessEqual(max(peak), 2)
+        self.assertEqual(stats["created"], 2)
+        self.assertGreater(stats["max_wait_time"], 0)
+
+    def test_ensure_capacity(self):
+        pool = LLMClientPool("model", max_size=1, factory=lambda name: object())
+        pool.ensure_capacity(3)
+        self.assertEqual(pool.max_size, 3)
+        with pool.acquire(), pool.acquire(), pool.acquire():
+            self.assertEqual(pool.stats()["created"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
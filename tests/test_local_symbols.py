@@ -0,0 +1,105 @@
+import unittest
+
+from autocoder.index.local_symbols import extract_symbols_locally
+from autocoder.index.symbols_utils import extract_symbols, symbols_info_to_text
+
+PYTHON_CODE = '''"""Helpers for rendering templates.
+
+More details here.
+"""
+import os
+from typing import (
+    List,
+    Optional,
+)
+
+DEFAULT_NAME = "x"
+a, b = 1, 2
+count: int = 0
+
+
+def render(name):
+    import json
+    return json.dumps(name)
+
+
+async def fetch():
+    pass
+
+
+class Renderer:
+    x = 1
+
+    def run(self):
+        pass
+
+    class Inner:
+        pass
+'''
+
+TS_CODE = """import React from 'react';
+import {
+  useState,
+  useEffect,
+} from "react";
+const fs = require('fs');
+
+export const API_URL = "http://example.com";
+let counter = 0;
+
+export function fetchData(url: string) {
+  const local = 1;
+  return url;
+}
+
+export const handleClick = async (event: Event): Promise<void> => {
+};
+
+export default class App extends React.Component {}
+interface Props { name: string }
+"""
+
+
+class TestLocalSymbols(unittest.TestCase):
+    def test_python_symbols(self):
+        info = extract_symbols_locally("/a/render.py", PYTHON_CODE)
+        self.assertEqual(info.usage, "Helpers for rendering templates.")
+        self.assertEqual(info.functions, ["run", "render", "fetch"])
+        self.assertEqual(info.classes, ["Renderer", "Inner"])
+        self.assertEqual(info.variables, ["DEFAULT_NAME", "a", "b", "count"])
+        self.assertEqual(
+            info.import_statements,
+            [
+                "import os",
+                "from typing import ( List, Optional, )",
+                "import json",
+            ],
+        )
+
+    def test_js_ts_symbols(self):
+        info = extract_symbols_locally("/a/App.tsx", TS_CODE)
+        self.assertIsNone(info.usage)
+        self.assertEqual(info.functions, ["fetchData", "handleClick"])
+        self.assertEqual(info.classes, ["App", "Props"])
+        self.assertEqual(info.variables, ["API_URL", "counter"])
+        self.assertEqual(
+            info.import_statements,
+            [
+                "import React from 'react'",
+                'import { useState, useEffect, } from "react"',
+                "const fs = require('fs')",
+            ],
+        )
+
+    def test_unsupported_or_invalid_source(self):
+        self.assertIsNone(extract_symbols_locally("/a/main.go", "package main"))
+        self.assertIsNone(extract_symbols_locally("/a/bad.py", "def broken(:"))
+
+    def test_text_round_trip(self):
+        info = extract_symbols_locally("/a/render.py", PYTHON_CODE)
+        parsed = extract_symbols(symbols_info_to_text(info))
+        self.assertEqual(parsed, info)
+
+
+if __name__ == "__main__":
+    unittest.main()
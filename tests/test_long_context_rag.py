@@ -0,0 +1,50 @@
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+from autocoder.common import AutoCoderArgs
+from autocoder.rag.long_context_rag import LongContextRAG, parse_query_options
+
+
+class StopAfterFilter(Exception):
+    pass
+
+
+class TestQueryOptions(unittest.TestCase):
+    def test_parse_query_options(self):
+        self.assertEqual(parse_query_options("plain query"), ("plain query", False, None))
+        self.assertEqual(
+            parse_query_options(json.dumps({"query": "q", "lexical_top_n": 20})),
+            ("q", False, 20),
+        )
+        self.assertEqual(
+            parse_query_options(json.dumps({"query": "q", "only_contexts": True})),
+            ("q", True, None),
+        )
+        self.assertEqual(parse_query_options("[1, 2]"), ("[1, 2]", False, None))
+        self.assertEqual(
+            parse_query_options(json.dumps({"query": "q", "lexical_top_n": "x"})),
+            ("q", False, None),
+        )
+
+    def test_lexical_top_n_without_only_contexts(self):
+        rag = LongContextRAG.__new__(LongContextRAG)
+        rag.client = None
+        rag.llm = MagicMock()
+        rag.llm.get_sub_client.return_value = None
+        rag.args = AutoCoderArgs()
+        conversations = [
+            {"role": "user", "content": json.dumps({"query": "q", "lexical_top_n": 20})}
+        ]
+        with patch.object(
+            LongContextRAG, "_filter_docs", side_effect=StopAfterFilter
+        ) as filter_docs:
+            with self.assertRaises(StopAfterFilter):
+                rag._stream_chat_oai(conversations)
+        filter_docs.assert_called_once()
+        self.assertEqual(filter_docs.call_args.kwargs["lexical_top_n"], 20)
+        self.assertEqual(conversations[-1]["content"], "q")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import os
+import re
+import tempfile
+import unittest
+
+import pathspec
+
+from autocoder.common.path_matcher import PathMatcher
+from autocoder.common.project_scanner import DirSnapshot, ProjectScanner
+
+
+IGNORE_LINES = [
+    "# comment",
+    "*.log",
+    "!keep.log",
+    "build/",
+    "/top.txt",
+    "docs/**/draft*",
+    "tmp",
+    "",
+]
+
+
+class TestPathMatcher(unittest.TestCase):
+    def test_combined_rules_agree_with_pathspec(self):
+        matcher = PathMatcher(ignore_patterns=IGNORE_LINES)
+        self.assertIsNotNone(matcher.ignore_regex)
+        spec = pathspec.PathSpec.from_lines("gitwildmatch", IGNORE_LINES)
+        paths = [
+            "a.log",
+            "keep.log",
+            "src/keep.log",
+            "src/x.log",
+            "top.txt",
+            "src/top.txt",
+            "docs/a/b/draft1.md",
+            "docs/final.md",
+            "tmp",
+            "src/tmp/x.py",
+            "src/main.py",
+            "build/out.js",
+        ]
+        for path in paths:
+            self.assertEqual(matcher.is_ignored(path), spec.match_file(path), path)
+
+    def test_accepts_pathspec(self):
+        spec = pathspec.PathSpec.from_lines("gitwildmatch", IGNORE_LINES)
+        matcher = PathMatcher(ignore_patterns=spec)
+        self.assertTrue(matcher.is_ignored("x.log"))
+        self.assertFalse(matcher.is_ignored("keep.log"))
+
+    def test_directory_rules_prune(self):
+        matcher = PathMatcher(
+            ignore_patterns=IGNORE_LINES, exclude_dirs=["node_modules"], skip_hidden_dirs=True
+        )
+        self.assertTrue(matcher.is_dir_pruned("build", "src/build"))
+        self.assertTrue(matcher.is_dir_pruned("node_modules", "node_modules"))
+        self.assertTrue(matcher.is_dir_pruned(".git", ".git"))
+        self.assertFalse(matcher.is_dir_pruned("src", "src"))
+        # build/ 只匹配目录
+        self.assertFalse(matcher.is_ignored("build"))
+
+    def test_exclude_regexes_and_extensions(self):
+        matcher = PathMatcher(
+            exclude_patterns=[re.compile(r"test_"), r"/vendor/"],
+            required_exts=[".py", ".md"],
+        )
+        self.assertEqual(len(matcher.exclude_regexes), 1)
+        self.assertTrue(matcher.is_excluded("/p/src/test_a.py"))
+        self.assertTrue(matcher.is_excluded("/p/vendor/a.py"))
+        self.assertFalse(matcher.is_excluded("/p/src/a.py"))
+        self.assertTrue(matcher.is_file_included("src/a.py", "/p/src/a.py"))
+        self.assertFalse(matcher.is_file_included("src/a.js", "/p/src/a.js"))
+        self.assertFalse(matcher.is_file_included("src/test_a.py", "/p/src/test_a.py"))
+
+    def test_memo_is_bounded(self):
+        matcher = PathMatcher(ignore_patterns=["*.log"], memo_size=10)
+        for i in range(50):
+            matcher.is_ignored(f"f{i}.log")
+        self.assertLessEqual(len(matcher._memo), 10)
+
+
+class TestScannerWithMatcher(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = self.temp_dir.name
+        for rel in [
+            "src/main.py",
+            "src/app.log",
+            "src/keep.log",
+            "src/build/gen.py",
+            "build/out.py",
+            ".hidden/secret.py",
+            "node_modules/pkg/index.py",
+            "docs/readme.md",
+            "top.txt",
+        ]:
+            path = os.path.join(root, rel)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write("x")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def legacy_scan(self, spec, required_exts, ignore_dirs):
+        """RAG 缓存原来基于 os.walk + pathspec 的实现"""
+        root = self.temp_dir.name
+        result = []
+        for cur, dirs, files in os.walk(root, followlinks=True):
+            dirs[:] = [d for d in dirs if not d.startswith(".") and d not in ignore_dirs]
+            relative_root = os.path.relpath(cur, root)
+            dirs[:] = [d for d in dirs if not spec.match_file(os.path.join(relative_root, d))]
+            files = [f for f in files if not spec.match_file(os.path.join(relative_root, f))]
+            for file in files:
+                if required_exts and not any(file.endswith(ext) for ext in required_exts):
+                    continue
+                result.append(os.path.join(cur, file))
+        return sorted(result)
+
+    def test_matches_legacy_rag_scan(self):
+        spec = pathspec.PathSpec.from_lines("gitwildmatch", IGNORE_LINES)
+        for required_exts in ([], [".py", ".log"]):
+            matcher = PathMatcher.for_rag_cache(spec, required_exts, ["node_modules"])
+            scanner = ProjectScanner(
+                self.temp_dir.name, matcher=matcher, snapshot=DirSnapshot(self.temp_dir.name)
+            )
+            self.assertEqual(
+                sorted(scanner.iter_files()),
+                self.legacy_scan(spec, required_exts, ["node_modules"]),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from autocoder.common import AutoCoderArgs
+from autocoder.common.project_scanner import DirSnapshot, ProjectScanner
+from autocoder.suffixproject import SuffixProject
+
+
+def os_walk_files(root, exclude_dirs):
+    result = []
+    for r, dirs, files in os.walk(root, followlinks=True):
+        dirs[:] = [d for d in dirs if d not in exclude_dirs]
+        result.extend(os.path.join(r, f) for f in files)
+    return result
+
+
+def age_dirs(root, seconds=10):
+    """把目录的 mtime 调到几秒之前，刚创建的目录处在 racy 窗口内不会写入快照"""
+    mtime = time.time() - seconds
+    for r, _, _ in os.walk(root):
+        os.utime(r, (mtime, mtime))
+
+
+class TestProjectScanner(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+        for path in [
+            "a.py",
+            "pkg/b.py",
+            "pkg/sub/c.ts",
+            "pkg/sub/d.md",
+            "node_modules/x/index.js",
+            "z/e.py",
+        ]:
+            full_path = os.path.join(self.root, path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, "w") as f:
+                f.write("x = 1\n")
+        age_dirs(self.root)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_same_result_as_os_walk(self):
+        exclude_dirs = ["node_modules"]
+        scanner = ProjectScanner(self.root, exclude_dirs, snapshot=DirSnapshot(self.root))
+        self.assertEqual(scanner.list_files(), os_walk_files(self.root, exclude_dirs))
+        self.assertNotIn(
+            os.path.join(self.root, "node_modules"), scanner.list_dirs()
+        )
+
+    def test_snapshot_reuses_unchanged_directories(self):
+        snapshot = DirSnapshot(self.root)
+        ProjectScanner(self.root, snapshot=snapshot).list_files()
+        expected = os_walk_files(self.root, ["node_modules"])
+
+        with patch("autocoder.common.project_scanner.os.scandir", wraps=os.scandir) as scandir:
+            files = ProjectScanner(self.root, ["node_modules"], snapshot=snapshot).list_files()
+            self.assertEqual(scandir.call_count, 0)
+            self.assertEqual(files, expected)
+
+            # 只有内容发生变化的目录需要重新列出
+            time.sleep(0.01)
+            new_file = os.path.join(self.root, "pkg", "new.py")
+            with open(new_file, "w") as f:
+                f.write("")
+            files = ProjectScanner(self.root, snapshot=snapshot).list_files()
+            self.assertEqual(scandir.call_count, 1)
+            self.assertIn(new_file, files)
+
+    def test_recently_modified_directories_are_not_cached(self):
+        snapshot = DirSnapshot(self.root)
+        new_file = os.path.join(self.root, "pkg", "new.py")
+        with open(new_file, "w") as f:
+            f.write("")
+        ProjectScanner(self.root, snapshot=snapshot).list_files()
+        # pkg 刚被修改过，同一个 mtime 内还可能再变化，不能复用
+        def mtime(rel_dir):
+            return os.stat(os.path.join(self.root, rel_dir)).st_mtime_ns
+
+        self.assertIsNone(snapshot.get("pkg", mtime("pkg")))
+        self.assertIsNotNone(snapshot.get("z", mtime("z")))
+
+    def test_removed_directories_are_pruned_without_stat(self):
+        snapshot_dir = tempfile.mkdtemp(dir=self.root, prefix=".snap")
+        snapshot = DirSnapshot(self.root, os.path.join(snapshot_dir, "scan.json"))
+        ProjectScanner(self.root, snapshot=snapshot).list_files()
+        self.assertIn("pkg/sub", snapshot.entries)
+
+        shutil.rmtree(os.path.join(self.root, "pkg"))
+        age_dirs(self.root)
+        with patch(
+            "autocoder.common.project_scanner.os.path.isdir", wraps=os.path.isdir
+        ) as isdir:
+            ProjectScanner(self.root, snapshot=snapshot).list_files()
+        # 保存时只检查快照文件所在目录，不再 stat 每个目录
+        self.assertEqual(isdir.call_count, 1)
+        self.assertNotIn("pkg", snapshot.entries)
+        self.assertNotIn("pkg/sub", snapshot.entries)
+        self.assertIn("z", snapshot.entries)
+
+    def test_snapshot_is_persisted_under_auto_coder_dir(self):
+        os.makedirs(os.path.join(self.root, ".auto-coder"))
+        age_dirs(self.root)
+        snapshot_file = os.path.join(self.root, ".auto-coder", "scan_snapshot.json")
+        ProjectScanner(
+            self.root, [".auto-coder"], snapshot=DirSnapshot(self.root, snapshot_file)
+        ).list_files()
+        self.assertTrue(os.path.exists(snapshot_file))
+
+        reloaded = DirSnapshot(self.root, snapshot_file)
+        with patch("autocoder.common.project_scanner.os.scandir") as scandir:
+            files = ProjectScanner(self.root, [".auto-coder"], snapshot=reloaded).list_files()
+        scandir.assert_not_called()
+        self.assertIn(os.path.join(self.root, "pkg", "sub", "c.ts"), files)
+
+    def test_directory_structure_does_not_read_files(self):
+        args = AutoCoderArgs(source_dir=self.root, project_type=".py")
+        project = SuffixProject(args=args)
+        with patch.object(SuffixProject, "read_file_content") as read_file_content:
+            paths = sorted(project.get_source_file_paths())
+        read_file_content.assert_not_called()
+        self.assertEqual(
+            [os.path.relpath(p, self.root) for p in paths],
+            ["a.py", os.path.join("pkg", "b.py"), os.path.join("z", "e.py")],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
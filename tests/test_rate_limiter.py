@@ -0,0 +1,148 @@
+import threading
+import time
+import unittest
+
+from autocoder.common import AutoCoderArgs
+from autocoder.utils.rate_limiter import (
+    RateLimiter,
+    get_rate_limiter,
+    get_rate_limiter_for_llm,
+    is_rate_limit_error,
+    parse_retry_after,
+)
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_detect_rate_limit_errors(self):
+        self.assertTrue(is_rate_limit_error(Exception("Error code: 429 - Too Many Requests")))
+        self.assertTrue(is_rate_limit_error(Exception("Rate limit reached for requests")))
+        self.assertFalse(is_rate_limit_error(Exception("invalid api key")))
+        # 请求 id、token 数等里面出现的 429 以及普通的 quota 字样不算限流
+        self.assertFalse(is_rate_limit_error(Exception("request id 74290 failed")))
+        self.assertFalse(is_rate_limit_error(Exception("context quota too small")))
+
+        class StatusError(Exception):
+            status_code = 429
+
+        self.assertTrue(is_rate_limit_error(StatusError("error")))
+        # 余额不足、账单问题直接失败，即使状态码是 429
+        self.assertFalse(is_rate_limit_error(StatusError("insufficient_quota")))
+        self.assertFalse(
+            is_rate_limit_error(Exception("You exceeded your current quota, check billing"))
+        )
+        self.assertEqual(parse_retry_after(Exception("please retry after 2.5 seconds")), 2.5)
+        self.assertIsNone(parse_retry_after(Exception("429")))
+
+    def test_rpm_limit(self):
+        limiter = RateLimiter("model", rpm=600)
+        start = time.monotonic()
+        for _ in range(15):
+            limiter.call(lambda: None)
+        # 容量为一秒的量（10 个），剩下 5 个需要等待约 0.5 秒
+        self.assertGreater(time.monotonic() - start, 0.4)
+
+    def test_retry_and_backoff_on_rate_limit(self):
+        limiter = RateLimiter("model", rpm=6000, base_backoff=0.01)
+        calls = []
+
+        def func():
+            calls.append(1)
+            if len(calls) < 3:
+                raise Exception("429 Too Many Requests")
+            return "ok"
+
+        self.assertEqual(limiter.call(func), "ok")
+        self.assertEqual(len(calls), 3)
+        stats = limiter.stats()
+        self.assertEqual(stats["rate_limited_count"], 2)
+        # 每次限流速率减半，成功后逐步加回
+        self.assertEqual(stats["current_rpm"], 1501)
+
+    def test_other_errors_are_not_retried(self):
+        limiter = RateLimiter("model", base_backoff=0.01, max_retries=5)
+        calls = []
+
+        def func():
+            calls.append(1)
+            raise ValueError("bad response")
+
+        with self.assertRaises(ValueError):
+            limiter.call(func)
+        self.assertEqual(len(calls), 1)
+
+    def test_gives_up_after_max_retries(self):
+        limiter = RateLimiter("model", rpm=6000, base_backoff=0.001, max_retries=2)
+        with self.assertRaises(Exception):
+            limiter.call(lambda: (_ for _ in ()).throw(Exception("rate limit")))
+        self.assertEqual(limiter.stats()["rate_limited_count"], 2)
+
+    def test_max_concurrency(self):
+        limiter = RateLimiter("model", max_concurrency=2)
+        lock = threading.Lock()
+        running = []
+        peak = []
+
+        def func():
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.02)
+            with lock:
+                running.pop()
+
+        threads = [threading.Thread(target=limiter.call, args=(func,)) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertLessEqual(max(peak), 2)
+
+    def test_shared_per_model(self):
+        first = get_rate_limiter("shared-model", rpm=100)
+        second = get_rate_limiter("shared-model", tpm=1000)
+        self.assertIs(first, second)
+        self.assertEqual((second.rpm, second.tpm), (100, 1000))
+
+    def test_anti_quota_limit_is_mapped_to_rpm(self):
+        class LLM:
+            default_model_name = "anti-quota-model"
+
+        args = AutoCoderArgs(index_model_anti_quota_limit=2)
+        limiter = get_rate_limiter_for_llm(
+            LLM(), args, anti_quota_option="index_model_anti_quota_limit"
+        )
+        self.assertEqual(limiter.rpm, 30)
+
+        # 其他没有指定 anti_quota_option 的调用方（比如翻译）不会把 rpm 重置为 0
+        limiter = get_rate_limiter_for_llm(LLM(), AutoCoderArgs(index_model_anti_quota_limit=2))
+        self.assertEqual(limiter.rpm, 30)
+
+        args = AutoCoderArgs(index_model_anti_quota_limit=2, llm_rpm_limit=100)
+        limiter = get_rate_limiter_for_llm(
+            LLM(), args, anti_quota_option="index_model_anti_quota_limit"
+        )
+        self.assertEqual(limiter.rpm, 100)
+
+    def test_changing_max_concurrency_keeps_in_flight_requests(self):
+        limiter = RateLimiter("model", max_concurrency=1)
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+
+        t = threading.Thread(target=lambda: limiter.call(slow))
+        t.start()
+        started.wait(5)
+        limiter.configure(max_concurrency=2)
+        # 上限调整为 2 后可以立即再发出一个请求，正在执行的请求仍然被计数
+        limiter.call(lambda: None)
+        self.assertEqual(limiter.in_flight, 1)
+        release.set()
+        t.join()
+        self.assertEqual(limiter.in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import tempfile
+import time
+import unittest
+
+from autocoder.rag.relevance_cache import RelevanceCache
+
+
+class TestRelevanceCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, ".cache", "relevance_cache.db")
+        self.conversations = [{"role": "user", "content": "大象生活在哪里？"}]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_get_put_with_normalized_query(self):
+        cache = RelevanceCache(self.db_path)
+        cache.put("relevance", self.conversations, "md5-a", "model-a", "yes/8")
+
+        similar = [{"role": "user", "content": "  大象生活在哪里？ "}]
+        self.assertEqual(cache.get("relevance", similar, "md5-a", "model-a"), "yes/8")
+        self.assertIsNone(cache.get("relevance", similar, "md5-b", "model-a"))
+        self.assertIsNone(cache.get("relevance", similar, "md5-a", "model-b"))
+        self.assertIsNone(cache.get("chunk_ranges", similar, "md5-a", "model-a"))
+
+        # 重新打开数据库，结果仍然存在
+        reopened = RelevanceCache(self.db_path)
+        self.assertEqual(
+            reopened.get("relevance", self.conversations, "md5-a", "model-a"), "yes/8"
+        )
+
+    def test_ttl_expiry(self):
+        cache = RelevanceCache(self.db_path, ttl=0.01)
+        cache.put("chunk_ranges", self.conversations, "md5", "m", [{"start_line": 1, "end_line": 2}])
+        time.sleep(0.05)
+        self.assertIsNone(cache.get("chunk_ranges", self.conversations, "md5", "m"))
+
+    def test_size_bounded_eviction(self):
+        cache = RelevanceCache(self.db_path, max_entries=5, evict_every=1)
+        for i in range(10):
+            cache.put("relevance", self.conversations, f"md5-{i}", "m", "no/1")
+        self.assertEqual(len(cache), 5)
+        self.assertIsNotNone(cache.get("relevance", self.conversations, "md5-9", "m"))
+        self.assertIsNone(cache.get("relevance", self.conversations, "md5-0", "m"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import json
+import tempfile
+import unittest
+
+from autocoder.rag.cache.segment_store import SegmentCacheStore
+
+
+def make_record(path: str, text: str, md5: str = "m"):
+    return {
+        "file_path": path,
+        "relative_path": path,
+        "content": [{"module_name": path, "source_code": text}],
+        "modify_time": 1.0,
+        "md5": md5,
+    }
+
+
+class TestSegmentCacheStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store_dir = os.path.join(self.tmp_dir.name, "segments")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_put_get_delete(self):
+        store = SegmentCacheStore(self.store_dir)
+        store["a"] = make_record("a", "hello")
+        store["b"] = make_record("b", "world")
+        self.assertEqual(store["a"]["content"][0]["source_code"], "hello")
+        self.assertEqual(store.get_meta("b")["md5"], "m")
+        self.assertNotIn("content", store.get_meta("b"))
+
+        del store["a"]
+        self.assertNotIn("a", store)
+        self.assertEqual(list(store.keys()), ["b"])
+
+    def test_reload_from_index_and_unflushed_tail(self):
+        store = SegmentCacheStore(self.store_dir)
+        store["a"] = make_record("a", "v1")
+        store.flush()
+        # 索引落盘后继续追加，重启时需要回放尾部记录
+        store["a"] = make_record("a", "v2", md5="m2")
+        store["b"] = make_record("b", "x")
+
+        reloaded = SegmentCacheStore(self.store_dir)
+        self.assertEqual(sorted(reloaded.keys()), ["a", "b"])
+        self.assertEqual(reloaded["a"]["content"][0]["source_code"], "v2")
+        self.assertEqual(reloaded.get_meta("a")["md5"], "m2")
+
+    def test_rebuild_without_index(self):
+        store = SegmentCacheStore(self.store_dir)
+        store["a"] = make_record("a", "v1")
+        store.flush()
+        os.remove(os.path.join(self.store_dir, "index.json"))
+        self.assertEqual(SegmentCacheStore(self.store_dir)["a"]["md5"], "m")
+
+    def test_compact_drops_garbage(self):
+        store = SegmentCacheStore(
+            self.store_dir, segment_max_bytes=512, compact_min_bytes=0
+        )
+        for i in range(20):
+            store["a"] = make_record("a", "x" * 100 + str(i))
+        store["b"] = make_record("b", "keep")
+        self.assertTrue(store.should_compact())
+        before = store.total_bytes()
+
+        store.commit()
+        self.assertLess(store.total_bytes(), before)
+        self.assertEqual(store["a"]["content"][0]["source_code"], "x" * 100 + "19")
+
+        reloaded = SegmentCacheStore(self.store_dir)
+        self.assertEqual(reloaded["b"]["content"][0]["source_code"], "keep")
+
+    def test_import_legacy_jsonl(self):
+        legacy_file = os.path.join(self.tmp_dir.name, "cache.jsonl")
+        with open(legacy_file, "w") as f:
+            for path in ["a", "b"]:
+                f.write(json.dumps(make_record(path, path)) + "\n")
+        store = SegmentCacheStore(self.store_dir)
+        self.assertEqual(store.import_jsonl(legacy_file), 2)
+        self.assertEqual(store["b"]["content"][0]["source_code"], "b")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from autocoder.common import AutoCoderArgs, SourceCode
+from autocoder.common.source_loader import is_binary_file, load_source_codes
+from autocoder.index.index import IndexManager, build_index_and_filter_files
+from autocoder.suffixproject import SuffixProject
+
+
+def read_source(file_path, text):
+    return SourceCode(module_name=file_path, source_code=text)
+
+
+class TestSourceLoader(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.paths = []
+        for i in range(20):
+            path = os.path.join(self.temp_dir.name, f"f{i}.py")
+            with open(path, "w") as f:
+                f.write(f"x = {i}\n")
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, name, data: bytes):
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_is_binary_file(self):
+        self.assertTrue(is_binary_file(self.write("a.bin", b"\x00\x01\x02")))
+        self.assertTrue(is_binary_file(self.write("b.bin", b"\xff\xfe\xfa abc")))
+        self.assertFalse(is_binary_file(self.write("c.txt", "中文内容".encode("utf-8"))))
+        # 多字节字符被截断在采样边界上仍然是文本
+        self.assertFalse(
+            is_binary_file(self.write("d.txt", b"a" * 8191 + "中".encode("utf-8")))
+        )
+
+    def test_order_is_preserved_and_reads_are_concurrent(self):
+        lock = threading.Lock()
+        running = []
+        peak = []
+
+        def slow_read(file_path, text):
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.01)
+            with lock:
+                running.pop()
+            return read_source(file_path, text)
+
+        sources = list(load_source_codes(self.paths, slow_read, max_workers=4))
+        self.assertEqual([s.module_name for s in sources], self.paths)
+        self.assertGreater(max(peak), 1)
+        self.assertLessEqual(max(peak), 4)
+
+    def test_skips_binary_large_and_failed_files(self):
+        binary = self.write("img.png", b"\x89PNG\x00\x00")
+        large = self.write("large.py", b"x" * 2000)
+        missing = os.path.join(self.temp_dir.name, "missing.py")
+        paths = [self.paths[0], binary, large, missing, self.paths[1]]
+        sources = list(load_source_codes(paths, read_source, max_workers=2, max_file_size=1000))
+        self.assertEqual([s.module_name for s in sources], self.paths[:2])
+
+    def test_build_index_consumes_stream(self):
+        args = AutoCoderArgs(source_dir=self.temp_dir.name, index_build_workers=2)
+        submitted_while_loading = []
+        loaded = []
+
+        def stream():
+            for source in load_source_codes(self.paths, read_source, max_workers=2):
+                loaded.append(source.module_name)
+                yield source
+
+        def fake_build(self, source, defer_chunks=False):
+            submitted_while_loading.append(len(loaded) < 20)
+            return {
+                "module_name": source.module_name,
+                "symbols": "",
+                "last_modified": 0,
+                "md5": "x",
+            }
+
+        manager = IndexManager(llm=None, sources=stream(), args=args)
+        with patch.object(
+            IndexManager, "build_index_for_single_source", autospec=True, side_effect=fake_build
+        ):
+            index_data = manager.build_index()
+        self.assertEqual(len(index_data), 20)
+        self.assertEqual([s.module_name for s in manager.sources], self.paths)
+        self.assertTrue(any(submitted_while_loading))
+
+    def test_build_events_report_real_total_when_streaming(self):
+        args = AutoCoderArgs(
+            source_dir=self.temp_dir.name,
+            request_id="r",
+            skip_filter_index=True,
+        )
+
+        def fake_build(self, source, defer_chunks=False):
+            return {
+                "module_name": source.module_name,
+                "symbols": "",
+                "last_modified": 0,
+                "md5": "x",
+            }
+
+        stream = load_source_codes(self.paths, read_source, max_workers=2)
+        with patch.object(
+            IndexManager, "build_index_for_single_source", autospec=True, side_effect=fake_build
+        ), patch("autocoder.index.index.queue_communicate") as queue:
+            llm = MagicMock()
+            llm.get_sub_client.return_value = None
+            build_index_and_filter_files(llm, args, stream)
+        events = {
+            call.kwargs["event"].event_type: json.loads(call.kwargs["event"].data)
+            for call in queue.send_event.call_args_list
+        }
+        # 开始时还不知道文件总数，不能报 0
+        self.assertNotIn("total_files", events["code_index_build_start"])
+        self.assertEqual(events["code_index_build_end"]["total_files"], 20)
+
+
+class TestProjectSourceOutput(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        for name in ["a.py", "b.py"]:
+            with open(os.path.join(self.temp_dir.name, name), "w") as f:
+                f.write(f"# {name}\n")
+        self.target_file = os.path.join(self.temp_dir.name, "output.txt")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def make_project(self, **kwargs):
+        args = AutoCoderArgs(
+            source_dir=self.temp_dir.name,
+            target_file=self.target_file,
+            project_type=".py",
+            **kwargs,
+        )
+        return SuffixProject(args=args, llm=None)
+
+    def test_lazy_mode_does_not_write_target_file(self):
+        pp = self.make_project()
+        stream = pp.iter_sources()
+        first = next(stream)
+        self.assertEqual(pp.sources, [first])
+        rest = list(stream)
+        self.assertEqual(len(pp.sources), 1 + len(rest))
+        self.assertFalse(os.path.exists(self.target_file))
+
+        output = pp.output()
+        for source in pp.sources:
+            self.assertIn(f"##File: {source.module_name}\n{source.source_code}\n\n", output)
+
+    def test_file_mode_writes_same_content(self):
+        pp = self.make_project(source_output_mode="file")
+        pp.run()
+        with open(self.target_file, "r") as f:
+            self.assertEqual(f.read(), pp.output())
+        self.assertEqual(len(pp.sources), 2)
+
+    def test_run_resets_sources(self):
+        pp = self.make_project()
+        pp.run()
+        pp.run()
+        self.assertEqual(len(pp.sources), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
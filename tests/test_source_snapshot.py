@@ -0,0 +1,151 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from autocoder.common import SourceCode
+from autocoder.common.source_loader import load_source_codes
+from autocoder.common.source_snapshot import SourceSnapshotStore, content_hash
+
+
+class TestSourceSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.snapshot_dir = os.path.join(self.temp_dir.name, ".auto-coder")
+        self.paths = [self.write(f"f{i}.py", f"x = {i}\n") for i in range(5)]
+        self.read = []
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, name, text, age=10):
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, "w") as f:
+            f.write(text)
+        # 避开 racy 窗口：把 mtime 调到若干秒以前
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns - age * 10**9))
+        return path
+
+    def convert(self, file_path, text):
+        return SourceCode(module_name=file_path, source_code=text)
+
+    def load(self, store, paths=None):
+        # 只有快照没有命中、重新读了文件时才会 record
+        with patch.object(store, "record", wraps=store.record) as record:
+            sources = list(
+                load_source_codes(paths or self.paths, self.convert, max_workers=2, snapshot=store)
+            )
+        self.read = [c.args[0] for c in record.call_args_list]
+        return sources
+
+    def test_reuses_unchanged_files_across_runs(self):
+        sources = self.load(SourceSnapshotStore(self.snapshot_dir))
+        self.assertEqual(len(self.read), 5)
+        for source in sources:
+            self.assertEqual(source.metadata["md5"], content_hash(source.source_code))
+
+        # 新的进程重新打开快照
+        store = SourceSnapshotStore(self.snapshot_dir)
+        self.write("f2.py", "x = 'changed'\n", age=5)
+        sources = self.load(store)
+        self.assertEqual(self.read, [self.paths[2]])
+        self.assertEqual(store.changed_paths, {self.paths[2]})
+        self.assertEqual([s.module_name for s in sources], self.paths)
+        self.assertEqual(sources[2].source_code, "x = 'changed'\n")
+        self.assertEqual(sources[0].source_code, "x = 0\n")
+        self.assertEqual(sources[0].metadata["md5"], content_hash("x = 0\n"))
+
+    def test_first_run_marks_everything_changed(self):
+        store = SourceSnapshotStore(self.snapshot_dir)
+        self.load(store)
+        self.assertEqual(store.changed_paths, set(self.paths))
+        self.load(store)
+        self.assertEqual(self.read, [])
+        self.assertEqual(store.changed_paths, set())
+
+    def test_recently_modified_files_are_not_trusted(self):
+        store = SourceSnapshotStore(self.snapshot_dir)
+        path = self.write("new.py", "y = 1\n", age=0)
+        self.load(store, [path])
+        self.load(store, [path])
+        # mtime 在 racy 窗口内，第二次仍然重新读取，但内容没变不算变化
+        self.assertEqual(self.read, [path])
+        self.assertEqual(store.changed_paths, set())
+
+    def test_prunes_deleted_files_and_blobs(self):
+        store = SourceSnapshotStore(self.snapshot_dir)
+        self.load(store)
+        os.remove(self.paths[0])
+        self.load(store, self.paths[1:])
+        self.assertNotIn(self.paths[0], store.manifest)
+        with store._connect() as conn:
+            hashes = {r[0] for r in conn.execute("SELECT hash FROM blobs")}
+        self.assertNotIn(content_hash("x = 0\n"), hashes)
+        self.assertEqual(len(hashes), 4)
+
+    def test_project_modes_share_snapshot(self):
+        from autocoder.common import AutoCoderArgs
+        from autocoder.pyproject import PyProject
+
+        def project_sources(auto_merge):
+            args = AutoCoderArgs(source_dir=self.temp_dir.name, auto_merge=auto_merge)
+            return {s.module_name: s for s in PyProject(args).get_source_codes()}
+
+        os.makedirs(self.snapshot_dir)
+        path = self.paths[0]
+        self.assertEqual(project_sources("strict_diff")[path].source_code, "1:x = 0\n")
+        # 同一份快照上切换 auto_merge，不能拿到上一次加过行号的内容
+        source = project_sources("editblock")[path]
+        self.assertEqual(source.source_code, "x = 0\n")
+        self.assertEqual(source.metadata["md5"], content_hash("x = 0\n"))
+        self.assertEqual(project_sources("strict_diff")[path].source_code, "1:x = 0\n")
+
+    def test_ts_project_filters_snapshot_hits(self):
+        from autocoder.common import AutoCoderArgs
+        from autocoder.tsproject import TSProject
+
+        os.makedirs(os.path.join(self.temp_dir.name, "src"))
+        useful = self.write(os.path.join("src", "app.ts"), "export const a = 1;\n")
+        blank = self.write(os.path.join("src", "blank.ts"), "\n\n")
+        args = AutoCoderArgs(source_dir=self.temp_dir.name)
+        store = SourceSnapshotStore(self.snapshot_dir)
+        self.load(store, [useful, blank])
+        # 快照命中的文件同样要经过 TSProject 自己的过滤
+        project = TSProject(args)
+        with patch(
+            "autocoder.common.source_loader.get_source_snapshot", return_value=store
+        ), patch.object(store, "record") as record:
+            sources = list(project.get_source_codes())
+        record.assert_not_called()
+        self.assertEqual([s.module_name for s in sources], [useful])
+
+    def test_index_reuses_snapshot_md5(self):
+        from autocoder.common import AutoCoderArgs
+        from autocoder.index.index import IndexManager
+
+        store = SourceSnapshotStore(self.snapshot_dir)
+        sources = self.load(store)
+        args = AutoCoderArgs(source_dir=self.temp_dir.name, index_build_workers=1)
+        manager = IndexManager(llm=None, sources=sources, args=args)
+        manager.index_store.upsert(
+            [
+                {
+                    "module_name": s.module_name,
+                    "symbols": "",
+                    "last_modified": 0,
+                    "md5": s.metadata["md5"],
+                }
+                for s in sources
+            ]
+        )
+        with patch("autocoder.index.index.hashlib.md5") as md5, patch.object(
+            IndexManager, "build_index_for_single_source"
+        ) as build:
+            manager.build_index()
+        md5.assert_not_called()
+        build.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import unittest
+
+from unittest.mock import patch
+
+from autocoder.common import AutoCoderArgs
+from autocoder.index.index import IndexManager
+from autocoder.index.symbol_index import (
+    SUBSTRING_MAX_MATCHES,
+    SymbolIndex,
+    parse_query_references,
+)
+from autocoder.index.symbols_utils import SymbolType
+
+
+def _item(module_name, functions="", classes="", variables=""):
+    return {
+        "module_name": module_name,
+        "symbols": f"用途：\n函数：{functions}\n变量：{variables}\n类：{classes}\n导入语句：",
+        "last_modified": 0,
+        "md5": "",
+    }
+
+
+INDEX_DATA = {
+    "/p/src/app/main.py": _item("/p/src/app/main.py", functions="main, run_server"),
+    "/p/src/app/models.py": _item("/p/src/app/models.py", classes="UserModel, OrderModel"),
+    "/p/src/utils/helpers.py": _item(
+        "/p/src/utils/helpers.py", functions="format_date", variables="DEFAULT_TZ"
+    ),
+    "/p/tests/test_main.py": _item("/p/tests/test_main.py", functions="test_main"),
+}
+
+
+class TestSymbolIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = SymbolIndex(INDEX_DATA)
+
+    def test_parse_query_references(self):
+        refs = parse_query_references("修改 @src/app/main.py 里的 @@run_server，联系 a@b.com")
+        self.assertEqual(refs.file_refs, ["src/app/main.py"])
+        self.assertEqual(refs.symbol_refs, ["run_server"])
+        self.assertEqual(refs.text, "修改 里的 ，联系 a@b.com")
+
+    def test_resolve_path(self):
+        self.assertEqual(self.index.resolve_path("app/main.py"), ["/p/src/app/main.py"])
+        self.assertEqual(self.index.resolve_path("./src/app/main.py"), ["/p/src/app/main.py"])
+        self.assertEqual(self.index.resolve_path("helpers"), ["/p/src/utils/helpers.py"])
+        self.assertEqual(
+            self.index.resolve_path("main"),
+            ["/p/src/app/main.py"],
+        )
+        self.assertEqual(
+            sorted(self.index.resolve_path("src/app")),
+            ["/p/src/app/main.py", "/p/src/app/models.py"],
+        )
+        self.assertEqual(self.index.resolve_path("helprs.py"), ["/p/src/utils/helpers.py"])
+        self.assertEqual(self.index.resolve_path("nothing_like_this.go"), [])
+
+    def test_substring_match_is_capped_and_ranked(self):
+        data = {
+            f"/p/pkg{i}/module.py": _item(f"/p/pkg{i}/module.py") for i in range(20)
+        }
+        data["/p/a/long/dir/handler_pkg.py"] = _item("/p/a/long/dir/handler_pkg.py")
+        index = SymbolIndex(data)
+        matches = index.resolve_path("pkg")
+        self.assertEqual(len(matches), SUBSTRING_MAX_MATCHES)
+        self.assertEqual(matches[0], "/p/a/long/dir/handler_pkg.py")
+        # 太短的标记不做子串匹配
+        self.assertEqual(index.resolve_path("kg"), [])
+
+    def test_resolve_symbol(self):
+        matches = self.index.resolve_symbol("UserModel")
+        self.assertEqual([m.module_name for m in matches], ["/p/src/app/models.py"])
+        self.assertEqual(matches[0].symbol_type, SymbolType.CLASSES)
+
+        self.assertEqual(
+            [m.symbol_name for m in self.index.resolve_symbol("usermodel")], ["UserModel"]
+        )
+        self.assertEqual(
+            [m.symbol_name for m in self.index.resolve_symbol("format")], ["format_date"]
+        )
+        self.assertEqual(
+            [m.symbol_name for m in self.index.resolve_symbol("run_servr")], ["run_server"]
+        )
+        self.assertEqual(self.index.resolve_symbol("does_not_exist_at_all"), [])
+
+    def test_resolve_query(self):
+        refs, resolved, unresolved = self.index.resolve_query(
+            "look at @helpers.py and @@OrderModel and @@missing_symbol_xyz"
+        )
+        self.assertEqual(
+            [path for path, _ in resolved],
+            ["/p/src/utils/helpers.py", "/p/src/app/models.py"],
+        )
+        self.assertEqual(unresolved, ["@@missing_symbol_xyz"])
+        self.assertEqual(refs.text, "look at and and")
+
+
+class TestResolveQueryReferences(unittest.TestCase):
+    def _manager(self, **kwargs):
+        manager = IndexManager.__new__(IndexManager)
+        manager.args = AutoCoderArgs(**kwargs)
+        patcher = patch.object(
+            IndexManager, "get_symbol_index", return_value=SymbolIndex(INDEX_DATA)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return manager
+
+    def test_free_text_is_forwarded_by_default(self):
+        manager = self._manager()
+        files, query = manager.resolve_query_references("@helpers.py 增加时区参数")
+        self.assertEqual([f.file_path for f in files], ["/p/src/utils/helpers.py"])
+        self.assertEqual(query, "增加时区参数")
+
+        _, query = manager.resolve_query_references("@helpers.py @@OrderModel")
+        self.assertIsNone(query)
+
+    def test_free_text_dropped_when_disabled(self):
+        manager = self._manager(index_filter_llm_on_references=False)
+        _, query = manager.resolve_query_references("@helpers.py 增加时区参数")
+        self.assertIsNone(query)
+
+
+if __name__ == "__main__":
+    unittest.main()
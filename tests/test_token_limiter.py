@@ -0,0 +1,88 @@
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from autocoder.common import SourceCode
+from autocoder.rag.token_limiter import TokenLimiter, reorder_segments
+
+
+def _limiter(count_tokens, count_tokens_batch=None, full_text_limit=1000):
+    llm = MagicMock()
+    llm.get_sub_client.return_value = None
+    return TokenLimiter(
+        count_tokens=count_tokens,
+        full_text_limit=full_text_limit,
+        segment_limit=0,
+        buff_limit=0,
+        llm=llm,
+        disable_segment_reorder=False,
+        count_tokens_batch=count_tokens_batch,
+    )
+
+
+class TestTokenLimiterTokens(unittest.TestCase):
+    def test_precomputed_tokens_are_not_recounted(self):
+        count_tokens = MagicMock(return_value=10)
+        limiter = _limiter(count_tokens)
+        docs = [
+            SourceCode(module_name=f"doc{i}", source_code="x" * 100, tokens=100)
+            for i in range(5)
+        ]
+        result = limiter.limit_tokens(docs, [{"role": "user", "content": "q"}], 1)
+        self.assertEqual(len(result), 5)
+        count_tokens.assert_not_called()
+
+    def test_missing_tokens_are_counted_in_one_batch(self):
+        count_tokens = MagicMock(return_value=10)
+        count_tokens_batch = MagicMock(side_effect=lambda texts: [len(t) for t in texts])
+        limiter = _limiter(count_tokens, count_tokens_batch)
+        docs = [
+            SourceCode(module_name="a", source_code="x" * 400, tokens=400),
+            SourceCode(module_name="b", source_code="y" * 300),
+            SourceCode(module_name="c", source_code="z" * 500),
+        ]
+        limiter.process_range_doc = MagicMock(return_value=None)
+        limiter.limit_tokens(docs, [{"role": "user", "content": "q"}], 1)
+        count_tokens_batch.assert_called_once_with(["y" * 300, "z" * 500])
+        count_tokens.assert_not_called()
+        self.assertEqual(
+            [d.module_name for d in limiter.first_round_full_docs], ["a", "b"]
+        )
+        self.assertEqual(docs[2].tokens, 500)
+
+
+def _chunk(original_doc, chunk_index):
+    return SourceCode(
+        module_name=f"{original_doc}#chunk{chunk_index}",
+        source_code="",
+        metadata={"original_doc": original_doc, "chunk_index": chunk_index},
+    )
+
+
+class TestReorderSegments(unittest.TestCase):
+    def test_groups_chunks_at_first_occurrence(self):
+        docs = [
+            _chunk("a", 3),
+            SourceCode(module_name="plain", source_code=""),
+            _chunk("b", 2),
+            _chunk("a", 1),
+            _chunk("b", 1),
+            _chunk("a", 2),
+        ]
+        result = reorder_segments(docs)
+        self.assertEqual(
+            [d.module_name for d in result],
+            ["a#chunk1", "a#chunk2", "a#chunk3", "plain", "b#chunk1", "b#chunk2"],
+        )
+
+    def test_large_input_is_fast(self):
+        docs = [_chunk(f"file{i % 500}", i) for i in range(50000)]
+        start = time.time()
+        result = reorder_segments(docs)
+        self.assertLess(time.time() - start, 2)
+        self.assertEqual(len(result), len(docs))
+
+
+if __name__ == "__main__":
+    unittest.main()
+
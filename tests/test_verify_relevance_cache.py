@@ -0,0 +1,73 @@
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from autocoder.common import AutoCoderArgs
+from autocoder.index.index import IndexManager, VerifyFileRelevance
+
+
+class _StubLLM:
+    def __init__(self, model_name: str):
+        self.default_model_name = model_name
+
+    def get_sub_client(self, name):
+        return None
+
+
+class TestVerifyRelevanceCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.args = AutoCoderArgs(source_dir=self.temp_dir.name)
+        self.llm = _StubLLM("model-a")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _patch_prompt(self):
+        prompt = MagicMock()
+        run = prompt.with_llm.return_value.with_return_type.return_value.run
+        run.return_value = VerifyFileRelevance(relevant_score=8, reason="相关")
+        return patch.object(IndexManager, "verify_file_relevance", prompt), run
+
+    def test_hit_across_managers_and_normalized_query(self):
+        patcher, run = self._patch_prompt()
+        with patcher:
+            manager = IndexManager(llm=self.llm, sources=[], args=self.args)
+            result = manager.verify_file_relevance_with_cache(
+                self.llm, file_content="print(1)", query="Fix the bug"
+            )
+            self.assertEqual(result.relevant_score, 8)
+            self.assertEqual(run.call_count, 1)
+
+            # 重新创建 IndexManager 模拟再次执行同一个问题
+            manager = IndexManager(llm=self.llm, sources=[], args=self.args)
+            result = manager.verify_file_relevance_with_cache(
+                self.llm, file_content="print(1)", query="  fix   the BUG "
+            )
+            self.assertEqual(result, VerifyFileRelevance(relevant_score=8, reason="相关"))
+            self.assertEqual(run.call_count, 1)
+
+            # 文件内容或模型变化都不会命中
+            manager.verify_file_relevance_with_cache(
+                self.llm, file_content="print(2)", query="fix the bug"
+            )
+            manager.verify_file_relevance_with_cache(
+                _StubLLM("model-b"), file_content="print(1)", query="fix the bug"
+            )
+            self.assertEqual(run.call_count, 3)
+
+    def test_disabled(self):
+        self.args.disable_verify_relevance_cache = True
+        patcher, run = self._patch_prompt()
+        with patcher:
+            manager = IndexManager(llm=self.llm, sources=[], args=self.args)
+            for _ in range(2):
+                manager.verify_file_relevance_with_cache(
+                    self.llm, file_content="print(1)", query="fix the bug"
+                )
+            self.assertEqual(run.call_count, 2)
+            self.assertIsNone(manager.get_verify_relevance_cache())
+
+
+if __name__ == "__main__":
+    unittest.main()